@@ -0,0 +1,72 @@
+"""
+Batch ingest from the command line, without running the API server.
+
+Run from backend/:
+
+    python -m app.ingest "https://www.youtube.com/playlist?list=..." more_urls.txt
+    python -m app.ingest --resume <batch_id>
+
+Sources are video, playlist or channel URLs, or text files with one URL per line.
+Progress is kept in the batch manifest under BATCH_DIR, so an interrupted run can be
+resumed; videos that already finished are skipped and partly processed ones continue
+from their last cached stage.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def read_sources(arguments: list) -> list:
+    sources = []
+    for argument in arguments:
+        if os.path.isfile(argument):
+            with open(argument, "r", encoding="utf-8") as file:
+                sources += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+        else:
+            sources.append(argument)
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest playlists and lists of videos.")
+    parser.add_argument("sources", nargs="*", help="Video/playlist URLs or files with one URL per line")
+    parser.add_argument("--resume", default=None, help="Continue an earlier batch by its ID")
+    parser.add_argument("--segmenter", choices=["llm", "topic"], default=None, help="Chunking engine (default: SEGMENTER)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+    if not args.sources and not args.resume:
+        parser.error("give at least one source or --resume")
+
+    # Imported late so --help works without the models and API key the app needs
+    from app.main import batch_manager, job_manager, transcription_pool
+
+    if args.resume:
+        batch = batch_manager.resume(args.resume)
+        if batch is None:
+            raise SystemExit(f"Batch {args.resume} not found.")
+    else:
+        batch = batch_manager.submit(read_sources(args.sources), args.segmenter)
+    print(f"batch {batch.batch_id}", file=sys.stderr)
+
+    try:
+        while True:
+            state = batch.to_dict()
+            counts = ", ".join(f"{status}: {count}" for status, count in sorted(state["counts"].items()))
+            print(f"[{state['status']}] {counts}", file=sys.stderr)
+            if state["status"] in ("completed", "completed_with_errors", "failed"):
+                break
+            time.sleep(args.interval)
+    finally:
+        batch_manager.shutdown()
+        job_manager.shutdown()
+        transcription_pool.shutdown()
+
+    print(json.dumps(batch.to_dict(), indent=2))
+    if batch.status != "completed":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
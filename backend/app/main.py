@@ -1,20 +1,72 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse  # ✅ Add this import
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from pydantic import BaseModel
-from app.utils.downloader import download_video_and_audio, transcribe_audio_with_timestamps
-from app.utils.llama_segmenter import segment_text_with_llama70b
-from app.utils.groq_client import GroqClient
-from pydub import AudioSegment
+from typing import Optional, Literal
+from app.utils.downloader import download_video_and_audio, iter_transcript_with_timestamps, TRANSCRIBE_WINDOW_SECONDS, WHISPER_WORD_TIMESTAMPS
+from app.utils.llama_segmenter import segment_transcript_windowed, SEGMENT_MODEL, SEGMENT_WINDOW_WORDS, SEGMENT_WINDOW_OVERLAP_WORDS
+from app.utils.semantic_audio_segmenter import segment_transcript_by_topic, TOPIC_BLOCK_SIZE, TOPIC_MIN_CHUNK_SECONDS, TOPIC_MAX_CHUNK_SECONDS, TOPIC_DEPTH_STDS
+from app.utils.groq_client import GroqClient, ResponseStreamFormatter, LLM_MODEL, LLM_COMBINED_SUMMARY
+from app.utils.model_registry import model_registry
+from app.utils.artifact_cache import artifact_cache, cache_key_for_url
+from app.utils.embeddings import embedding_service
+from app.utils.audio_stream import probe_duration, VAD_SEARCH_SECONDS
+from app.utils.media import decode_to_wav, cut_segments
+from app.utils.segment_server import segment_audio_server, write_chunk_index, parse_range, RangeNotSatisfiable, SOURCE_WAV_NAME
+from app.utils.alignment import align_chunks_to_segments
+from app.utils.workspace import create_workspace, get_workspace, latest_workspace, active_job, cleanup_expired_workspaces
+from app.utils.jobs import JobManager
+from app.utils.transcript_store import open_transcript
+from app.utils.batches import BatchManager
+from app.utils.vector_index import index_registry
+from app.utils.corpus_index import corpus_index
+from app.utils.transcription_pool import transcription_pool, TRANSCRIBE_SHARD_SECONDS
+from app.utils.transcribers import get_transcriber
+from app.utils.telemetry import metrics_payload, HTTP_REQUEST_SECONDS, JOB_QUEUE_DEPTH
+import asyncio
 import os
 import json
 import logging
+import time
 
-logging.basicConfig(level=logging.ERROR)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR").upper())
+
+# "lazy" keeps one decoded WAV per job and cuts chunks on request; "eager" pre-exports every chunk WAV
+SEGMENT_EXPORT_MODE = os.getenv("SEGMENT_EXPORT_MODE", "lazy")
+# Number of ranked transcript time ranges returned with each chat answer
+CHAT_TIMESTAMP_RESULTS = int(os.getenv("CHAT_TIMESTAMP_RESULTS", "3"))
+# Default chunking engine: "llm" asks the segmentation model, "topic" cuts locally on embedding similarity
+SEGMENTER = os.getenv("SEGMENTER", "llm")
+# Largest page size accepted by /search
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+
+SEGMENTERS = {"llm": segment_transcript_windowed, "topic": segment_transcript_by_topic}
 
 app = FastAPI()
 
-groq_client = GroqClient()
+_latest = latest_workspace()
+groq_client = GroqClient(_latest.transcript_path if _latest else None)
+job_manager = JobManager()
+JOB_QUEUE_DEPTH.set_function(job_manager.queue_depth)
+
+@app.on_event("startup")
+async def warm_up_models():
+    # Optionally preload models listed in WARMUP_MODELS so the first request does not pay for it
+    model_registry.warm_up()
+    # Unload models idle for MODEL_IDLE_TTL even when no new request arrives
+    model_registry.start_sweeper()
+    # Drop workspaces of jobs that expired while the server was down
+    cleanup_expired_workspaces()
+    # Bring videos indexed before the cross-video index existed (or while it was missing) into it
+    await run_in_threadpool(corpus_index.sync, index_registry)
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    batch_manager.shutdown()
+    job_manager.shutdown()
+    transcription_pool.shutdown()
+    model_registry.stop_sweeper()
 
 # CORS Middleware
 app.add_middleware(
@@ -25,119 +77,430 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, so job IDs do not explode the label set
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(request.method, getattr(route, "path", "unmatched"), str(status)).observe(time.perf_counter() - started)
+
 class YouTubeRequest(BaseModel):
     youtube_url: str
+    segmenter: Optional[Literal["llm", "topic"]] = None  # Defaults to SEGMENTER
+
+class BatchRequest(BaseModel):
+    sources: list[str]  # Video, playlist or channel URLs
+    segmenter: Optional[Literal["llm", "topic"]] = None  # Defaults to SEGMENTER
 
 class ChatRequest(BaseModel):
     user_message: str
+    video_id: Optional[str] = None  # Defaults to the most recently processed video
+    stream: bool = False  # Answer as server-sent events instead of a single JSON body
 
-def split_audio_by_chunks(audio_path: str, text_chunks: list[str], output_folder: str) -> list[dict]:
+def split_audio_by_chunks(audio_path: str, text_chunks: list[str], output_folder: str, url_prefix: str = "/segments",
+                          transcript_segments: list[dict] = None, export_mode: str = None) -> list[dict]:
     """
-    Splits audio into segments based on the number of text chunks and saves them.
+    Splits audio into segments matching the text chunks and saves them.
+    With transcript_segments (Whisper output) each chunk is cut at its aligned timestamps;
+    without them the audio is divided evenly by the number of chunks.
+    In "lazy" mode only one decoded source WAV and a chunk index are written, and chunk
+    audio is sliced from it when requested; "eager" mode exports a WAV per chunk.
+    The audio is decoded by ffmpeg, so any ffmpeg-readable file works and memory stays bounded.
     """
-    audio = AudioSegment.from_wav(audio_path)
+    export_mode = export_mode or SEGMENT_EXPORT_MODE
     os.makedirs(output_folder, exist_ok=True)
 
-    total_audio_duration = len(audio) / 1000  # Convert ms to seconds
-    average_chunk_duration = total_audio_duration / len(text_chunks)
+    if transcript_segments:
+        aligned_ranges = align_chunks_to_segments(text_chunks, transcript_segments)
+    else:
+        total_audio_duration = probe_duration(audio_path)
+        average_chunk_duration = total_audio_duration / len(text_chunks)
+        aligned_ranges = [
+            (i * average_chunk_duration, min((i + 1) * average_chunk_duration, total_audio_duration))
+            for i in range(len(text_chunks))
+        ]
 
     audio_text_pairs = []
-    current_time = 0.0
-
-    for i, text in enumerate(text_chunks):
-        start_time = current_time
-        end_time = min(current_time + average_chunk_duration, total_audio_duration)
+    cut_points = []
+    chunk_paths = []
 
-        # Extract audio chunk
-        start_ms = int(start_time * 1000)
-        end_ms = int(end_time * 1000)
-        audio_chunk = audio[start_ms:end_ms]
-
-        # Save audio chunk
-        chunk_path = os.path.join(output_folder, f"chunk_{i + 1}.wav")
-        audio_chunk.export(chunk_path, format="wav")
+    for i, (text, (start_time, end_time)) in enumerate(zip(text_chunks, aligned_ranges)):
+        cut_points.append((start_time, end_time))
+        chunk_paths.append(os.path.join(output_folder, f"chunk_{i + 1}.wav"))
 
         audio_text_pairs.append({
             "start_time": start_time,
             "end_time": end_time,
             "text": text,
-            "audio_path": f"/segments/chunk_{i + 1}.wav"
+            "audio_path": f"{url_prefix}/chunk_{i + 1}.wav"
         })
-        current_time = end_time
+
+    if export_mode == "lazy":
+        decode_to_wav(audio_path, os.path.join(output_folder, SOURCE_WAV_NAME))
+        write_chunk_index(output_folder, audio_text_pairs)
+    else:
+        # Cut every chunk in a single ffmpeg run of the segment muxer
+        cut_segments(audio_path, cut_points, chunk_paths)
 
     return audio_text_pairs
 
-@app.post("/process-youtube")
-async def process_youtube(request: YouTubeRequest):
-    youtube_url = request.youtube_url
-    try:
-        # Paths
-        video_path = "temp/video.mp4"
-        audio_path = "temp/audio.wav"
-        output_folder = "temp/segments"
-        json_path = "temp/transcript_original.json"  # Correct JSON file path
+def pipeline_stage_configs(segmenter: str = None) -> dict:
+    """
+    Cache configuration of each stage. Every stage embeds the one before it,
+    so changing e.g. the Whisper model invalidates everything downstream.
+    """
+    segmenter = segmenter or SEGMENTER
+    download = {"format": "bestaudio/best"}
+    transcribe = {"after": download, "model": get_transcriber().config(), "window": TRANSCRIBE_SHARD_SECONDS if transcription_pool.enabled else TRANSCRIBE_WINDOW_SECONDS, "vad": VAD_SEARCH_SECONDS,
+                  "max_chunk_duration": 15, "words": WHISPER_WORD_TIMESTAMPS, "store": "columnar"}
+    if segmenter == "topic":
+        segment = {"after": transcribe, "segmenter": "topic", "model": embedding_service.model_name, "block": TOPIC_BLOCK_SIZE,
+                   "min_seconds": TOPIC_MIN_CHUNK_SECONDS, "max_seconds": TOPIC_MAX_CHUNK_SECONDS, "depth": TOPIC_DEPTH_STDS,
+                   "candidates": "valleys"}
+    else:
+        segment = {"after": transcribe, "model": SEGMENT_MODEL, "window": SEGMENT_WINDOW_WORDS, "overlap": SEGMENT_WINDOW_OVERLAP_WORDS}
+    split = {"after": segment, "splitter": "aligned", "export": SEGMENT_EXPORT_MODE}
+    summarize = {"after": segment, "model": LLM_MODEL, "combined": LLM_COMBINED_SUMMARY}
+    return {"download": download, "transcribe": transcribe, "segment": segment, "split": split, "summarize": summarize}
+
+def collect_into(items, sink: list, on_complete=None):
+    """
+    Passes items through while keeping a copy of each in sink.
+    on_complete() runs once items are exhausted, but not if they fail part way.
+    """
+    for item in items:
+        sink.append(item)
+        yield item
+    if on_complete:
+        on_complete()
+
+def fetch_audio(youtube_url: str, workspace, config: dict = None) -> str:
+    """
+    Downloads the audio stream of a video into its workspace, or restores it from the artifact cache.
+    """
+    key = cache_key_for_url(youtube_url)
+    config = config or pipeline_stage_configs()["download"]
+    cached = artifact_cache.get(key, "download", config)
+    if cached:
+        return cached.restore_files(workspace.path)[0]
+    video_filepath, audio_filepath = download_video_and_audio(youtube_url, workspace.video_path, workspace.audio_path, audio_only=True)
+    artifact_cache.put(key, "download", config, files={os.path.basename(audio_filepath): audio_filepath})
+    return audio_filepath
+
+def run_youtube_pipeline(job, workspace, youtube_url: str, segmenter: str = None, prefetched: dict = None) -> dict:
+    """
+    Runs the full ingest pipeline for one video inside its workspace.
+    Executed on a JobManager worker thread; each step is a tracked stage.
+    Completed stages are stored in the artifact cache, so repeated or
+    previously failed videos resume from the last stage that finished.
+    prefetched ({"audio_path", "started_at", "finished_at"}) carries a download done before the job was queued.
+    """
+    key = cache_key_for_url(youtube_url)
+    configs = pipeline_stage_configs(segmenter)
+    segment_transcript = SEGMENTERS[segmenter or SEGMENTER]
 
-        # Step 1: Download video and extract audio
-        video_filepath, audio_filepath = download_video_and_audio(youtube_url, video_path, audio_path)
+    with active_job(workspace):
+        # Step 1: Download the audio stream only; it is decoded on the fly downstream
+        if prefetched:
+            audio_filepath = prefetched["audio_path"]
+            job.record_stage("download", prefetched["started_at"], prefetched["finished_at"])
+        else:
+            with job.run_stage("download"):
+                audio_filepath = fetch_audio(youtube_url, workspace, configs["download"])
 
-        # Step 3: Transcription and segmentation
-        transcript_segments = transcribe_audio_with_timestamps(audio_filepath)
-        full_transcript = " ".join([segment["text"] for segment in transcript_segments])
-        text_chunks = segment_text_with_llama70b(full_transcript)
+        # Step 2: Transcription, streamed window by window
+        text_chunks = None
+        with job.run_stage("transcribe"):
+            cached = artifact_cache.get(key, "transcribe", configs["transcribe"])
+            if cached:
+                transcript_segments = cached.data
+                cached.restore_files(workspace.path)
+            else:
+                transcript_segments = []
+
+                def store_transcript():
+                    artifact_cache.put(key, "transcribe", configs["transcribe"], data=transcript_segments,
+                                       files={os.path.basename(workspace.transcript_path): workspace.transcript_path})
+
+                # The transcript is cached as soon as the stream is drained, whatever happens to segmentation
+                transcript_stream = collect_into(
+                    iter_transcript_with_timestamps(audio_filepath, original_transcript_path=workspace.transcript_path),
+                    transcript_segments, on_complete=store_transcript
+                )
+                cached_chunks = artifact_cache.get(key, "segment", configs["segment"])
+                if cached_chunks:
+                    text_chunks = cached_chunks.data
+                    for _ in transcript_stream:
+                        pass
+                else:
+                    # Step 3 overlaps step 2: segmentation consumes transcript segments while later audio is transcribed
+                    with job.run_stage("segment"):
+                        try:
+                            text_chunks = segment_transcript(transcript_stream)
+                        except Exception:
+                            # Finish transcribing so a rerun resumes at segmentation instead of rerunning Whisper
+                            for _ in transcript_stream:
+                                pass
+                            raise
+                        artifact_cache.put(key, "segment", configs["segment"], data=text_chunks)
+
+        # Step 3: Semantic segmentation
+        if text_chunks is None:
+            with job.run_stage("segment"):
+                cached = artifact_cache.get(key, "segment", configs["segment"])
+                if cached:
+                    text_chunks = cached.data
+                else:
+                    # LLM: overlapping windows segmented in parallel; topic: local embedding boundaries
+                    text_chunks = segment_transcript(transcript_segments)
+                    artifact_cache.put(key, "segment", configs["segment"], data=text_chunks)
 
         # Step 4: Split audio by text chunks
-        audio_text_pairs = split_audio_by_chunks(audio_filepath, text_chunks, output_folder)
+        with job.run_stage("split"):
+            cached = artifact_cache.get(key, "split", configs["split"])
+            if cached:
+                audio_text_pairs = cached.data
+                cached.restore_files(workspace.segments_dir)
+                for segment in audio_text_pairs:
+                    segment["audio_path"] = f"{workspace.segments_url}/{os.path.basename(segment['audio_path'])}"
+            else:
+                # Cut points come from the original Whisper segments (word timestamps when available)
+                whisper_segments = open_transcript(workspace.transcript_path).segments(words=True)
+                audio_text_pairs = split_audio_by_chunks(audio_filepath, text_chunks, workspace.segments_dir,
+                                                         workspace.segments_url, whisper_segments)
+                artifact_cache.put(key, "split", configs["split"], data=audio_text_pairs,
+                                   files={name: os.path.join(workspace.segments_dir, name) for name in os.listdir(workspace.segments_dir)})
 
-        # Step 2: Load documents from JSON
-        groq_client.load_documents_from_json(json_path)
-        
-        # Step 5: Query LLM for each chunk
-        for segment in audio_text_pairs:
-            groq_response = groq_client.query_llm(segment["text"])
-            segment["summary"] = groq_response.get("summary", "No summary available.")
-            segment["source"] = groq_response.get("source", "No source available.")
+        # Step 5: Load documents from JSON and query LLM for each chunk
+        with job.run_stage("summarize"):
+            groq_client.load_documents_from_transcript(workspace.transcript_path, video_id=key)
+            cached = artifact_cache.get(key, "summarize", configs["summarize"])
+            if cached:
+                for segment, summary in zip(audio_text_pairs, cached.data):
+                    segment.update(summary)
+            else:
+                # All chunks are summarized concurrently under the executor's rate limits
+                groq_responses = groq_client.summarize_segments(
+                    [segment["text"] for segment in audio_text_pairs],
+                    on_progress=lambda done, total: job.set_progress("summarize", done / total),
+                    video_id=key
+                )
+                summaries = []
+                for segment, groq_response in zip(audio_text_pairs, groq_responses):
+                    segment["summary"] = groq_response.get("summary", "No summary available.")
+                    segment["source"] = groq_response.get("source", "No source available.")
+                    summaries.append({"summary": segment["summary"], "source": segment["source"]})
+                artifact_cache.put(key, "summarize", configs["summarize"], data=summaries)
 
         # Step 6: Save metadata
-        metadata_path = os.path.join(output_folder, "metadata.json")
+        metadata_path = workspace.metadata_path
         with open(metadata_path, "w") as metadata_file:
-            json.dump(audio_text_pairs, metadata_file, indent=4)
+            json.dump(audio_text_pairs, metadata_file, separators=(",", ":"))
 
-        return {
-            "message": "Processing complete",
-            "segments": audio_text_pairs,
-            "metadata_path": metadata_path
-        }
+    return {
+        "message": "Processing complete",
+        "job_id": workspace.job_id,
+        "segments": audio_text_pairs,
+        "metadata_path": metadata_path
+    }
+
+def submit_youtube_job(youtube_url: str, segmenter: str = None):
+    # Each job gets its own workspace so concurrent requests never share files
+    workspace = create_workspace()
+    return job_manager.submit(workspace.job_id, run_youtube_pipeline, workspace, youtube_url, segmenter)
+
+def submit_downloaded_job(workspace, youtube_url: str, segmenter: str = None, prefetched: dict = None):
+    return job_manager.submit(workspace.job_id, run_youtube_pipeline, workspace, youtube_url, segmenter, prefetched)
+
+# Playlists and URL lists: downloads run ahead on their own pool and feed the job pipeline
+batch_manager = BatchManager(fetch_audio, submit_downloaded_job)
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: YouTubeRequest):
+    job = await run_in_threadpool(submit_youtube_job, request.youtube_url, request.segmenter)
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}"
+    }
+
+@app.post("/batches", status_code=202)
+async def create_batch(request: BatchRequest):
+    if not any(source.strip() for source in request.sources):
+        raise HTTPException(status_code=400, detail="No sources given")
+    batch = await run_in_threadpool(batch_manager.submit, request.sources, request.segmenter)
+    return {
+        "batch_id": batch.batch_id,
+        "status": batch.status,
+        "status_url": f"/batches/{batch.batch_id}"
+    }
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = await run_in_threadpool(batch_manager.get, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
+
+@app.post("/batches/{batch_id}/resume", status_code=202)
+async def resume_batch(batch_id: str):
+    batch = await run_in_threadpool(batch_manager.resume, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/process-youtube")
+async def process_youtube(request: YouTubeRequest):
+    try:
+        # Same pipeline as /jobs, but the response waits for the result without blocking the event loop
+        job = await run_in_threadpool(submit_youtube_job, request.youtube_url, request.segmenter)
+        return await asyncio.wrap_future(job.future)
 
     except Exception as e:
         logging.error(f"Error processing YouTube request: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def chat_timestamps(request: ChatRequest) -> dict:
+    time_ranges = groq_client.find_time_ranges(request.user_message, CHAT_TIMESTAMP_RESULTS, request.video_id)
+    start_time, end_time = (time_ranges[0]["start"], time_ranges[0]["end"]) if time_ranges else (0.0, 0.0)
+    return {"start_time": start_time, "end_time": end_time, "timestamps": time_ranges}
+
+async def chat_events(request: ChatRequest):
+    """
+    SSE stream of a chat answer: a "timestamps" event first, then formatted "token"
+    events as the completion arrives, then "done" with the full text (or "error").
+    """
+    try:
+        yield sse_event("timestamps", await run_in_threadpool(chat_timestamps, request))
+        formatter = ResponseStreamFormatter(groq_client.format_response)
+        parts = []
+        async for delta in groq_client.llm.relay(groq_client.astream_answer(request.user_message, request.video_id)):
+            text = formatter.feed(delta)
+            if text:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        text = formatter.flush()
+        if text:
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+        yield sse_event("done", {"response": "".join(parts)})
+    except Exception as e:
+        logging.error(f"Error in chat stream: {str(e)}", exc_info=True)
+        yield sse_event("error", {"detail": str(e)})
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
+    if request.stream:
+        return StreamingResponse(chat_events(request), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     try:
-        raw_response = groq_client.query_llm(request.user_message)["response"]
+        # The summary is not part of the chat response, so none is requested
+        raw_response = (await run_in_threadpool(groq_client.query_llm, request.user_message, False, request.video_id, False, "interactive"))["response"]
         clean_response = groq_client.format_response(raw_response)
 
-        # Get timestamps for the query from the transcript
-        start_time, end_time = groq_client.find_timestamps(request.user_message)
-        print(end_time)
+        # Get ranked timestamps for the query from the transcript
+        timestamps = await run_in_threadpool(chat_timestamps, request)
+        start_time, end_time, time_ranges = timestamps["start_time"], timestamps["end_time"], timestamps["timestamps"]
         return {
             "response": clean_response,
             "start_time": start_time,
-            "end_time": end_time
+            "end_time": end_time,
+            "timestamps": time_ranges
         }
     except Exception as e:
         logging.error(f"Error in chat: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/search")
+async def search(q: str, limit: int = 10, offset: int = 0, video_id: Optional[list[str]] = Query(None),
+                 start: Optional[float] = None, end: Optional[float] = None, min_score: Optional[float] = None):
+    """
+    Semantic search over the segments of every processed video. Hits are ranked by score and
+    can be limited to some videos (video_id may be repeated), to segments overlapping
+    [start, end) seconds and to a minimum score; limit/offset page through the ranking.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+        raise HTTPException(status_code=400, detail=f"limit must be 1..{SEARCH_MAX_LIMIT} and offset >= 0")
+    query_vector = (await run_in_threadpool(embedding_service.encode, [q]))[0]
+    # One extra hit tells whether another page exists
+    hits = await run_in_threadpool(corpus_index.search, query_vector, limit + 1, offset, video_id, start, end, min_score)
+    return {"query": q, "offset": offset, "limit": limit, "results": hits[:limit], "has_more": len(hits) > limit}
 
-SEGMENT_FOLDER = "temp/segments"
 
-@app.get("/temp/segments/{filename}")
-async def get_segment(filename: str):   
-    file_path = os.path.join(SEGMENT_FOLDER, f"{filename}.wav")
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/models/metrics")
+async def model_metrics():
+    return model_registry.metrics()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return await run_in_threadpool(artifact_cache.stats)
+
+@app.get("/embeddings/stats")
+async def embedding_stats():
+    return embedding_service.stats()
+
 
-    if not os.path.exists(file_path):
+def _segment_response(workspace, filename: str, range_header: str = None):
+    if workspace is None:
+        return {"error": "File not found", "filename": filename}
+    name = os.path.splitext(os.path.basename(filename))[0]
+    workspace.touch()
+
+    # Pre-exported chunk WAVs (eager mode) are served as plain files
+    file_path = os.path.join(workspace.segments_dir, f"{name}.wav")
+    if os.path.exists(file_path):
+        return FileResponse(file_path, media_type="audio/wav", filename=f"{name}.wav")
+
+    chunk = segment_audio_server.chunk(workspace.segments_dir, name)
+    if chunk is None:
         return {"error": "File not found", "filename": file_path}
 
-    return FileResponse(file_path, media_type="audio/wav", filename=f"{filename}.wav")
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{name}.wav"',
+    }
+    try:
+        byte_range = parse_range(range_header, chunk.size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{chunk.size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(chunk.size)
+        return StreamingResponse(chunk.iter_bytes(), media_type="audio/wav", headers=headers)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{chunk.size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(chunk.iter_bytes(first, last), status_code=206, media_type="audio/wav", headers=headers)
+
+@app.get("/temp/{job_id}/segments/{filename}")
+async def get_job_segment(job_id: str, filename: str, request: Request):
+    return _segment_response(get_workspace(job_id), filename, request.headers.get("range"))
+
+@app.get("/temp/segments/{filename}")
+async def get_segment(filename: str, request: Request):
+    # Legacy route: serves from the most recently processed job
+    return _segment_response(latest_workspace(), filename, request.headers.get("range"))
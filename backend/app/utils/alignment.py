@@ -0,0 +1,127 @@
+import re
+import unicodedata
+from typing import List
+
+# Kana and CJK ideographs are written without spaces, so each character is its own token;
+# every other script is split into runs of word characters.
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(rf"[{_CJK_RANGES}]|(?:[^\W{_CJK_RANGES}]|')+")
+# Number of leading tokens of a chunk used to locate it in the transcript.
+ANCHOR_TOKENS = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def timed_tokens(segments: List[dict]):
+    """
+    Flattens Whisper segments into parallel lists of tokens and (start, end) times.
+    Word-level timestamps are used when the transcript has them; otherwise token
+    times are interpolated linearly across their segment.
+    """
+    tokens = []
+    times = []
+    for segment in segments:
+        if segment.get("words"):
+            for word in segment["words"]:
+                for token in tokenize(word["word"]):
+                    tokens.append(token)
+                    times.append((word["start"], word["end"]))
+            continue
+
+        segment_tokens = tokenize(segment["text"])
+        if not segment_tokens:
+            continue
+        step = (segment["end"] - segment["start"]) / len(segment_tokens)
+        for i, token in enumerate(segment_tokens):
+            tokens.append(token)
+            times.append((segment["start"] + i * step, segment["start"] + (i + 1) * step))
+    return tokens, times
+
+
+def _find_anchor(tokens: List[str], anchor: List[str], expected: int, lo: int, hi: int) -> int:
+    """
+    Position in tokens[lo:hi] where `anchor` matches best, preferring full matches and
+    then the position closest to `expected`. Returns -1 if not even the first token matches.
+    """
+    best = -1
+    best_key = None
+    for position in range(max(lo, 0), min(hi, len(tokens))):
+        if tokens[position] != anchor[0]:
+            continue
+        matched = 1
+        while matched < len(anchor) and position + matched < len(tokens) and tokens[position + matched] == anchor[matched]:
+            matched += 1
+        key = (-matched, abs(position - expected))
+        if best_key is None or key < best_key:
+            best, best_key = position, key
+    return best
+
+
+def chunk_token_boundaries(text_chunks: List[str], tokens: List[str]) -> List[int]:
+    """
+    Index of the first transcript token of every chunk. Chunks are assumed to cover
+    the transcript in order, so each boundary is searched only in a window around
+    where the previous chunk's length says it should be, which keeps the total work
+    linear in the transcript length.
+    """
+    boundaries = [0]
+    position = 0
+    for i in range(1, len(text_chunks)):
+        previous_length = len(tokenize(text_chunks[i - 1]))
+        expected = min(position + previous_length, len(tokens))
+        anchor = tokenize(text_chunks[i])[:ANCHOR_TOKENS]
+
+        found = -1
+        if anchor:
+            slack = max(20, previous_length // 4)
+            found = _find_anchor(tokens, anchor, expected, max(position + 1, expected - slack), expected + slack)
+        position = found if found != -1 else expected
+        boundaries.append(min(position, len(tokens)))
+    return boundaries
+
+
+def _proportional_ranges(text_chunks: List[str], segments: List[dict]) -> List[tuple]:
+    """
+    Splits the spoken span of `segments` between the chunks in proportion to their text
+    length. Used when the transcript has no tokens to align against.
+    """
+    if not segments:
+        return [(0.0, 0.0) for _ in text_chunks]
+    span_start = segments[0]["start"]
+    span_end = max(span_start, segments[-1]["end"])
+    lengths = [max(len(chunk.strip()), 1) for chunk in text_chunks]
+    total = sum(lengths)
+
+    ranges = []
+    elapsed = 0
+    for length in lengths:
+        start = span_start + (span_end - span_start) * elapsed / total
+        elapsed += length
+        ranges.append((start, span_start + (span_end - span_start) * elapsed / total))
+    return ranges
+
+
+def align_chunks_to_segments(text_chunks: List[str], segments: List[dict]) -> List[tuple]:
+    """
+    Maps LLM text chunks back onto Whisper timestamps.
+    Returns one (start, end) pair in seconds per chunk; consecutive chunks share their
+    cut point, so the ranges tile the spoken part of the audio without gaps.
+    """
+    if not text_chunks:
+        return []
+    tokens, times = timed_tokens(segments)
+    if not tokens:
+        return _proportional_ranges(text_chunks, segments)
+
+    boundaries = chunk_token_boundaries(text_chunks, tokens)
+    cut_points = [times[b][0] if b < len(tokens) else times[-1][1] for b in boundaries]
+    cut_points.append(times[-1][1])
+
+    ranges = []
+    for i in range(len(text_chunks)):
+        start = cut_points[i]
+        end = max(start, cut_points[i + 1])
+        ranges.append((start, end))
+    return ranges
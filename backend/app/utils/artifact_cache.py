@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+# Persistent cache of pipeline artifacts, shared by every job on this machine.
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "cache")
+# Total bytes kept on disk before least recently used entries are evicted (0 disables caching).
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+
+_VIDEO_ID_PATTERNS = [
+    re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})"),
+]
+_DATA_FILE = "data.json"
+
+
+def extract_video_id(url: str):
+    """ Returns the canonical 11 character YouTube video ID of `url`, or None. """
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+def cache_key_for_url(url: str) -> str:
+    """
+    Stable key for a source URL: the YouTube video ID when there is one,
+    so different URL spellings of the same video share cache entries.
+    """
+    video_id = extract_video_id(url)
+    if video_id:
+        return video_id
+    return "url-" + hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def config_hash(config) -> str:
+    """ Short digest of a JSON-serialisable stage configuration. """
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """ Hard-links src to dst when possible (instant, no extra space), otherwise copies. """
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+class CacheEntry:
+    """ One completed stage artifact: an optional JSON payload plus named files. """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def data(self):
+        data_path = os.path.join(self.path, _DATA_FILE)
+        if not os.path.exists(data_path):
+            return None
+        with open(data_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, "files", name)
+
+    def files(self) -> list:
+        files_dir = os.path.join(self.path, "files")
+        return sorted(os.listdir(files_dir)) if os.path.isdir(files_dir) else []
+
+    def restore_files(self, dest_dir: str) -> list:
+        """ Links every stored file into dest_dir and returns the new paths. """
+        return [link_or_copy(self.file(name), os.path.join(dest_dir, name)) for name in self.files()]
+
+
+def _directory_size(path: str) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                pass
+    return size
+
+
+class ArtifactCache:
+    """
+    On-disk cache laid out as <root>/<video key>/<stage>-<config hash>/.
+    Entries are written to a temporary directory and renamed into place, so a
+    crashed job never leaves a half-written entry and a later run resumes from
+    the last stage that completed. Size is bounded with LRU eviction.
+    The directory is scanned once, on first use; after that an in-memory LRU manifest
+    of entry sizes and a running total are updated on every put and hit.
+    """
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # entry path -> size in bytes, least recently used first; None until the startup scan
+        self._manifest = None
+        self._bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _entry_path(self, key: str, stage: str, config) -> str:
+        return os.path.join(self.root, key, f"{stage}-{config_hash(config)}")
+
+    def _scan(self):
+        """ Builds the manifest from disk; the directory mtime doubles as the LRU clock across restarts. Needs the lock. """
+        if self._manifest is not None:
+            return
+        entries = []
+        if os.path.isdir(self.root):
+            for key in os.listdir(self.root):
+                key_dir = os.path.join(self.root, key)
+                if key.startswith(".") or not os.path.isdir(key_dir):
+                    continue
+                for stage in os.listdir(key_dir):
+                    path = os.path.join(key_dir, stage)
+                    try:
+                        entries.append((os.path.getmtime(path), _directory_size(path), path))
+                    except FileNotFoundError:
+                        continue
+        self._manifest = OrderedDict((path, size) for _, size, path in sorted(entries))
+        self._bytes = sum(self._manifest.values())
+
+    def _touch(self, path: str, size: int = None):
+        """ Marks an entry most recently used, adding it (e.g. written by another process) if unknown. Needs the lock. """
+        if path in self._manifest:
+            self._manifest.move_to_end(path)
+            return
+        size = _directory_size(path) if size is None else size
+        self._manifest[path] = size
+        self._bytes += size
+
+    def get(self, key: str, stage: str, config):
+        """ Returns the CacheEntry for (key, stage, config), or None on a miss. """
+        if not self.enabled or not key:
+            return None
+        path = self._entry_path(key, stage, config)
+        if not os.path.isdir(path):
+            with self._lock:
+                self.misses += 1
+                if self._manifest is not None and path in self._manifest:
+                    # Removed behind our back (another process, or an eviction racing a rewrite)
+                    self._bytes -= self._manifest.pop(path)
+            return None
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._scan()
+            self._touch(path)
+            self.hits += 1
+        return CacheEntry(path)
+
+    def put(self, key: str, stage: str, config, data=None, files: dict = None):
+        """
+        Stores a stage result. `files` maps names to existing paths, which are
+        hard-linked (or copied) into the entry. Returns the new CacheEntry.
+        """
+        if not self.enabled or not key:
+            return None
+        path = self._entry_path(key, stage, config)
+        staging = os.path.join(self.root, ".staging", uuid.uuid4().hex)
+        os.makedirs(staging)
+        try:
+            if data is not None:
+                with open(os.path.join(staging, _DATA_FILE), "w", encoding="utf-8") as file:
+                    json.dump(data, file, separators=(",", ":"))
+            for name, src in (files or {}).items():
+                link_or_copy(src, os.path.join(staging, "files", name))
+            # Only the new entry is measured, never the rest of the cache
+            size = _directory_size(staging)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Another job stored the same entry first; keep theirs
+                shutil.rmtree(staging, ignore_errors=True)
+                size = None
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._scan()
+            self._touch(path, size)
+        self.evict()
+        return CacheEntry(path)
+
+    def evict(self) -> list:
+        """ Removes least recently used entries until the cache fits in max_bytes. """
+        with self._lock:
+            self._scan()
+            removed = []
+            while self._bytes > self.max_bytes and self._manifest:
+                path, size = self._manifest.popitem(last=False)
+                self._bytes -= size
+                removed.append(path)
+        # Files are deleted outside the lock so other jobs' lookups and writes do not wait on the disk
+        for path in removed:
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass  # Other stages of this video are still cached
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._scan()
+            entries, total = len(self._manifest), self._bytes
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+artifact_cache = ArtifactCache()
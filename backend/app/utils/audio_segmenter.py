@@ -1,28 +1,29 @@
 import os
-from pydub import AudioSegment
-import whisper
+from app.utils.transcribers import get_transcriber
+from app.utils.llama_segmenter import segment_text_with_llama70b
+from app.utils.alignment import align_chunks_to_segments
+from app.utils.media import cut_segments
 
-def load_transcription_with_timestamps(audio_filepath, model_type="base"):
+def load_transcription_with_timestamps(audio_filepath, model_type=None):
     """
-    Uses Whisper to transcribe audio and get timestamps for each segment.
+    Uses the configured transcriber to get timestamps for each segment.
     """
-    model = whisper.load_model(model_type)
-    result = model.transcribe(audio_filepath, task="transcribe", verbose=True)
+    model = get_transcriber(model_size=model_type)
+    result = model.transcribe(audio_filepath, task="transcribe")
     return result["segments"]
 
 def segment_audio_text_pairs(audio_filepath, transcript_segments, output_folder="segments", max_chunk_duration=15):
     """
     Segments the audio into chunks aligned with transcript segments.
     Each chunk is no longer than max_chunk_duration seconds.
+    All chunks are cut in one ffmpeg run once their ranges are known.
     """
-    # Load audio file
-    audio = AudioSegment.from_wav(audio_filepath)
-    
     # Ensure the output folder exists
     os.makedirs(output_folder, exist_ok=True)
 
-    # List to store audio-text pair metadata
+    # List to store audio-text pair metadata, and the (start, end) seconds of each chunk
     audio_text_pairs = []
+    cut_points = []
 
     for i, segment in enumerate(transcript_segments):
         start_time = segment["start"] * 1000  # Convert to milliseconds
@@ -31,18 +32,16 @@ def segment_audio_text_pairs(audio_filepath, transcript_segments, output_folder=
 
         # If the segment duration is <= max_chunk_duration, save as-is
         if (end_time - start_time) / 1000 <= max_chunk_duration:
-            chunk = audio[start_time:end_time]
             chunk_path = os.path.join(output_folder, f"chunk_{i + 1}.wav")
-            chunk.export(chunk_path, format="wav")
+            cut_points.append((start_time / 1000, end_time / 1000))
             audio_text_pairs.append({"audio_path": chunk_path, "text": text})
         else:
             # Split the segment further if it exceeds max_chunk_duration
             current_start = start_time
             while (end_time - current_start) / 1000 > max_chunk_duration:
                 split_end = current_start + max_chunk_duration * 1000
-                chunk = audio[current_start:split_end]
                 chunk_path = os.path.join(output_folder, f"chunk_{i + 1}_part.wav")
-                chunk.export(chunk_path, format="wav")
+                cut_points.append((current_start / 1000, split_end / 1000))
                 
                 # Split the text approximately in half
                 split_point = len(text) // 2
@@ -53,9 +52,31 @@ def segment_audio_text_pairs(audio_filepath, transcript_segments, output_folder=
                 current_start = split_end
 
             # Handle the final chunk for the remaining audio
-            final_chunk = audio[current_start:end_time]
             final_chunk_path = os.path.join(output_folder, f"chunk_{i + 1}_final.wav")
-            final_chunk.export(final_chunk_path, format="wav")
+            cut_points.append((current_start / 1000, end_time / 1000))
             audio_text_pairs.append({"audio_path": final_chunk_path, "text": text})
 
+    cut_segments(audio_filepath, cut_points, [pair["audio_path"] for pair in audio_text_pairs])
     return audio_text_pairs
+
+def split_audio_by_timestamps(audio_filepath, transcript, output_folder="segments", transcript_segments=None):
+    """
+    Splits audio into chunks based on LLaMA-generated semantic text segments and saves them.
+    Each chunk is cut at the Whisper timestamps its text aligns to; the audio is transcribed
+    here if transcript_segments are not supplied.
+    """
+    # Segment the transcript semantically using LLaMA
+    text_chunks = segment_text_with_llama70b(transcript)
+
+    if transcript_segments is None:
+        transcript_segments = load_transcription_with_timestamps(audio_filepath)
+    timestamps = align_chunks_to_segments(text_chunks, transcript_segments)
+
+    # Cut all chunks in one ffmpeg run
+    chunk_paths = [os.path.join(output_folder, f"chunk_{i + 1}.wav") for i in range(len(text_chunks))]
+    cut_segments(audio_filepath, timestamps, chunk_paths)
+
+    return [
+        {"audio_path": chunk_path, "text": text, "start_time": start_time, "end_time": end_time}
+        for chunk_path, text, (start_time, end_time) in zip(chunk_paths, text_chunks, timestamps)
+    ]
@@ -0,0 +1,133 @@
+import os
+import wave
+import numpy as np
+from app.utils.ffmpeg_runner import ffmpeg
+
+# Whisper works on 16kHz mono float32, so that is the only format we decode to.
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 4  # f32le
+# Transcription windows end at the quietest point within this many seconds of their nominal length.
+VAD_SEARCH_SECONDS = float(os.getenv("VAD_SEARCH_SECONDS", "5"))
+VAD_FRAME_SECONDS = 0.03
+
+
+def probe_duration(source: str) -> float:
+    """
+    Returns the duration of any ffmpeg-readable file in seconds without decoding it.
+    """
+    output = ffmpeg.probe(["-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", source])
+    return float(output.strip())
+
+
+def iter_pcm_blocks(source: str, block_seconds: float = 30.0, start: float = 0.0, duration: float = None):
+    """
+    Decodes `source` through an ffmpeg pipe and yields 16kHz mono float32 blocks.
+    Only one block is held in memory at a time, whatever the length of the input.
+    """
+    inputs = (["-ss", str(start)] if start else []) + ["-i", source]
+    outputs = (["-t", str(duration)] if duration is not None else []) + ["-vn", "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+    block_bytes = int(block_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+    for data in ffmpeg.stream(inputs, outputs, block_bytes):
+        # A short read can only happen at EOF; drop a trailing partial sample if any
+        data = data[:len(data) - len(data) % BYTES_PER_SAMPLE]
+        yield np.frombuffer(data, dtype=np.float32)
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """ Converts float32 samples in [-1, 1] to little-endian 16-bit PCM bytes. """
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def open_wav_writer(path: str):
+    """ Opens a 16kHz mono 16-bit WAV for writing, creating its folder if needed. """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = wave.open(path, "wb")
+    writer.setnchannels(1)
+    writer.setsampwidth(2)
+    writer.setframerate(SAMPLE_RATE)
+    return writer
+
+
+def export_segments(source: str, cut_points: list, output_paths: list, block_seconds: float = 30.0):
+    """
+    Writes each (start, end) range in seconds of `source` to the matching WAV in `output_paths`.
+    The source is decoded once, front to back, and each block is copied into every
+    segment it overlaps, so memory use is bounded by `block_seconds`.
+    """
+    if len(cut_points) != len(output_paths):
+        raise ValueError("cut_points and output_paths must have the same length.")
+
+    order = sorted(range(len(cut_points)), key=lambda i: cut_points[i][0])
+    ranges = [(int(cut_points[i][0] * SAMPLE_RATE), int(cut_points[i][1] * SAMPLE_RATE), output_paths[i]) for i in order]
+    writers = {}
+    next_to_open = 0
+    block_start = 0
+
+    try:
+        for block in iter_pcm_blocks(source, block_seconds=block_seconds):
+            block_end = block_start + len(block)
+
+            # Open every segment that starts inside this block
+            while next_to_open < len(ranges) and ranges[next_to_open][0] < block_end:
+                writers[next_to_open] = open_wav_writer(ranges[next_to_open][2])
+                next_to_open += 1
+
+            for index in list(writers):
+                seg_start, seg_end, _ = ranges[index]
+                lo = max(seg_start, block_start) - block_start
+                hi = min(seg_end, block_end) - block_start
+                if hi > lo:
+                    writers[index].writeframes(to_pcm16(block[lo:hi]))
+                if seg_end <= block_end:
+                    writers.pop(index).close()
+
+            block_start = block_end
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Segments starting past the end of the audio still get a (silent, empty) file
+    for _, _, path in ranges[next_to_open:]:
+        open_wav_writer(path).close()
+
+
+def quietest_cut(samples: np.ndarray, search_samples: int) -> int:
+    """
+    Sample index, within the last `search_samples` of `samples`, at the centre of the
+    frame with the lowest energy: the most likely pause between words.
+    """
+    frame = int(VAD_FRAME_SECONDS * SAMPLE_RATE)
+    tail = samples[len(samples) - search_samples:]
+    frames = len(tail) // frame
+    if frames == 0:
+        return len(samples)
+    energy = np.square(tail[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return len(samples) - len(tail) + int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_speech_windows(source: str, window_seconds: float, search_seconds: float = None):
+    """
+    Yields (offset_seconds, samples) windows of at most `window_seconds` covering `source`.
+    Each window is cut at the quietest frame of its last `search_seconds` instead of at a
+    fixed length, so words are not split between windows. Only about one window is held in memory.
+    """
+    search_seconds = VAD_SEARCH_SECONDS if search_seconds is None else search_seconds
+    window = int(window_seconds * SAMPLE_RATE)
+    search = max(1, int(min(search_seconds, window_seconds / 2) * SAMPLE_RATE))
+    blocks = []
+    buffered = 0
+    offset = 0
+
+    for block in iter_pcm_blocks(source, block_seconds=min(window_seconds, 30.0)):
+        blocks.append(block)
+        buffered += len(block)
+        while buffered >= window:
+            samples = np.concatenate(blocks)
+            cut = quietest_cut(samples[:window], search)
+            yield offset / SAMPLE_RATE, samples[:cut]
+            blocks = [samples[cut:]]
+            buffered = len(samples) - cut
+            offset += cut
+
+    if buffered:
+        yield offset / SAMPLE_RATE, np.concatenate(blocks)
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.artifact_cache import cache_key_for_url
+from app.utils.downloader import list_playlist_entries
+from app.utils.workspace import create_workspace, new_job_id, is_valid_job_id
+
+# Batch manifests (items and their progress) are kept here so a batch can be resumed after a restart.
+BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+# Downloads running at once across all batches.
+BATCH_DOWNLOAD_WORKERS = int(os.getenv("BATCH_DOWNLOAD_WORKERS", "4"))
+# Items downloaded but not yet through the pipeline; bounds how far downloads run ahead of transcription.
+BATCH_MAX_ACTIVE = int(os.getenv("BATCH_MAX_ACTIVE", "8"))
+
+FINISHED_ITEM_STATES = ("completed", "failed")
+
+
+class Batch:
+    """
+    A list of videos ingested together. Items move through pending -> downloading ->
+    queued -> running -> completed / failed; the manifest is rewritten on every change.
+    """
+
+    def __init__(self, batch_id: str, sources: list, segmenter: str = None, root: str = BATCH_DIR):
+        self.batch_id = batch_id
+        self.sources = sources
+        self.segmenter = segmenter
+        self.status = "pending"
+        self.error = None
+        self.items = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self.path = os.path.join(root, f"{batch_id}.json")
+        # In-memory only: live Job objects by item index, and whether a worker is driving the batch
+        self.jobs = {}
+        self.active = False
+        self.lock = threading.Lock()
+
+    def manifest(self) -> dict:
+        return {
+            "batch_id": self.batch_id,
+            "sources": self.sources,
+            "segmenter": self.segmenter,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "items": self.items,
+        }
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.manifest(), indent=2)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+
+    @classmethod
+    def load(cls, path: str) -> "Batch":
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        batch = cls(data["batch_id"], data["sources"], data.get("segmenter"), os.path.dirname(path))
+        batch.status = data["status"]
+        batch.error = data.get("error")
+        batch.created_at = data["created_at"]
+        batch.finished_at = data.get("finished_at")
+        batch.items = data["items"]
+        return batch
+
+    def update_item(self, item: dict, **changes):
+        with self.lock:
+            item.update(changes)
+        self.save()
+
+    def to_dict(self) -> dict:
+        """ Manifest with live job status and stage merged into items that are in the pipeline. """
+        with self.lock:
+            data = self.manifest()
+            items = []
+            for item in self.items:
+                item = dict(item)
+                job = self.jobs.get(item["index"])
+                if job is not None and item["status"] not in FINISHED_ITEM_STATES:
+                    item["status"] = job.status
+                    item["stage"] = job.stage
+                items.append(item)
+        data["items"] = items
+        data["counts"] = {}
+        for item in items:
+            data["counts"][item["status"]] = data["counts"].get(item["status"], 0) + 1
+        return data
+
+
+class BatchManager:
+    """
+    Ingests playlists and URL lists. Playlists are expanded into their videos, downloads run on
+    a bounded pool shared by every batch, and each item is handed to the job pipeline as soon
+    as its download finishes, so transcription of early items overlaps later downloads.
+
+    `download(url, workspace)` returns the audio path; `submit(workspace, url, segmenter, prefetched)`
+    queues the rest of the pipeline and returns its Job.
+    """
+
+    def __init__(self, download, submit, root: str = BATCH_DIR, download_workers: int = BATCH_DOWNLOAD_WORKERS,
+                 max_active: int = BATCH_MAX_ACTIVE):
+        self.download = download
+        self.submit_job = submit
+        self.root = root
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="batch-download")
+        self._active = threading.BoundedSemaphore(max(1, max_active))
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, sources: list, segmenter: str = None) -> Batch:
+        batch = Batch(new_job_id(), [source.strip() for source in sources if source.strip()], segmenter, self.root)
+        batch.active = True
+        batch.save()
+        with self._lock:
+            self._batches[batch.batch_id] = batch
+        self._start(batch)
+        return batch
+
+    def get(self, batch_id: str):
+        if not is_valid_job_id(batch_id):
+            return None
+        with self._lock:
+            if batch_id in self._batches:
+                return self._batches[batch_id]
+        path = os.path.join(self.root, f"{batch_id}.json")
+        if not os.path.exists(path):
+            return None
+        batch = Batch.load(path)
+        with self._lock:
+            return self._batches.setdefault(batch_id, batch)
+
+    def resume(self, batch_id: str):
+        """
+        Restarts every unfinished item of a batch, e.g. after a server restart. Stages an item
+        already finished are restored from the artifact cache instead of being run again.
+        """
+        batch = self.get(batch_id)
+        if batch is None:
+            return None
+        # Checked and set under the lock, so concurrent resumes start only one driver thread
+        with batch.lock:
+            if batch.active:
+                return batch
+            batch.active = True
+            batch.jobs.clear()
+            for item in batch.items:
+                if item["status"] != "completed":
+                    item.update(status="pending", stage=None, error=None)
+        self._start(batch)
+        return batch
+
+    def _start(self, batch: Batch):
+        """ Starts the driver thread of a batch already marked active. """
+        threading.Thread(target=self._run, args=(batch,), name=f"batch-{batch.batch_id[:8]}", daemon=True).start()
+
+    def _run(self, batch: Batch):
+        try:
+            if not batch.items:
+                batch.status = "expanding"
+                batch.save()
+                batch.items = self._expand(batch.sources)
+            batch.status = "running"
+            batch.finished_at = None
+            batch.save()
+
+            pending = [item for item in batch.items if item["status"] == "pending"]
+            if not pending:
+                self._finish_if_done(batch)
+            for item in pending:
+                # Blocks while BATCH_MAX_ACTIVE items are downloaded but not through the pipeline yet
+                self._active.acquire()
+                self._downloads.submit(self._download_item, batch, item)
+        except Exception as e:
+            logging.error(f"Batch {batch.batch_id} failed: {e}", exc_info=True)
+            batch.status = "failed"
+            batch.error = str(e)
+            batch.finished_at = time.time()
+            with batch.lock:
+                batch.active = False
+            batch.save()
+
+    def _expand(self, sources: list) -> list:
+        """ One item per distinct video; playlists are expanded, repeated videos kept once. """
+        items = []
+        seen = set()
+        for source in sources:
+            try:
+                entries = list_playlist_entries(source)
+            except Exception as e:
+                items.append({"index": len(items), "url": source, "title": None, "status": "failed",
+                              "error": f"Could not list {source}: {e}", "job_id": None, "stage": None})
+                continue
+            for entry in entries:
+                key = cache_key_for_url(entry["url"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                items.append({"index": len(items), "url": entry["url"], "title": entry["title"], "status": "pending",
+                              "error": None, "job_id": None, "stage": None})
+        return items
+
+    def _download_item(self, batch: Batch, item: dict):
+        try:
+            workspace = create_workspace()
+            batch.update_item(item, status="downloading", job_id=workspace.job_id)
+            started_at = time.time()
+            audio_path = self.download(item["url"], workspace)
+            prefetched = {"audio_path": audio_path, "started_at": started_at, "finished_at": time.time()}
+            batch.update_item(item, status="queued")
+            job = self.submit_job(workspace, item["url"], batch.segmenter, prefetched)
+        except Exception as e:
+            self._active.release()
+            batch.update_item(item, status="failed", error=str(e))
+            self._finish_if_done(batch)
+            return
+        with batch.lock:
+            batch.jobs[item["index"]] = job
+        job.future.add_done_callback(lambda future: self._item_finished(batch, item, future))
+
+    def _item_finished(self, batch: Batch, item: dict, future):
+        self._active.release()
+        if future.cancelled():
+            batch.update_item(item, status="failed", error="Cancelled", stage=None)
+        elif future.exception() is not None:
+            batch.update_item(item, status="failed", error=str(future.exception()), stage=None)
+        else:
+            batch.update_item(item, status="completed", stage=None, metadata_path=future.result().get("metadata_path"))
+        self._finish_if_done(batch)
+
+    def _finish_if_done(self, batch: Batch):
+        with batch.lock:
+            if any(item["status"] not in FINISHED_ITEM_STATES for item in batch.items):
+                return
+            failed = sum(1 for item in batch.items if item["status"] == "failed")
+            batch.status = "completed" if not failed else "completed_with_errors"
+            batch.finished_at = time.time()
+            batch.active = False
+        batch.save()
+
+    def shutdown(self):
+        self._downloads.shutdown(wait=False, cancel_futures=True)
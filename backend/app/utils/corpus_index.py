@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from app.utils.vector_index import build_index, normalized, VECTOR_INDEX_DIR, VECTOR_INDEX_ANN_THRESHOLD, VECTOR_INDEX_ANN_TYPE
+from app.utils.telemetry import CORPUS_SEARCH_SECONDS
+
+# Cross-video search index, split into shards that are searched in parallel.
+CORPUS_INDEX_DIR = os.getenv("CORPUS_INDEX_DIR", os.path.join(VECTOR_INDEX_DIR, "_corpus"))
+CORPUS_SHARDS = int(os.getenv("CORPUS_SHARDS", str(os.cpu_count() or 1)))
+CORPUS_SEARCH_THREADS = int(os.getenv("CORPUS_SEARCH_THREADS", str(CORPUS_SHARDS)))
+# A shard is rebuilt without its replaced rows once they make up this fraction of it.
+CORPUS_COMPACT_FRACTION = float(os.getenv("CORPUS_COMPACT_FRACTION", "0.25"))
+
+_COLUMNS = ("video", "start", "end", "live", "text_offsets", "text")
+
+
+def _empty_columns() -> dict:
+    return {
+        "video": np.empty(0, np.int32),
+        "start": np.empty(0, np.float64),
+        "end": np.empty(0, np.float64),
+        "live": np.empty(0, np.bool_),
+        "text_offsets": np.zeros(1, np.int64),
+        "text": np.empty(0, np.uint8),
+    }
+
+
+class CorpusShard:
+    """
+    Vectors and row metadata (video, start, end, text) of the videos hashed to one shard.
+    Rows of a re-indexed video are tombstoned and the new rows appended; the shard is
+    compacted once tombstones pile up. Columns are .npy files, memory-mapped on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.videos = []
+        self.digests = {}
+        self.kind = "flat"
+        self.index = None
+        self.columns = _empty_columns()
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            self.videos, self.digests, self.kind = meta["videos"], meta["digests"], meta["kind"]
+            self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _COLUMNS}
+            self.index = faiss.read_index(os.path.join(path, "index.faiss"))
+
+    def __len__(self):
+        return len(self.columns["video"])
+
+    def _vectors(self) -> np.ndarray:
+        if self.index is None or not self.index.ntotal:
+            return np.empty((0, self.index.d if self.index is not None else 0), np.float32)
+        if self.kind == "ivf":
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def _rebuild(self, vectors: np.ndarray, columns: dict):
+        """ Fresh index over only the live rows; video codes are renumbered to the videos still present. """
+        keep = np.flatnonzero(columns["live"])
+        present = sorted(set(columns["video"][keep].tolist()))
+        recode = np.full(len(self.videos), -1, np.int32)
+        recode[present] = np.arange(len(present), dtype=np.int32)
+        offsets = columns["text_offsets"]
+        texts = [columns["text"][offsets[i]:offsets[i + 1]] for i in keep]
+        self.videos = [self.videos[code] for code in present]
+        self.columns = {
+            "video": recode[columns["video"][keep]],
+            "start": np.asarray(columns["start"][keep]),
+            "end": np.asarray(columns["end"][keep]),
+            "live": np.ones(len(keep), np.bool_),
+            "text_offsets": np.concatenate([[0], np.cumsum([len(text) for text in texts], dtype=np.int64)]).astype(np.int64),
+            "text": np.concatenate(texts) if texts else np.empty(0, np.uint8),
+        }
+        self.kind = VECTOR_INDEX_ANN_TYPE if len(keep) > VECTOR_INDEX_ANN_THRESHOLD else "flat"
+        self.index = build_index(np.ascontiguousarray(vectors[keep]), self.kind)
+
+    def put_video(self, video_id: str, digest: str, vectors: np.ndarray, documents: list):
+        """ Replaces the rows of video_id with the given vectors and documents. """
+        with self.lock:
+            columns = {name: np.asarray(values) for name, values in self.columns.items()}
+            if video_id in self.videos:
+                code = self.videos.index(video_id)
+                columns["live"] = columns["live"] & (columns["video"] != code)
+            else:
+                code = len(self.videos)
+                self.videos.append(video_id)
+
+            texts = [document["text"].encode("utf-8") for document in documents]
+            columns = {
+                "video": np.concatenate([columns["video"], np.full(len(documents), code, np.int32)]),
+                "start": np.concatenate([columns["start"], [document.get("start") or 0.0 for document in documents]]),
+                "end": np.concatenate([columns["end"], [document.get("end") or 0.0 for document in documents]]),
+                "live": np.concatenate([columns["live"], np.ones(len(documents), np.bool_)]),
+                "text_offsets": np.concatenate([columns["text_offsets"], columns["text_offsets"][-1] + np.cumsum([len(text) for text in texts], dtype=np.int64)]),
+                "text": np.concatenate([columns["text"], np.frombuffer(b"".join(texts), np.uint8)]),
+            }
+            self.digests[video_id] = digest
+
+            total = len(columns["live"])
+            dead = total - int(columns["live"].sum())
+            crosses_threshold = self.kind == "flat" and total > VECTOR_INDEX_ANN_THRESHOLD
+            if self.index is None or crosses_threshold or dead > CORPUS_COMPACT_FRACTION * total:
+                self._rebuild(np.vstack([self._vectors(), vectors]) if self.index is not None else vectors, columns)
+            else:
+                self.index.add(vectors)
+                self.columns = columns
+            self.save()
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(self.path, "index.faiss.tmp"))
+        os.replace(os.path.join(self.path, "index.faiss.tmp"), os.path.join(self.path, "index.faiss"))
+        for name in _COLUMNS:
+            # np.save appends .npy unless the name already ends with it
+            np.save(os.path.join(self.path, f"{name}.tmp.npy"), self.columns[name])
+            os.replace(os.path.join(self.path, f"{name}.tmp.npy"), os.path.join(self.path, f"{name}.npy"))
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({"videos": self.videos, "digests": self.digests, "kind": self.kind, "count": len(self)}, file)
+
+    def _mask(self, video_ids, start, end):
+        """ Boolean mask of the rows passing the filters, None when every row passes, False when none can. """
+        columns = self.columns
+        mask = None if columns["live"].all() else np.asarray(columns["live"])
+        if video_ids is not None:
+            codes = [self.videos.index(video_id) for video_id in video_ids if video_id in self.digests]
+            if not codes:
+                return False
+            selected = np.isin(columns["video"], codes)
+            mask = selected if mask is None else mask & selected
+        if start is not None:
+            selected = columns["end"] > start
+            mask = selected if mask is None else mask & selected
+        if end is not None:
+            selected = columns["start"] < end
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def search(self, query: np.ndarray, k: int, video_ids=None, start: float = None, end: float = None,
+               min_score: float = None) -> list:
+        """ Up to k (score, hit) pairs of this shard, best first. """
+        # Held for the whole search: FAISS indexes must not be searched while put_video appends to them
+        with self.lock:
+            if self.index is None or not len(self):
+                return []
+            mask = self._mask(video_ids, start, end)
+            if mask is False or (mask is not None and not mask.any()):
+                return []
+
+            params = None
+            if mask is not None:
+                bitmap = np.packbits(mask, bitorder="little")
+                selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+                if self.kind == "hnsw":
+                    params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(64, k))
+                elif self.kind == "ivf":
+                    params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(self.index).nprobe)
+                else:
+                    params = faiss.SearchParameters(sel=selector)
+            elif self.kind == "hnsw":
+                params = faiss.SearchParametersHNSW(efSearch=max(64, k))
+            scores, rows = self.index.search(query, min(k, len(self)), params=params)
+
+            columns = self.columns
+            offsets = columns["text_offsets"]
+            hits = []
+            for score, row in zip(scores[0].tolist(), rows[0].tolist()):
+                if row < 0 or (min_score is not None and score < min_score):
+                    continue
+                hits.append((score, {
+                    "video_id": self.videos[columns["video"][row]],
+                    "start": float(columns["start"][row]),
+                    "end": float(columns["end"][row]),
+                    "text": columns["text"][offsets[row]:offsets[row + 1]].tobytes().decode("utf-8"),
+                    "score": score,
+                }))
+            return hits
+
+
+class CorpusIndex:
+    """
+    Search across every processed video. Videos are assigned to CORPUS_SHARDS shards by a
+    hash of their ID; a query is run on all shards in parallel (FAISS releases the GIL) and
+    the per-shard top hits are merged. Kept in step with the per-video indexes by add_video().
+    """
+
+    def __init__(self, root: str = CORPUS_INDEX_DIR, shards: int = CORPUS_SHARDS, threads: int = CORPUS_SEARCH_THREADS):
+        self.root = root
+        self.shards = [CorpusShard(os.path.join(root, f"shard-{i:03d}")) for i in range(max(1, shards))]
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="corpus-search")
+
+    def shard_for(self, video_id: str) -> CorpusShard:
+        return self.shards[zlib.crc32(video_id.encode("utf-8")) % len(self.shards)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def contains(self, video_id: str, digest: str) -> bool:
+        return self.shard_for(video_id).digests.get(video_id) == digest
+
+    def add_video(self, video_index):
+        """ Adds or replaces a video from its VideoIndex; a no-op when the corpus already has this version. """
+        digest = video_index.meta.get("digest")
+        if self.contains(video_index.video_id, digest):
+            return
+        self.shard_for(video_index.video_id).put_video(video_index.video_id, digest, video_index.vectors(), video_index.documents)
+
+    def sync(self, registry):
+        """ Adds every video of an IndexRegistry that is missing or outdated here, e.g. indexed before the corpus existed. """
+        for video_id in registry.video_ids():
+            if not self.contains(video_id, registry.meta(video_id).get("digest")):
+                self.add_video(registry.get(video_id))
+
+    def search(self, query_vector, limit: int = 10, offset: int = 0, video_ids: list = None,
+               start: float = None, end: float = None, min_score: float = None) -> list:
+        """
+        Hits ({"video_id", "start", "end", "text", "score"}) ranked offset..offset+limit across all
+        videos, optionally limited to some videos, to segments overlapping [start, end) and to a minimum score.
+        """
+        query = normalized(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))
+        k = offset + limit
+        with CORPUS_SEARCH_SECONDS.time():
+            shards = self.shards if video_ids is None else list({id(shard): shard for shard in map(self.shard_for, video_ids)}.values())
+            futures = [self._pool.submit(shard.search, query, k, video_ids, start, end, min_score) for shard in shards]
+            hits = [hit for future in futures for hit in future.result()]
+        hits.sort(key=lambda pair: (-pair[0], pair[1]["video_id"], pair[1]["start"]))
+        return [hit for _, hit in hits[offset:offset + limit]]
+
+
+corpus_index = CorpusIndex()
@@ -1,22 +1,84 @@
 import os
 import yt_dlp
-import subprocess
-import whisper
-import shutil
+from app.utils.transcribers import get_transcriber
+import time
+from app.utils.audio_stream import iter_speech_windows, SAMPLE_RATE
+from app.utils.media import remux_to_mp4, extract_audio
+from app.utils.artifact_cache import extract_video_id
+from app.utils.transcript_store import write_transcript
+from app.utils.telemetry import record_transcription
+from app.utils.transcription_pool import transcription_pool, shift_result, TRANSCRIBE_SHARD_SECONDS
 
-def download_video_and_audio(url, video_output_path="temp/video.mp4", audio_output_path="temp/audio.wav"):
+# Length of audio handed to Whisper at once when transcribing from the ffmpeg stream
+TRANSCRIBE_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_WINDOW_SECONDS", "600"))
+# Word-level timestamps give exact chunk cut points at some extra transcription cost
+WHISPER_WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "false").lower() in ("1", "true", "yes")
+
+def download_audio_only(url, output_folder):
+    """
+    Downloads only the best audio stream and keeps it in its original container.
+    Nothing is re-encoded; consumers decode it on the fly with audio_stream.iter_pcm_blocks.
+    """
+    raw_audio_path = os.path.join(output_folder, "raw_audio")
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': raw_audio_path + '.%(ext)s',
+        'noplaylist': True,  # Do not download playlists
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+
+    for file in os.listdir(output_folder):
+        if file.startswith("raw_audio"):
+            return os.path.join(output_folder, file)
+    raise Exception("Audio download failed.")
+
+def list_playlist_entries(url):
+    """
+    Video URLs (and titles) behind a playlist or channel URL, using yt-dlp's flat extraction
+    so nothing is downloaded. A plain video URL is returned as is, without a network call.
+    """
+    if extract_video_id(url) and "list=" not in url:
+        return [{"url": url, "title": None}]
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'skip_download': True,
+        'quiet': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if info.get("_type") not in ("playlist", "multi_video"):
+        return [{"url": info.get("webpage_url") or url, "title": info.get("title")}]
+    entries = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        entry_url = entry.get("url") or entry.get("webpage_url")
+        if entry.get("id") and not (entry_url or "").startswith("http"):
+            entry_url = f"https://www.youtube.com/watch?v={entry['id']}"
+        entries.append({"url": entry_url, "title": entry.get("title")})
+    return entries
+
+def download_video_and_audio(url, video_output_path, audio_output_path, audio_only=False):
     """
     Downloads the lowest quality video with the best audio from a YouTube video,
-    converts the video to MP4 if necessary, extracts audio using FFmpeg, and saves both files.
+    remuxes it to MP4 if necessary (re-encoding only codecs MP4 cannot hold), extracts audio
+    using FFmpeg, and saves both files.
+    With audio_only=True the video and WAV steps are skipped and (None, <downloaded audio file>) is returned.
+    All files are written next to video_output_path, which should be a per-job workspace.
     """
-    # Ensure the output folder exists
-    output_folder = os.path.dirname(video_output_path)
-    if os.path.exists(output_folder):
-        shutil.rmtree(output_folder)
-    os.makedirs(os.path.dirname(video_output_path), exist_ok=True)
+    # Ensure the output folder exists, clearing leftovers of a previous attempt in this folder only
+    output_folder = os.path.dirname(video_output_path) or "."
+    os.makedirs(output_folder, exist_ok=True)
+    for file in os.listdir(output_folder):
+        if file.startswith(("raw_video", "raw_audio")):
+            os.remove(os.path.join(output_folder, file))
+
+    if audio_only:
+        return None, download_audio_only(url, output_folder)
 
     # Temporary file to download the raw video
-    raw_video_path = "temp/raw_video"
+    raw_video_path = os.path.join(output_folder, "raw_video")
 
     # Step 1: Download the lowest quality video + best audio (merged) in its original format
     ydl_opts = {
@@ -29,76 +91,125 @@ def download_video_and_audio(url, video_output_path="temp/video.mp4", audio_outp
 
     # Detect the actual downloaded video file with its extension
     raw_video_path_with_extension = None
-    for file in os.listdir("temp"):
+    for file in os.listdir(output_folder):
         if file.startswith("raw_video"):
-            raw_video_path_with_extension = os.path.join("temp", file)
+            raw_video_path_with_extension = os.path.join(output_folder, file)
             break
 
     if not raw_video_path_with_extension:
         raise Exception("Video download failed.")
 
-    # Step 2: Convert the raw video to MP4 using FFmpeg if it's not already in MP4 format
+    # Step 2: Move the raw video into an MP4 container if it's not already in MP4 format
     if not raw_video_path_with_extension.endswith(".mp4"):
-        command = f"ffmpeg -i {raw_video_path_with_extension} -c:v libx264 -preset fast -crf 23 -c:a aac {video_output_path}"
-        subprocess.run(command, shell=True, check=True)
+        remux_to_mp4(raw_video_path_with_extension, video_output_path)
         os.remove(raw_video_path_with_extension)  # Clean up the raw video file
     else:
         # If already in MP4 format, just rename it
         os.rename(raw_video_path_with_extension, video_output_path)
 
     # Step 3: Extract the audio from the MP4 video using FFmpeg
-    command = f"ffmpeg -i {video_output_path} -vn -acodec pcm_s16le -ar 44100 -ac 2 {audio_output_path}"
-    subprocess.run(command, shell=True, check=True)
+    extract_audio(video_output_path, audio_output_path)
 
     return video_output_path, audio_output_path
 
-def transcribe_audio(audio_path, model_type="base"):
+def transcribe_audio(audio_path, model_type=None):
     """
-    Transcribes audio using OpenAI's Whisper model.
+    Transcribes audio with the configured transcriber backend.
     """
-    model = whisper.load_model(model_type)  # Load Whisper model (e.g., "base", "small", "large")
-    result = model.transcribe(audio_path)
+    model = get_transcriber(model_size=model_type)  # Shared model (e.g., "base", "small", "large")
+    result = transcribe_stream(model, audio_path)
     transcript = result['text']
     return transcript
-def transcribe_audio_with_timestamps(audio_filepath: str, max_chunk_duration: int = 15):
+
+def iter_transcribed_windows(model, audio_path, window_seconds=None, **transcribe_options):
     """
-    Transcribes audio and aligns text with timestamps, ensuring each chunk is <= max_chunk_duration.
-    Saves the original transcript in the /temp folder.
+    Runs Whisper over the decoded 16kHz stream one pause-bounded window at a time and yields
+    each window's result as soon as it is ready, with timestamps shifted by the window's offset.
+    Memory is bounded by the window length.
     """
-    import json
+    window_seconds = window_seconds or TRANSCRIBE_WINDOW_SECONDS
 
-    model = whisper.load_model("base")  # Load the Whisper model
-    result = model.transcribe(audio_filepath, task="transcribe", verbose=True)
+    for offset, samples in iter_speech_windows(audio_path, window_seconds):
+        started = time.perf_counter()
+        result = model.transcribe(samples, **transcribe_options)
+        record_transcription(len(samples) / SAMPLE_RATE, time.perf_counter() - started)
+        yield shift_result(result, offset)
 
-    # Save the original transcript to a file in the /temp folder
-    original_transcript_path = "temp/transcript_original.json"
-    os.makedirs(os.path.dirname(original_transcript_path), exist_ok=True)
-    with open(original_transcript_path, "w") as transcript_file:
-        json.dump(result, transcript_file, indent=4)
+def iter_transcribed_shards(audio_path, **transcribe_options):
+    """
+    Like iter_transcribed_windows, but runs shorter shards through the multi-process
+    transcription pool when TRANSCRIBE_WORKERS > 1. Results still arrive in audio order.
+    """
+    if not transcription_pool.enabled:
+        yield from iter_transcribed_windows(get_transcriber(), audio_path, **transcribe_options)
+        return
+    windows = iter_speech_windows(audio_path, TRANSCRIBE_SHARD_SECONDS)
+    yield from transcription_pool.transcribe_windows(windows, **transcribe_options)
 
-    # Extract segments with text and timestamps
-    aligned_transcript = []
+def merge_window_result(merged, result):
+    """ Appends one window's result to the merged transcript, renumbering its segments. """
+    if merged["language"] is None:
+        merged["language"] = result.get("language")
+    merged["text"] += result["text"]
     for segment in result["segments"]:
-        start_time = segment["start"]
-        end_time = segment["end"]
-        text = segment["text"].strip()
-
-        # If segment duration exceeds the max_chunk_duration, split it
-        while end_time - start_time > max_chunk_duration:
-            mid_time = start_time + max_chunk_duration
-            aligned_transcript.append({
-                "start": start_time,
-                "end": mid_time,
-                "text": f"{text[:len(text)//2]} (truncated)"
-            })
-            text = text[len(text)//2:]  # Keep splitting the remaining text
-            start_time = mid_time
-
-        # Add the final (or single) chunk
-        aligned_transcript.append({
+        segment["id"] = len(merged["segments"])
+        merged["segments"].append(segment)
+    return result["segments"]
+
+def transcribe_stream(model, audio_path, window_seconds=None, **transcribe_options):
+    """
+    Transcribes audio_path window by window and returns the merged Whisper result.
+    """
+    merged = {"text": "", "segments": [], "language": None}
+    for result in iter_transcribed_windows(model, audio_path, window_seconds, **transcribe_options):
+        merge_window_result(merged, result)
+    return merged
+
+def split_long_segment(segment, max_chunk_duration):
+    """ Splits a Whisper segment into pieces of at most max_chunk_duration seconds. """
+    start_time = segment["start"]
+    end_time = segment["end"]
+    text = segment["text"].strip()
+    pieces = []
+
+    # If segment duration exceeds the max_chunk_duration, split it
+    while end_time - start_time > max_chunk_duration:
+        mid_time = start_time + max_chunk_duration
+        pieces.append({
             "start": start_time,
-            "end": end_time,
-            "text": text
+            "end": mid_time,
+            "text": f"{text[:len(text)//2]} (truncated)"
         })
+        text = text[len(text)//2:]  # Keep splitting the remaining text
+        start_time = mid_time
+
+    # Add the final (or single) chunk
+    pieces.append({
+        "start": start_time,
+        "end": end_time,
+        "text": text
+    })
+    return pieces
 
-    return aligned_transcript
+def iter_transcript_with_timestamps(audio_filepath: str, original_transcript_path: str, max_chunk_duration: int = 15):
+    """
+    Streaming version of transcribe_audio_with_timestamps: yields the aligned chunks of each
+    transcription window as soon as it is decoded, so segmentation can start on early audio.
+    The original transcript is stored with transcript_store at original_transcript_path once the audio is exhausted.
+    """
+    merged = {"text": "", "segments": [], "language": None}
+
+    # Shared in-process transcriber, or one resident model per pool worker
+    for result in iter_transcribed_shards(audio_filepath, task="transcribe", word_timestamps=WHISPER_WORD_TIMESTAMPS):
+        for segment in merge_window_result(merged, result):
+            yield from split_long_segment(segment, max_chunk_duration)
+
+    # Save the original transcript next to the job's other files, as compact memory-mappable columns
+    write_transcript(original_transcript_path, merged["segments"], merged["language"])
+
+def transcribe_audio_with_timestamps(audio_filepath: str, original_transcript_path: str, max_chunk_duration: int = 15):
+    """
+    Transcribes audio and aligns text with timestamps, ensuring each chunk is <= max_chunk_duration.
+    Saves the original transcript to original_transcript_path (the job's workspace).
+    """
+    return list(iter_transcript_with_timestamps(audio_filepath, original_transcript_path, max_chunk_duration))
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.utils.model_registry import model_registry, EMBEDDING_MODEL_NAME
+
+# Texts per forward pass of the SentenceTransformer.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Embeddings kept in the in-memory LRU.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+# Folder of the optional on-disk embedding store (empty disables it).
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")
+
+
+class EmbeddingService:
+    """
+    Batched, cached access to the shared SentenceTransformer.
+    Returns L2-normalised float32 vectors. Every text is keyed by a hash of
+    (model, text), so repeated texts are served from an in-memory LRU or the
+    optional SQLite store and never re-encoded.
+    """
+
+    def __init__(self, model_name: str = None, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 cache_size: int = EMBEDDING_CACHE_SIZE, cache_dir: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name or EMBEDDING_MODEL_NAME
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _store(self):
+        if not self.cache_dir:
+            return None
+        if self._db is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.cache_dir, "embeddings.sqlite"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        return self._db
+
+    def _disk_get(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            db = self._store()
+            if db is None or not keys:
+                return found
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _disk_put(self, items: dict):
+        with self._lock:
+            db = self._store()
+            if db is None or not items:
+                return
+            db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                           [(key, vector.tobytes()) for key, vector in items.items()])
+            db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.cache_size:
+            self._memory.popitem(last=False)
+
+    def encode(self, texts: list) -> np.ndarray:
+        """ Embeds `texts`, returning a (len(texts), dim) float32 array of unit vectors. """
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory and key not in vectors:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+        self.memory_hits += sum(1 for key in keys if key in vectors)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        from_disk = self._disk_get(missing)
+        self.disk_hits += sum(1 for key in keys if key in from_disk)
+        vectors.update(from_disk)
+
+        # Encode each distinct unseen text once, however often it repeats
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                to_encode.setdefault(key, text)
+        self.misses += sum(1 for key in keys if key in to_encode)
+        if to_encode:
+            with model_registry.use("embedding", self.model_name) as model:
+                encoded = model.encode(
+                    list(to_encode.values()),
+                    batch_size=self.batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ).astype(np.float32)
+            new_vectors = dict(zip(to_encode, encoded))
+            vectors.update(new_vectors)
+            self._disk_put(new_vectors)
+        else:
+            new_vectors = {}
+
+        with self._lock:
+            for key, vector in {**from_disk, **new_vectors}.items():
+                self._remember(key, vector)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "cached": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+embedding_service = EmbeddingService()
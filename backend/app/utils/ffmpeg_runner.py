@@ -0,0 +1,112 @@
+import os
+import subprocess
+import tempfile
+import threading
+
+# ffmpeg and ffprobe executables to run; ffprobe defaults to the one next to FFMPEG_BINARY.
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", os.path.join(os.path.dirname(FFMPEG_BINARY), "ffprobe"))
+# ffmpeg/ffprobe processes allowed at once across all jobs; further calls wait for a free slot.
+# At least 2, so one long streaming decode does not hold up every other call.
+FFMPEG_MAX_PROCESSES = int(os.getenv("FFMPEG_MAX_PROCESSES", str(max(2, (os.cpu_count() or 1) // 2))))
+# Seconds an ffmpeg call may run (or, when streaming, wait for its next block) before it is killed.
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "1800"))
+# Threads per ffmpeg process (0 splits the machine's cores evenly between FFMPEG_MAX_PROCESSES).
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0"))
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+class FFmpegRunner:
+    """
+    Runs ffmpeg with argument lists (never through a shell), at most `max_processes` at a time,
+    each with a thread budget and a timeout after which the process is killed.
+    """
+
+    def __init__(self, binary: str = FFMPEG_BINARY, probe_binary: str = FFPROBE_BINARY,
+                 max_processes: int = FFMPEG_MAX_PROCESSES, timeout: float = FFMPEG_TIMEOUT, threads: int = FFMPEG_THREADS):
+        self.binary = binary
+        self.probe_binary = probe_binary
+        self.timeout = timeout
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(1, max_processes))
+        self._slots = threading.BoundedSemaphore(max(1, max_processes))
+
+    def _command(self, inputs: list, outputs: list) -> list:
+        threads = ["-threads", str(self.threads)]
+        return [self.binary, "-nostdin", "-hide_banner", "-v", "error", "-y", *threads, *inputs, *threads, *outputs]
+
+    def run(self, inputs: list, outputs: list, timeout: float = None):
+        """
+        Runs `ffmpeg <inputs> <outputs>`; inputs holds the -i arguments and their options,
+        outputs the output options and paths. Raises FFmpegError on failure or timeout.
+        """
+        command = self._command(inputs, outputs)
+        timeout = self.timeout if timeout is None else timeout
+        with self._slots:
+            try:
+                # subprocess.run kills the process itself when the timeout expires
+                completed = subprocess.run(command, capture_output=True, timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                raise FFmpegError(f"ffmpeg timed out after {timeout:g}s: {' '.join(command)}") from e
+        if completed.returncode != 0:
+            raise FFmpegError(f"ffmpeg failed ({completed.returncode}): {completed.stderr.decode(errors='replace').strip()}")
+
+    def stream(self, inputs: list, outputs: list, block_size: int, timeout: float = None):
+        """
+        Runs ffmpeg with `outputs` ending in pipe:1 and yields its output in blocks of block_size
+        bytes (only the last may be shorter). The slot is held until the generator is exhausted
+        or closed. The consumer may take as long as it likes between blocks, so the timeout
+        bounds each wait for the next block rather than the whole run.
+        """
+        command = self._command(inputs, outputs)
+        timeout = self.timeout if timeout is None else timeout
+        timed_out = threading.Event()
+
+        def kill(process):
+            timed_out.set()
+            process.kill()
+
+        # stderr goes to a file rather than a pipe, which a chatty ffmpeg could fill and block on
+        with self._slots, tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+            finished = False
+            try:
+                while True:
+                    watchdog = threading.Timer(timeout, kill, (process,))
+                    watchdog.start()
+                    try:
+                        data = process.stdout.read(block_size)
+                    finally:
+                        watchdog.cancel()
+                    if timed_out.is_set():
+                        raise FFmpegError(f"ffmpeg produced no output for {timeout:g}s: {' '.join(command)}")
+                    if not data:
+                        break
+                    yield data
+                finished = True
+            finally:
+                process.stdout.close()
+                if not finished:
+                    process.kill()
+                process.wait()
+            if process.returncode != 0:
+                stderr.seek(0)
+                raise FFmpegError(f"ffmpeg failed ({process.returncode}): {stderr.read().decode(errors='replace').strip()}")
+
+    def probe(self, arguments: list, timeout: float = None) -> str:
+        """ Runs `ffprobe <arguments>` in a slot and returns its standard output. """
+        command = [self.probe_binary, "-v", "error", *arguments]
+        timeout = self.timeout if timeout is None else timeout
+        with self._slots:
+            try:
+                completed = subprocess.run(command, capture_output=True, timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                raise FFmpegError(f"ffprobe timed out after {timeout:g}s: {' '.join(command)}") from e
+        if completed.returncode != 0:
+            raise FFmpegError(f"ffprobe failed ({completed.returncode}): {completed.stderr.decode(errors='replace').strip()}")
+        return completed.stdout.decode(errors="replace")
+
+
+ffmpeg = FFmpegRunner()
@@ -1,63 +1,115 @@
 import os
-import json
 import re
-from groq import Groq
+import asyncio
 from typing import List
-from sentence_transformers import SentenceTransformer
-import faiss  # Vector database for retrieval
+from app.utils.embeddings import embedding_service
+from app.utils.timestamp_index import TimestampIndexCache
+from app.utils.transcript_store import open_transcript
+from app.utils.vector_index import index_registry
+from app.utils.corpus_index import corpus_index
+from app.utils.llm_executor import llm_executor
+from app.utils.telemetry import instrumented, GROQ_CLIENT_SECONDS, TIMESTAMP_LOOKUP_SECONDS
+
+# Chat model used for answers and summaries
+LLM_MODEL = "llama-3.2-11b-vision-preview"
+# Ask for the answer and its summary in one completion instead of two
+LLM_COMBINED_SUMMARY = os.getenv("LLM_COMBINED_SUMMARY", "true").lower() in ("1", "true", "yes")
+SUMMARY_MARKER = "SUMMARY:"
+NO_CONTEXT_RESPONSE = "I'm sorry, I couldn't find relevant information in the provided document."
+_WHITESPACE = re.compile(r"\s")
+
+
+class ResponseStreamFormatter:
+    """
+    Applies a formatter such as GroqClient.format_response to a token stream.
+    Text is held back until the next whitespace, so URLs and markdown split across
+    deltas are cleaned exactly as in the full response; words are joined by single spaces.
+    """
+
+    def __init__(self, formatter):
+        self.formatter = formatter
+        self.pending = ""
+        self.started = False
+
+    def _emit(self, piece: str) -> str:
+        text = self.formatter(piece)
+        if not text:
+            return ""
+        text = (" " if self.started else "") + text
+        self.started = True
+        return text
+
+    def feed(self, delta: str) -> str:
+        """ Adds a delta and returns the formatted text that is now final (possibly empty). """
+        self.pending += delta
+        cut = max((match.end() for match in _WHITESPACE.finditer(self.pending)), default=0)
+        if not cut:
+            return ""
+        piece, self.pending = self.pending[:cut], self.pending[cut:]
+        return self._emit(piece)
+
+    def flush(self) -> str:
+        piece, self.pending = self.pending, ""
+        return self._emit(piece)
+
 
 class GroqClient:
-    def __init__(self):
-        self.client = Groq()
-        self.temp_dir = "temp"
-        os.makedirs(self.temp_dir, exist_ok=True)
-
-        # Initialize the embedding model and FAISS index
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.index = faiss.IndexFlatL2(384)
-        self.documents = []
-        self.transcript_data = self.load_transcript()
-
-    def load_transcript(self) -> dict:
-        """ Load transcript JSON file if available. """
-        transcript_path = os.path.join(self.temp_dir, "transcript_original.json")
-        if os.path.exists(transcript_path):
-            with open(transcript_path, "r", encoding="utf-8") as file:
-                return json.load(file)
-        return {"segments": []}
-    def add_documents(self, docs: List[str]):
-        embeddings = self.embedding_model.encode(docs)
-        self.index.add(embeddings)
-        self.documents.extend(docs)
-
-    def load_documents_from_json(self, file_path: str):
+    def __init__(self, transcript_path: str = None, video_id: str = None):
+        # All completions go through the process-wide LLM executor and its pooled HTTP client
+        self.llm = llm_executor
+
+        # One persistent FAISS index per video; embeddings are batched and cached process-wide.
+        # Retrieval without an explicit video uses the most recently loaded one.
+        self.indexes = index_registry
+        # Every indexed video is mirrored into the sharded cross-video search index
+        self.corpus = corpus_index
+        self.embeddings = embedding_service
+        self.timestamp_indexes = TimestampIndexCache()
+        self.active_video_id = video_id or self.indexes.latest_video_id()
+        self.transcript = self.load_transcript(transcript_path)
+
+    def load_transcript(self, transcript_path: str = None):
+        """
+        Opens a job workspace's stored transcript if given and present (memory-mapped,
+        nothing is parsed up front); there is no shared default location.
+        """
+        if transcript_path and os.path.exists(transcript_path):
+            return open_transcript(transcript_path)
+        return None
+
+    @instrumented("groq.index", GROQ_CLIENT_SECONDS.labels("index"))
+    def load_documents_from_transcript(self, file_path: str, video_id: str = None):
+        """
+        Indexes the transcript segments of one video, replacing any older index of it.
+        An index built from the same segments is reused without re-embedding, and one built
+        from a prefix of them is extended in place.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            if "segments" in data:
-                docs = [segment["text"] for segment in data["segments"] if "text" in segment]
-                self.add_documents(docs)
-            else:
-                raise ValueError("JSON file does not contain 'segments' key.")
-
-    def retrieve_context(self, query: str, top_k: int = 5) -> List[str]:
-        query_embedding = self.embedding_model.encode([query])
-        distances, indices = self.index.search(query_embedding, top_k)
-        return [self.documents[i] for i in indices[0] if i < len(self.documents)]
-
-    def query_llm(self, user_message: str):
-        retrieved_docs = self.retrieve_context(user_message)
-        retrieved_text = "\n\n".join(retrieved_docs)
+        transcript = open_transcript(file_path)
+        video_id = video_id or self.active_video_id or "default"
+        docs = [
+            {"text": text, "start": start, "end": end}
+            for text, start, end in zip(transcript.texts(), transcript.starts.tolist(), transcript.ends.tolist())
+        ]
+        # Unchanged segments reuse the stored index; a grown transcript only embeds its new segments
+        video_index = self.indexes.update(video_id, docs, self.embeddings.encode)
+        self.corpus.add_video(video_index)
+        # Retrieval and timestamp lookups follow the most recently processed transcript
+        self.active_video_id = video_id
+        self.transcript = transcript
+        self._timestamp_index(video_id)
 
-        if not retrieved_docs:
-            return {
-                "response": "I'm sorry, I couldn't find relevant information in the provided document.",
-                "summary": "No relevant information found.",
-                "source": "No relevant source found."
-            }
+    @instrumented("groq.retrieve", GROQ_CLIENT_SECONDS.labels("retrieve"))
+    def retrieve_context(self, query: str, top_k: int = 5, video_id: str = None) -> List[str]:
+        video_index = self.indexes.get(video_id or self.active_video_id)
+        if video_index is None:
+            return []
+        query_embedding = self.embeddings.encode([query])
+        return [document["text"] for document, _ in video_index.search(query_embedding, top_k)[0]]
 
+    def _answer_prompt(self, user_message: str, retrieved_text: str, with_summary: bool = False) -> str:
         prompt = f"""
         You are an AI assistant providing structured, high-quality responses.
         - Context is provided below.
@@ -73,34 +125,15 @@ class GroqClient:
 
         **Query:** {user_message}
         """
+        if with_summary:
+            prompt += f"""
+        After the answer, write a line starting with "{SUMMARY_MARKER}" followed by a summary of your answer
+        in a **single paragraph**, without bullet points or URLs, preserving key facts and important details.
+        """
+        return prompt
 
-        completion = self.client.chat.completions.create(
-            model="llama-3.2-11b-vision-preview",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.6,
-            max_tokens=1024,
-            top_p=0.9,
-            stream=False
-        )
-
-        full_response = completion.choices[0].message.content.strip()
-        source = self.extract_source(full_response)
-        summary = self.clean_summary(self.generate_summary(full_response))
-
-        return {
-            "response": full_response,
-            "summary": summary,
-            "source": source
-        }
-
-    def extract_source(self, text: str):
-        urls = re.findall(r'https?://[^\s()]+', text)
-        if urls:
-            return urls[0].strip("()")
-        return "No relevant source found."
-
-    def generate_summary(self, text: str):
-        summary_prompt = f"""
+    def _summary_prompt(self, text: str) -> str:
+        return f"""
         Summarize the following text in bullet points.
 
         **Text to summarize:** {text[:2000]}
@@ -114,16 +147,109 @@ class GroqClient:
         Summary:
         """
 
-        summary_completion = self.client.chat.completions.create(
-            model="llama-3.2-11b-vision-preview",
-            messages=[{"role": "user", "content": summary_prompt}],
-            temperature=0.6,
-            max_tokens=500,
-            top_p=0.9,
-            stream=False
-        )
+    def _completion_params(self, prompt: str, max_tokens: int) -> dict:
+        return {
+            "model": LLM_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.6,
+            "max_tokens": max_tokens,
+            "top_p": 0.9,
+            "stream": False,
+        }
+
+    @instrumented("groq.query", GROQ_CLIENT_SECONDS.labels("query"))
+    async def aquery_llm(self, user_message: str, combined: bool = False, video_id: str = None, summarize: bool = True,
+                         lane: str = "background"):
+        """
+        Async version of query_llm; must run on the executor loop.
+        With combined=True the answer and its summary come from a single completion;
+        with summarize=False no summary is requested at all.
+        Context is retrieved from video_id's index (default: the active video).
+        lane is "interactive" for user-facing answers, so they do not wait behind ingest.
+        """
+        retrieved_docs = await asyncio.to_thread(self.retrieve_context, user_message, 5, video_id)
+        retrieved_text = "\n\n".join(retrieved_docs)
+
+        if not retrieved_docs:
+            return {
+                "response": NO_CONTEXT_RESPONSE,
+                "summary": "No relevant information found.",
+                "source": "No relevant source found."
+            }
+
+        combined = combined and summarize
+        prompt = self._answer_prompt(user_message, retrieved_text, with_summary=combined)
+        full_response = await self.llm.complete(lane, **self._completion_params(prompt, 1024 + (500 if combined else 0)))
+
+        summary = None
+        if combined and SUMMARY_MARKER in full_response:
+            full_response, summary = (part.strip() for part in full_response.rsplit(SUMMARY_MARKER, 1))
+        if not summarize:
+            summary = ""
+        elif not summary:
+            # Separate call when not combined, or when the model ignored the summary instruction
+            summary = await self.agenerate_summary(full_response, lane)
+
+        return {
+            "response": full_response,
+            "summary": self.clean_summary(summary),
+            "source": self.extract_source(full_response)
+        }
+
+    def query_llm(self, user_message: str, combined: bool = False, video_id: str = None, summarize: bool = True,
+                  lane: str = "background"):
+        return self.llm.run(self.aquery_llm(user_message, combined, video_id, summarize, lane))
+
+    async def astream_answer(self, user_message: str, video_id: str = None):
+        """
+        Yields the raw answer to user_message as content deltas, without a summary.
+        Must run on the executor loop; other loops iterate it through self.llm.relay().
+        """
+        retrieved_docs = await asyncio.to_thread(self.retrieve_context, user_message, 5, video_id)
+        if not retrieved_docs:
+            yield NO_CONTEXT_RESPONSE
+            return
+        prompt = self._answer_prompt(user_message, "\n\n".join(retrieved_docs))
+        async for delta in self.llm.stream("interactive", **self._completion_params(prompt, 1024)):
+            yield delta
+
+    @instrumented("groq.summarize_segments", GROQ_CLIENT_SECONDS.labels("summarize_segments"))
+    def summarize_segments(self, texts: List[str], combined: bool = None, on_progress=None, video_id: str = None) -> List[dict]:
+        """
+        Runs query_llm for every text concurrently, bounded by the executor's limits.
+        Results keep the order of `texts`; on_progress(done, total) is called as each finishes.
+        """
+        combined = LLM_COMBINED_SUMMARY if combined is None else combined
+        # Embed every query in one batched pass; each retrieval below is then a cache hit
+        self.embeddings.encode(texts)
+
+        async def run_all():
+            done = 0
 
-        return summary_completion.choices[0].message.content.strip()
+            async def one(text):
+                nonlocal done
+                result = await self.aquery_llm(text, combined, video_id)
+                done += 1
+                if on_progress:
+                    on_progress(done, len(texts))
+                return result
+
+            return await asyncio.gather(*(one(text) for text in texts))
+
+        return self.llm.run(run_all())
+
+    def extract_source(self, text: str):
+        urls = re.findall(r'https?://[^\s()]+', text)
+        if urls:
+            return urls[0].strip("()")
+        return "No relevant source found."
+
+    @instrumented("groq.summary", GROQ_CLIENT_SECONDS.labels("summary"))
+    async def agenerate_summary(self, text: str, lane: str = "background"):
+        return await self.llm.complete(lane, **self._completion_params(self._summary_prompt(text), 500))
+
+    def generate_summary(self, text: str):
+        return self.llm.run(self.agenerate_summary(text))
 
     def clean_summary(self, summary: str) -> str:
         cleaned_summary = re.sub(r"<think>.*?</think>", "", summary, flags=re.DOTALL).strip()
@@ -143,27 +269,30 @@ class GroqClient:
         response = re.sub(r'https?://[^\s]+', "", response)
         return response
     
-    def find_timestamps(self, user_message: str) -> tuple[float, float]:
+    def _timestamp_index(self, video_id: str = None):
         """
-        Finds the timestamps (start and end times) of the transcript segment that best matches the user's query.
+        Timestamp index of a video, built from the segments stored with its vector index
+        so it follows newly processed videos. Falls back to the transcript loaded at startup.
         """
-        if not self.transcript_data or "segments" not in self.transcript_data:
-            return 0.0, 0.0  # Default values if no transcript is available
-
-        best_match = None
-        highest_overlap = 0
-
-        for segment in self.transcript_data["segments"]:
-            segment_text = segment["text"].lower()
-            query_text = user_message.lower()
-
-            # Simple substring match to check if query is part of the segment
-            overlap = len(set(query_text.split()) & set(segment_text.split()))
+        video_id = video_id or self.active_video_id
+        video_index = self.indexes.get(video_id) if video_id else None
+        if video_index is not None:
+            return self.timestamp_indexes.get(video_id, video_index.meta.get("digest"), lambda: video_index.documents)
+        transcript = self.transcript
+        return self.timestamp_indexes.get("", id(transcript), lambda: transcript.segments() if transcript else [])
 
-            if overlap > highest_overlap:
-                highest_overlap = overlap
-                best_match = segment
+    @instrumented("groq.find_timestamps", TIMESTAMP_LOOKUP_SECONDS)
+    def find_time_ranges(self, user_message: str, top_k: int = 3, video_id: str = None) -> List[dict]:
+        """
+        Ranked transcript time ranges ({"start", "end", "text", "score"}) matching the user's query.
+        """
+        return self._timestamp_index(video_id).search(user_message, top_k)
 
-        if best_match:
-            return best_match["start"], best_match["end"]
-        return 0.0, 0.0  # Default if no match found
\ No newline at end of file
+    def find_timestamps(self, user_message: str, video_id: str = None) -> tuple[float, float]:
+        """
+        Finds the timestamps (start and end times) of the transcript segment that best matches the user's query.
+        """
+        ranges = self.find_time_ranges(user_message, 1, video_id)
+        if ranges:
+            return ranges[0]["start"], ranges[0]["end"]
+        return 0.0, 0.0  # Default if no match found
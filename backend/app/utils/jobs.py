@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from app.utils.telemetry import timed, PIPELINE_STAGE_SECONDS, PIPELINE_JOBS
+
+# Pipeline stages in execution order, as reported by the status endpoint.
+STAGES = ["download", "transcribe", "segment", "split", "summarize"]
+
+# Total number of jobs that may run at once.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Per-stage caps so e.g. several downloads can overlap a single CPU-bound Whisper pass.
+DEFAULT_STAGE_LIMITS = {
+    "download": 4,
+    "transcribe": 1,
+    "segment": 4,
+    "split": 2,
+    "summarize": 2,
+}
+STAGE_LIMITS = {
+    stage: int(os.getenv(f"STAGE_LIMIT_{stage.upper()}", str(limit)))
+    for stage, limit in DEFAULT_STAGE_LIMITS.items()
+}
+# Finished jobs kept in memory for status polling.
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+
+
+class Job:
+    """
+    State of one submitted job. Mutated only by the worker running it.
+    """
+
+    def __init__(self, job_id: str, manager: "JobManager"):
+        self.job_id = job_id
+        self.status = "queued"
+        self.stage = None
+        self.stages = {name: {"status": "pending", "progress": 0.0, "started_at": None, "finished_at": None} for name in STAGES}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._manager = manager
+
+    @contextmanager
+    def run_stage(self, name: str):
+        """
+        Runs a block as pipeline stage `name`, waiting for a free slot in that stage's limit.
+        """
+        info = self.stages.setdefault(name, {"status": "pending", "progress": 0.0, "started_at": None, "finished_at": None})
+        info["status"] = "waiting"
+        self.stage = name
+        with self._manager.stage_slot(name):
+            info["status"] = "running"
+            info["started_at"] = time.time()
+            try:
+                with timed(f"pipeline.{name}", PIPELINE_STAGE_SECONDS.labels(name), job_id=self.job_id):
+                    yield self
+            except Exception:
+                info["status"] = "failed"
+                raise
+            finally:
+                info["finished_at"] = time.time()
+        info["status"] = "done"
+        info["progress"] = 1.0
+
+    def record_stage(self, name: str, started_at: float, finished_at: float):
+        """ Marks stage `name` as done by work that ran before the job was queued (e.g. a batch download). """
+        self.stages[name].update(status="done", progress=1.0, started_at=started_at, finished_at=finished_at)
+        PIPELINE_STAGE_SECONDS.labels(name).observe(finished_at - started_at)
+
+    def set_progress(self, stage: str, fraction: float):
+        self.stages[stage]["progress"] = max(0.0, min(1.0, fraction))
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded thread pool so the event loop never blocks on
+    yt-dlp, ffmpeg, Whisper or Groq. Each stage has its own concurrency limit.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, stage_limits: dict = None, history: int = JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.stage_limits = dict(stage_limits or STAGE_LIMITS)
+        self._semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in self.stage_limits.items()}
+        self._jobs = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage_slot(self, stage: str):
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+    def submit(self, job_id: str, func, *args, **kwargs) -> Job:
+        """
+        Queues func(job, *args, **kwargs). Its return value becomes the job result.
+        """
+        job = Job(job_id, self)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job: Job, func, args, kwargs):
+        job.status = "running"
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = "completed"
+            return job.result
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            raise
+        finally:
+            job.stage = None
+            job.finished_at = time.time()
+            PIPELINE_JOBS.labels(job.status).inc()
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the history is full
+        excess = len(self._jobs) - self._history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status in ("completed", "failed"):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def shutdown(self, wait: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
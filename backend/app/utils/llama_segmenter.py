@@ -1,18 +1,18 @@
-from typing import List
+from typing import Iterable, List
 from pydantic import BaseModel
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 import os
-from groq import Groq
-from dotenv import load_dotenv
-# Load environment variables from .env file
-load_dotenv()
+from app.utils.llm_executor import llm_executor
+from app.utils.telemetry import instrumented, GROQ_CLIENT_SECONDS
 
-# Access the GROQ_API_KEY
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY is not set. Please check your .env file.")
-
-# Initialize the Groq client with the API key
-client = Groq(api_key=api_key)
+# Model used to find chunk boundaries
+SEGMENT_MODEL = "llama-3.2-11b-vision-preview"
+# Long transcripts are segmented in overlapping windows of this many words (~1.3 tokens per word),
+# keeping each echoed window well inside max_completion_tokens.
+SEGMENT_WINDOW_WORDS = int(os.getenv("SEGMENT_WINDOW_WORDS", "1500"))
+SEGMENT_WINDOW_OVERLAP_WORDS = int(os.getenv("SEGMENT_WINDOW_OVERLAP_WORDS", "200"))
+SEGMENT_MAX_WORKERS = int(os.getenv("SEGMENT_MAX_WORKERS", "4"))
 
 # Data models for handling segments
 class Segment(BaseModel):
@@ -21,6 +21,7 @@ class Segment(BaseModel):
     end_time: float
 
 
+@instrumented("llm.segment", GROQ_CLIENT_SECONDS.labels("segment"))
 def segment_text_with_llama70b(input_text: str, max_chunk_duration: float = 15.0) -> List[str]:
     """
     Segments the given text using the LLaMA model.
@@ -33,8 +34,9 @@ def segment_text_with_llama70b(input_text: str, max_chunk_duration: float = 15.0
         "Do not include anything else in your response. Only provide the chunks."
     )
 
-    completion = client.chat.completions.create(
-        model="llama-3.2-11b-vision-preview",
+    # Shares the executor's connection pool, rate limit, retries and response cache with summarization
+    response = llm_executor.run(llm_executor.complete(
+        model=SEGMENT_MODEL,
         messages=[
             {"role": "system", "content": system_message},
             {"role": "user", "content": f"Segment this text:\n\n{input_text}"},
@@ -43,9 +45,7 @@ def segment_text_with_llama70b(input_text: str, max_chunk_duration: float = 15.0
         max_completion_tokens=4096,
         top_p=0.95,
         stream=False,
-    )
-
-    response = completion.choices[0].message.content.strip()
+    ))
 
     # Ensure the response is not empty
     if not response:
@@ -58,3 +58,126 @@ def segment_text_with_llama70b(input_text: str, max_chunk_duration: float = 15.0
     except Exception as e:
         print("Failed to parse response:", repr(response))
         raise ValueError("The model returned an invalid response format.") from e
+
+
+def window_end(word_counts: List[int], start: int, window_words: int):
+    """
+    End index of the window starting at `start`: the first point where it holds at least
+    window_words words. None while the known segments are not enough to fill it.
+    """
+    end = start
+    words = 0
+    while end < len(word_counts) and (words < window_words or end == start):
+        words += word_counts[end]
+        end += 1
+    return end if words >= window_words else None
+
+
+def next_window_start(word_counts: List[int], start: int, end: int, overlap_words: int) -> int:
+    """ Steps back from `end` until the overlap is large enough, but always makes progress. """
+    next_start = end
+    overlap = 0
+    while next_start - 1 > start and overlap < overlap_words:
+        next_start -= 1
+        overlap += word_counts[next_start]
+    return max(next_start, start + 1)
+
+
+def build_windows(word_counts: List[int], window_words: int, overlap_words: int) -> List[tuple]:
+    """
+    Groups consecutive transcript segments into (start, end) index windows of about
+    window_words words. Windows only break on segment boundaries, and each window
+    starts far enough back to share at least overlap_words words with the previous one.
+    """
+    windows = []
+    start = 0
+    while start < len(word_counts):
+        end = window_end(word_counts, start, window_words) or len(word_counts)
+        windows.append((start, end))
+        if end >= len(word_counts):
+            break
+        start = next_window_start(word_counts, start, end, overlap_words)
+    return windows
+
+
+def chunk_start_segments(word_counts: List[int], chunks: List[str]) -> List[int]:
+    """
+    Maps the chunks returned for a window back onto that window's segments.
+    Each chunk's starting word position (rescaled, since the model may not echo the text
+    word for word) is snapped to the nearest segment boundary. Returns relative indices.
+    """
+    boundaries = [0]
+    for count in word_counts:
+        boundaries.append(boundaries[-1] + count)
+    total_words = boundaries[-1]
+    chunk_words = [len(chunk.split()) for chunk in chunks]
+    total_chunk_words = sum(chunk_words) or 1
+
+    starts = []
+    position = 0
+    for words in chunk_words:
+        target = position * total_words / total_chunk_words
+        i = bisect_left(boundaries, target)
+        if i > 0 and (i == len(boundaries) or target - boundaries[i - 1] <= boundaries[i] - target):
+            i -= 1
+        starts.append(min(i, len(word_counts) - 1))
+        position += words
+    return sorted(set(starts))
+
+
+def segment_transcript_windowed(segments: Iterable[dict], window_words: int = None, overlap_words: int = None,
+                                max_workers: int = None) -> List[str]:
+    """
+    Map-reduce segmentation for transcripts of any length.
+    Map: overlapping windows aligned to Whisper segment boundaries are segmented in parallel.
+    `segments` may be a generator (a transcription still in progress); every window is sent
+    to the model as soon as its segments have arrived, producing the same windows as build_windows.
+    Reduce: every window owns the boundaries between the midpoints of its overlaps with its
+    neighbours, so stitching is deterministic and each chunk is a run of whole segments.
+    """
+    window_words = window_words or SEGMENT_WINDOW_WORDS
+    overlap_words = SEGMENT_WINDOW_OVERLAP_WORDS if overlap_words is None else overlap_words
+    kept = []
+    word_counts = []
+    windows = []
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers or SEGMENT_MAX_WORKERS) as pool:
+        def submit(start, end):
+            windows.append((start, end))
+            text = " ".join(segment["text"].strip() for segment in kept[start:end])
+            futures.append(pool.submit(segment_text_with_llama70b, text))
+
+        start = 0
+        for segment in segments:
+            if not segment["text"].strip():
+                continue
+            kept.append(segment)
+            word_counts.append(len(segment["text"].split()))
+            end = window_end(word_counts, start, window_words)
+            while end is not None:
+                submit(start, end)
+                start = next_window_start(word_counts, start, end, overlap_words)
+                # A window reaching the newest segment is the last one unless more segments arrive
+                end = window_end(word_counts, start, window_words) if end < len(kept) else None
+
+        if not kept:
+            return []
+        if not windows or windows[-1][1] < len(kept):
+            submit(start, len(kept))
+        window_chunks = [future.result() for future in futures]
+
+    chunk_starts = set()
+    for k, ((start, end), chunks) in enumerate(zip(windows, window_chunks)):
+        own_start = (start + windows[k - 1][1]) // 2 if k > 0 else 0
+        own_end = (windows[k + 1][0] + end) // 2 if k + 1 < len(windows) else len(kept)
+        for relative in chunk_start_segments(word_counts[start:end], chunks):
+            if own_start <= start + relative < own_end:
+                chunk_starts.add(start + relative)
+    chunk_starts.add(0)
+
+    ordered = sorted(chunk_starts) + [len(kept)]
+    return [
+        " ".join(segment["text"].strip() for segment in kept[a:b])
+        for a, b in zip(ordered, ordered[1:])
+    ]
@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+import httpx
+from dotenv import load_dotenv
+from groq import AsyncGroq
+from app.utils.telemetry import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_RESPONSE_CACHE, record_llm_usage
+
+# Load GROQ_API_KEY and friends from .env
+load_dotenv()
+
+# Maximum number of background (ingest: segmentation, summaries) chat completions in flight at once, across all jobs.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Sustained background request rate allowed by the token bucket and its burst size. 0 disables rate
+# limiting; set it to your provider tier's limit (e.g. 0.5 for 30 requests per minute) to avoid 429s.
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "0"))
+LLM_BURST = int(os.getenv("LLM_BURST", "8"))
+# Interactive (/chat) completions get their own slots and bucket, so answers never queue behind ingest.
+LLM_INTERACTIVE_MAX_CONCURRENCY = int(os.getenv("LLM_INTERACTIVE_MAX_CONCURRENCY", "4"))
+LLM_INTERACTIVE_REQUESTS_PER_SECOND = float(os.getenv("LLM_INTERACTIVE_REQUESTS_PER_SECOND", "0"))
+LLM_INTERACTIVE_BURST = int(os.getenv("LLM_INTERACTIVE_BURST", "4"))
+# Retries for 429/5xx/connection errors, with exponential backoff starting at LLM_BACKOFF_BASE seconds.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+# OpenAI-compatible endpoint to talk to (default: Groq); point it at a local stand-in for tests.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# Pooled HTTP connections shared by every completion, kept alive between calls.
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", str(LLM_MAX_CONCURRENCY + LLM_INTERACTIVE_MAX_CONCURRENCY)))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+# Multiplex completions over one HTTP/2 connection (needs the h2 package).
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+# Completed responses kept per (model, messages, parameters); 0 disables the response cache.
+LLM_RESPONSE_CACHE_SIZE = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", "1024"))
+
+
+class TokenBucket:
+    """
+    Async token bucket. Only used from the executor's own event loop, so it needs no locking.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def is_retryable(error: Exception) -> bool:
+    """ 429s, 5xx responses and transport failures are worth retrying; other errors are not. """
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(error).__name__
+    return "Connection" in name or "Timeout" in name
+
+
+def create_llm_client() -> AsyncGroq:
+    """
+    Groq SDK client on a pooled keep-alive httpx client. Retries are handled by the
+    executor, so the SDK's own retry loop is disabled.
+    """
+    try:
+        http_client = httpx.AsyncClient(
+            http2=LLM_HTTP2,
+            limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+                                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+        )
+    except ImportError as e:
+        raise ImportError("LLM_HTTP2=true requires the h2 package (pip install 'httpx[http2]').") from e
+    return AsyncGroq(base_url=GROQ_BASE_URL, max_retries=0, http_client=http_client)
+
+
+def request_key(params: dict) -> str:
+    """ Stable key of a completion request: model, messages and every sampling parameter. """
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def retry_after(error: Exception):
+    """ Seconds requested by a Retry-After header on the error's response, if any. """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncLLMExecutor:
+    """
+    Runs chat completions on a dedicated event loop thread with bounded concurrency,
+    token-bucket rate limits and retry with exponential backoff. Requests run in one of two
+    lanes, "background" and "interactive", each with its own slots and bucket.
+    Identical requests already in flight are joined rather than sent twice, and finished
+    responses are served from an LRU cache.
+    Sync callers (job workers and request handlers via the thread pool) use run(); async
+    callers consume streamed completions through relay().
+    """
+
+    def __init__(self, client_factory=create_llm_client, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_second: float = LLM_REQUESTS_PER_SECOND, burst: int = LLM_BURST,
+                 interactive_max_concurrency: int = LLM_INTERACTIVE_MAX_CONCURRENCY,
+                 interactive_requests_per_second: float = LLM_INTERACTIVE_REQUESTS_PER_SECOND,
+                 interactive_burst: int = LLM_INTERACTIVE_BURST,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_BACKOFF_BASE,
+                 backoff_max: float = LLM_BACKOFF_MAX, cache_size: int = LLM_RESPONSE_CACHE_SIZE):
+        self.client_factory = client_factory
+        self.cache_size = cache_size
+        # lane -> (max concurrency, requests per second, burst)
+        self.lane_limits = {
+            "background": (max_concurrency, requests_per_second, burst),
+            "interactive": (interactive_max_concurrency, interactive_requests_per_second, interactive_burst),
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        # Both are only touched from the executor loop, so they need no locking
+        self._responses = OrderedDict()
+        self._in_flight = {}
+        self._loop = None
+        self._client = None
+        self._lanes = {}
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-executor", daemon=True)
+            thread.start()
+
+            async def setup():
+                self._lanes = {
+                    lane: (asyncio.Semaphore(max(1, concurrency)), TokenBucket(rate, burst))
+                    for lane, (concurrency, rate, burst) in self.lane_limits.items()
+                }
+
+            asyncio.run_coroutine_threadsafe(setup(), loop).result()
+            self._loop = loop
+            return loop
+
+    def _get_client(self):
+        """
+        SDK client, built on first use from the executor loop. If building it fails
+        (e.g. GROQ_API_KEY is unset) that request fails and the next one tries again.
+        """
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)  # Jitter so parallel retries do not stampede
+        return delay
+
+    async def complete(self, lane: str = "background", **params) -> str:
+        """
+        One chat completion; must run on the executor loop (use run from outside).
+        Returns the stripped message content.
+        """
+        key = request_key(params)
+        if key in self._responses:
+            self._responses.move_to_end(key)
+            LLM_RESPONSE_CACHE.labels("hit").inc()
+            return self._responses[key]
+        if key in self._in_flight:
+            LLM_RESPONSE_CACHE.labels("joined").inc()
+            # Shielded so one caller giving up does not cancel the request for the others
+            return await asyncio.shield(self._in_flight[key])
+
+        LLM_RESPONSE_CACHE.labels("miss").inc()
+        task = asyncio.ensure_future(self._complete(lane, **params))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        # Retrieving the exception here also keeps an abandoned failed request from being logged as unhandled
+        if task.cancelled() or task.exception() is not None or self.cache_size <= 0:
+            return
+        self._responses[key] = task.result()
+        while len(self._responses) > self.cache_size:
+            self._responses.popitem(last=False)
+
+    async def _complete(self, lane: str, **params) -> str:
+        semaphore, bucket = self._lanes[lane]
+        client = self._get_client()
+        async with semaphore:
+            attempt = 0
+            while True:
+                await bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    completion = await client.chat.completions.create(**params)
+                    LLM_REQUEST_SECONDS.labels("ok").observe(time.perf_counter() - started)
+                    record_llm_usage(params.get("model"), getattr(completion, "usage", None))
+                    return completion.choices[0].message.content.strip()
+                except Exception as e:
+                    LLM_REQUEST_SECONDS.labels("error").observe(time.perf_counter() - started)
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    self.retries += 1
+                    LLM_RETRIES.inc()
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    attempt += 1
+
+    async def stream(self, lane: str = "interactive", **params):
+        """
+        Streamed chat completion yielding content deltas; must run on the executor loop
+        (use relay from outside). Retries only happen before the first token arrives.
+        """
+        semaphore, bucket = self._lanes[lane]
+        client = self._get_client()
+        async with semaphore:
+            attempt = 0
+            while True:
+                await bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    response = await client.chat.completions.create(**{**params, "stream": True})
+                    break
+                except Exception as e:
+                    LLM_REQUEST_SECONDS.labels("error").observe(time.perf_counter() - started)
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    self.retries += 1
+                    LLM_RETRIES.inc()
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    attempt += 1
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            LLM_REQUEST_SECONDS.labels("stream").observe(time.perf_counter() - started)
+
+    def submit(self, coro):
+        """ Schedules a coroutine on the executor loop and returns a concurrent.futures.Future. """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """ Blocking helper for worker threads. """
+        return self.submit(coro).result()
+
+    async def relay(self, agen):
+        """
+        Iterates, from another event loop, an async generator that must run on the executor loop.
+        Closing the relay (e.g. on client disconnect) cancels the generator.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is finished:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+
+llm_executor = AsyncLLMExecutor()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from app.utils.audio_stream import open_wav_writer, export_segments, SAMPLE_RATE
+from app.utils.ffmpeg_runner import ffmpeg, FFmpegError
+
+def remux_to_mp4(source: str, output_path: str) -> str:
+    """
+    Puts the streams of `source` into an MP4 container without re-encoding them.
+    Only when a codec cannot be stored in MP4 does it fall back to H.264/AAC.
+    """
+    try:
+        ffmpeg.run(["-i", source], ["-map", "0:v:0?", "-map", "0:a:0?", "-c", "copy", "-movflags", "+faststart", output_path])
+    except FFmpegError:
+        ffmpeg.run(["-i", source], ["-map", "0:v:0?", "-map", "0:a:0?", "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+                                    "-c:a", "aac", "-movflags", "+faststart", output_path])
+    return output_path
+
+
+def extract_audio(source: str, output_path: str, sample_rate: int = 44100, channels: int = 2) -> str:
+    """ Decodes the first audio stream of `source` to a 16-bit PCM WAV; video is never decoded. """
+    ffmpeg.run(["-i", source], ["-vn", "-map", "0:a:0", "-c:a", "pcm_s16le", "-ar", str(sample_rate), "-ac", str(channels),
+                                "-map_metadata", "-1", "-fflags", "+bitexact", output_path])
+    return output_path
+
+
+def decode_to_wav(source: str, output_path: str) -> str:
+    """ Decodes `source` once into the 16kHz mono 16-bit WAV every other stage works on. """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    return extract_audio(source, output_path, SAMPLE_RATE, 1)
+
+
+def cut_segments(source: str, cut_points: list, output_paths: list):
+    """
+    Writes each (start, end) range in seconds of `source` to the matching 16kHz mono WAV in
+    `output_paths`, with a single ffmpeg run of the segment muxer. The muxer splits at every
+    range boundary; pieces that fall between ranges are discarded. Splits land on packet
+    boundaries, so a cut may be a few milliseconds off the requested time. Overlapping ranges
+    cannot be expressed as one split, so they fall back to audio_stream.export_segments.
+    """
+    if len(cut_points) != len(output_paths):
+        raise ValueError("cut_points and output_paths must have the same length.")
+    if not cut_points:
+        return
+
+    ordered = sorted(zip(cut_points, output_paths), key=lambda pair: pair[0][0])
+    if any(previous[0][1] > current[0][0] for previous, current in zip(ordered, ordered[1:])):
+        export_segments(source, cut_points, output_paths)
+        return
+
+    boundaries = sorted({round(t, 3) for (start, end), _ in ordered for t in (start, end) if t > 0})
+    piece_dir = tempfile.mkdtemp(prefix="segments-", dir=os.path.dirname(output_paths[0]) or ".")
+    try:
+        outputs = ["-vn", "-map", "0:a:0", "-c:a", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+                   "-f", "segment", "-segment_format", "wav", "-reset_timestamps", "1"]
+        if boundaries:
+            outputs += ["-segment_times", ",".join(f"{t:.3f}" for t in boundaries)]
+        ffmpeg.run(["-i", source], outputs + [os.path.join(piece_dir, "piece_%06d.wav")])
+
+        # Piece k covers [edges[k], edges[k + 1]); a range maps to the piece starting at its start
+        edges = [0.0] + boundaries
+        for (start, end), path in ordered:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            piece = os.path.join(piece_dir, f"piece_{edges.index(round(start, 3)):06d}.wav") if end > start else None
+            if piece and os.path.exists(piece):
+                os.replace(piece, path)
+            else:
+                # Empty ranges and ranges past the end of the audio still get a (silent, empty) file
+                open_wav_writer(path).close()
+    finally:
+        shutil.rmtree(piece_dir, ignore_errors=True)
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app.utils.telemetry import MODEL_LOAD_SECONDS
+
+
+# Model sizes/names can be overridden per deployment without touching code.
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+# Seconds a model may sit unused before it is dropped (0 disables eviction).
+MODEL_IDLE_TTL = float(os.getenv("MODEL_IDLE_TTL", "0"))
+# Comma separated list of models to load at startup, e.g. "whisper,embedding".
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "").split(",") if name.strip()]
+
+
+def _load_whisper(size: str):
+    import whisper
+    return whisper.load_model(size)
+
+
+def _load_sentence_transformer(name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of heavyweight models.
+    Each (kind, name) pair is loaded lazily on first use and shared by every caller.
+    Models checked out with use() are never evicted while they are in use.
+    """
+
+    def __init__(self, idle_ttl: float = MODEL_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._loaders = {
+            "whisper": _load_whisper,
+            "embedding": _load_sentence_transformer,
+        }
+        self._models = {}
+        self._last_used = {}
+        self._in_use = {}
+        self._load_times = {}
+        self._load_counts = {}
+        self._evictions = 0
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+
+    def register_loader(self, kind: str, loader):
+        """ Register a loader callable for a new model kind. """
+        self._loaders[kind] = loader
+
+    def get(self, kind: str, name: str):
+        """
+        Returns the model for (kind, name), loading it once if needed.
+        Concurrent callers asking for the same model wait for a single load.
+        """
+        return self._checkout(kind, name, hold=False)
+
+    @contextmanager
+    def use(self, kind: str, name: str):
+        """ Checks out the model for (kind, name) for the duration of the block, protecting it from eviction. """
+        key = (kind, name)
+        model = self._checkout(kind, name, hold=True)
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+                self._last_used[key] = time.monotonic()
+
+    def _checkout(self, kind: str, name: str, hold: bool):
+        key = (kind, name)
+        self.evict_idle()
+
+        with self._lock:
+            if key in self._models:
+                return self._touch(key, hold)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._touch(key, hold)
+
+            if kind not in self._loaders:
+                raise ValueError(f"No loader registered for model kind '{kind}'.")
+
+            started = time.perf_counter()
+            model = self._loaders[kind](name)
+            elapsed = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.labels(kind).observe(elapsed)
+
+            with self._lock:
+                self._models[key] = model
+                self._load_times[key] = elapsed
+                self._load_counts[key] = self._load_counts.get(key, 0) + 1
+                return self._touch(key, hold)
+
+    def _touch(self, key, hold: bool):
+        """ Marks a loaded model as used (and checked out if hold); called with the lock held. """
+        self._last_used[key] = time.monotonic()
+        if hold:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        return self._models[key]
+
+    def whisper(self, size: str = None):
+        return self.get("whisper", size or WHISPER_MODEL_SIZE)
+
+    def embedding(self, name: str = None):
+        return self.get("embedding", name or EMBEDDING_MODEL_NAME)
+
+    def warm_up(self, kinds=None):
+        """ Eagerly loads the default model of each requested kind. """
+        started = time.perf_counter()
+        for kind in kinds if kinds is not None else WARMUP_MODELS:
+            if kind == "whisper":
+                self.whisper()
+            elif kind == "embedding":
+                self.embedding()
+            else:
+                raise ValueError(f"Unknown model kind for warm-up: '{kind}'.")
+        self.warmup_seconds = time.perf_counter() - started
+
+    def evict_idle(self):
+        """ Drops models that have not been used for longer than idle_ttl seconds and are not checked out. """
+        if not self.idle_ttl:
+            return []
+
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for key, last_used in list(self._last_used.items()):
+                if now - last_used > self.idle_ttl and not self._in_use.get(key):
+                    self._models.pop(key, None)
+                    self._last_used.pop(key, None)
+                    evicted.append(key)
+            self._evictions += len(evicted)
+        return evicted
+
+    def start_sweeper(self, interval: float = None):
+        """
+        Evicts idle models from a background thread, so an idle server frees them without
+        waiting for the next get(). Checks every half TTL (at most every minute) by default.
+        """
+        if not self.idle_ttl or self._sweeper is not None:
+            return
+        interval = interval or min(self.idle_ttl / 2, 60.0)
+        self._stop_sweeper.clear()
+
+        def sweep():
+            while not self._stop_sweeper.wait(interval):
+                self.evict_idle()
+
+        self._sweeper = threading.Thread(target=sweep, name="model-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is None:
+            return
+        self._stop_sweeper.set()
+        self._sweeper.join()
+        self._sweeper = None
+
+    def metrics(self) -> dict:
+        """ Load timings and residency information for every model seen so far. """
+        now = time.monotonic()
+        with self._lock:
+            models = []
+            for key in sorted(set(self._load_times) | set(self._models)):
+                kind, name = key
+                models.append({
+                    "kind": kind,
+                    "name": name,
+                    "loaded": key in self._models,
+                    "in_use": self._in_use.get(key, 0),
+                    "load_seconds": self._load_times.get(key),
+                    "load_count": self._load_counts.get(key, 0),
+                    "idle_seconds": now - self._last_used[key] if key in self._last_used else None,
+                })
+            return {
+                "idle_ttl": self.idle_ttl,
+                "evictions": self._evictions,
+                "warmup_seconds": self.warmup_seconds,
+                "models": models,
+            }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+# One decoded WAV per job; chunks are byte ranges of it, served on demand.
+SOURCE_WAV_NAME = "source.wav"
+CHUNK_INDEX_NAME = "chunks.json"
+# Number of source WAVs kept memory-mapped at once.
+SEGMENT_SOURCE_CACHE = int(os.getenv("SEGMENT_SOURCE_CACHE", "16"))
+# Size of the pieces a response body is streamed in.
+STREAM_BLOCK_BYTES = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def wav_header(data_size: int, channels: int, sample_rate: int, sample_width: int) -> bytes:
+    """ Canonical 44 byte PCM WAV header for `data_size` bytes of audio. """
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+def parse_range(header: str, total: int):
+    """
+    Parses a single `bytes=` Range header into an inclusive (first, last) pair.
+    Returns None when there is no usable header; raises RangeNotSatisfiable when it
+    lies outside the resource.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, total - length), total - 1
+        first = int(first)
+        last = int(last) if last else total - 1
+    except ValueError:
+        return None
+    if first >= total or last < first:
+        raise RangeNotSatisfiable()
+    return first, min(last, total - 1)
+
+
+class WavSource:
+    """
+    A memory-mapped PCM WAV. Slicing returns views into the mapping, so serving a
+    chunk never copies or re-encodes the audio.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._parse_header()
+
+    def _parse_header(self):
+        if self._map[0:4] != b"RIFF" or self._map[8:12] != b"WAVE":
+            raise ValueError(f"{self.path} is not a WAV file.")
+        position = 12
+        self.data_offset = None
+        while position + 8 <= len(self._map):
+            chunk_id, chunk_size = struct.unpack("<4sI", self._map[position:position + 8])
+            body = position + 8
+            if chunk_id == b"fmt ":
+                _, self.channels, self.sample_rate, _, _, bits = struct.unpack("<HHIIHH", self._map[body:body + 16])
+                self.sample_width = bits // 8
+            elif chunk_id == b"data":
+                self.data_offset = body
+                # Headers of streamed WAVs may carry a placeholder size; trust the file length
+                self.data_size = min(chunk_size, len(self._map) - body)
+                break
+            position = body + chunk_size + (chunk_size & 1)
+        if self.data_offset is None:
+            raise ValueError(f"{self.path} has no data chunk.")
+        self.frame_size = self.channels * self.sample_width
+
+    def byte_span(self, start: float, end: float) -> tuple:
+        """ (offset, length) of the PCM data between start and end seconds, frame aligned. """
+        first = min(int(start * self.sample_rate), self.data_size // self.frame_size)
+        last = min(int(end * self.sample_rate), self.data_size // self.frame_size)
+        return self.data_offset + first * self.frame_size, max(0, last - first) * self.frame_size
+
+    def view(self, offset: int, length: int) -> memoryview:
+        return memoryview(self._map)[offset:offset + length]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ChunkAudio:
+    """
+    A chunk served as a virtual WAV file: a freshly built header followed by a
+    slice of the source data. Supports arbitrary byte ranges over that virtual file.
+    """
+
+    def __init__(self, source: WavSource, start: float, end: float):
+        self.source = source
+        self.offset, self.data_length = source.byte_span(start, end)
+        self.header = wav_header(self.data_length, source.channels, source.sample_rate, source.sample_width)
+        self.size = len(self.header) + self.data_length
+
+    def iter_bytes(self, first: int = 0, last: int = None):
+        """ Yields bytes first..last (inclusive) of the virtual file in bounded pieces. """
+        last = self.size - 1 if last is None else last
+        position = first
+        header_length = len(self.header)
+        if position < header_length:
+            yield self.header[position:min(last + 1, header_length)]
+            position = header_length
+        while position <= last:
+            length = min(STREAM_BLOCK_BYTES, last + 1 - position)
+            yield bytes(self.source.view(self.offset + position - header_length, length))
+            position += length
+
+
+class SegmentAudioServer:
+    """
+    Resolves (segments folder, chunk name) to a ChunkAudio. Keeps a small LRU of
+    memory-mapped sources and of parsed chunk indexes.
+    """
+
+    def __init__(self, max_sources: int = SEGMENT_SOURCE_CACHE):
+        self.max_sources = max_sources
+        self._sources = OrderedDict()
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _source(self, path: str) -> WavSource:
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            if key in self._sources:
+                self._sources.move_to_end(key)
+                return self._sources[key]
+            source = WavSource(path)
+            self._sources[key] = source
+            # Evicted maps are left to the garbage collector; a response may still be reading them
+            while len(self._sources) > self.max_sources:
+                self._sources.popitem(last=False)
+            return source
+
+    def _index(self, path: str) -> dict:
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        with open(path, "r", encoding="utf-8") as file:
+            index = {entry["name"]: (entry["start_time"], entry["end_time"]) for entry in json.load(file)}
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_sources:
+                self._indexes.popitem(last=False)
+        return index
+
+    def chunk(self, segments_dir: str, name: str):
+        """ ChunkAudio for `name` (e.g. "chunk_3"), or None if the folder has no such chunk. """
+        source_path = os.path.join(segments_dir, SOURCE_WAV_NAME)
+        index_path = os.path.join(segments_dir, CHUNK_INDEX_NAME)
+        if not os.path.exists(source_path) or not os.path.exists(index_path):
+            return None
+        span = self._index(index_path).get(name)
+        if span is None:
+            return None
+        return ChunkAudio(self._source(source_path), *span)
+
+
+def write_chunk_index(segments_dir: str, audio_text_pairs: list) -> str:
+    """ Records the time span of every chunk next to the source WAV. """
+    index = [
+        {
+            "name": os.path.splitext(os.path.basename(pair["audio_path"]))[0],
+            "start_time": pair["start_time"],
+            "end_time": pair["end_time"],
+        }
+        for pair in audio_text_pairs
+    ]
+    path = os.path.join(segments_dir, CHUNK_INDEX_NAME)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(index, file)
+    return path
+
+
+segment_audio_server = SegmentAudioServer()
@@ -1,88 +1,161 @@
 import os
-from pydub import AudioSegment
-from sentence_transformers import SentenceTransformer
-import spacy
+from typing import Iterable, List
+import numpy as np
+from app.utils.embeddings import embedding_service
+from app.utils.audio_segmenter import split_audio_by_timestamps
+
+# Local topic segmentation (TextTiling over sentence embeddings): units compared on each side of a gap,
+# chunk length limits in seconds, and how many standard deviations above the mean valley depth a boundary must be.
+TOPIC_BLOCK_SIZE = int(os.getenv("TOPIC_BLOCK_SIZE", "3"))
+TOPIC_MIN_CHUNK_SECONDS = float(os.getenv("TOPIC_MIN_CHUNK_SECONDS", "20"))
+TOPIC_MAX_CHUNK_SECONDS = float(os.getenv("TOPIC_MAX_CHUNK_SECONDS", "120"))
+TOPIC_DEPTH_STDS = float(os.getenv("TOPIC_DEPTH_STDS", "1.0"))
+
+# SpaCy is only needed for sentence splitting, so it is loaded on first use
+_nlp = None
 
-# Load SpaCy and SentenceTransformer models
-nlp = spacy.load("en_core_web_sm")
-sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load("en_core_web_sm")
+    return _nlp
 
 
 def segment_text_semantically(text):
     """
     Segments text into sentences using SpaCy.
     """
-    doc = nlp(text)
+    doc = get_nlp()(text)
     sentences = [sent.text.strip() for sent in doc.sents]
     return sentences
 
 
-def cluster_sentences_by_topic(sentences, max_sentences_per_chunk=5):
+def gap_similarities(embeddings: np.ndarray, block_size: int = TOPIC_BLOCK_SIZE) -> np.ndarray:
     """
-    Clusters sentences semantically using SentenceTransformer.
-    Groups sentences into chunks with a maximum of 'max_sentences_per_chunk'.
+    Cosine similarity across each of the n-1 gaps between consecutive units, comparing the
+    mean embedding of up to block_size units before the gap with that of the units after it.
     """
-    embeddings = sentence_model.encode(sentences)
-    clusters = []
-    current_chunk = []
-
-    for i, (sentence, embedding) in enumerate(zip(sentences, embeddings)):
-        if len(current_chunk) < max_sentences_per_chunk:
-            current_chunk.append(sentence)
-        else:
-            clusters.append(current_chunk)
-            current_chunk = [sentence]
-
-    if current_chunk:  # Append any remaining sentences
-        clusters.append(current_chunk)
-
-    return clusters
-
-
-from pydub import AudioSegment
-import os
-from app.utils.llama_segmenter import segment_text_with_llama70b
-
-def split_audio_by_timestamps(audio_filepath, transcript, output_folder="segments"):
+    n = len(embeddings)
+    if n < 2:
+        return np.empty(0, dtype=np.float32)
+    sums = np.vstack([np.zeros((1, embeddings.shape[1]), dtype=np.float64), np.cumsum(embeddings, axis=0, dtype=np.float64)])
+    gaps = np.arange(1, n)
+    left = sums[gaps] - sums[np.maximum(0, gaps - block_size)]
+    right = sums[np.minimum(n, gaps + block_size)] - sums[gaps]
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    return (np.einsum("ij,ij->i", left, right) / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def valleys(similarities: np.ndarray) -> np.ndarray:
+    """ Gaps whose similarity is a local minimum (the first gap of a flat valley floor). """
+    n = len(similarities)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    lower_than_left = np.r_[True, similarities[1:] < similarities[:-1]]
+    not_above_right = np.r_[similarities[:-1] <= similarities[1:], True]
+    return np.flatnonzero(lower_than_left & not_above_right)
+
+
+def depth_scores(similarities: np.ndarray) -> np.ndarray:
+    """
+    TextTiling depth of every valley: from the valley, climb left while similarity keeps rising
+    and the same to the right; the depth is the sum of both rises. Other gaps have depth 0.
+    """
+    values = similarities.tolist()
+    depths = np.zeros(len(values), dtype=np.float32)
+    for gap in valleys(similarities).tolist():
+        left = gap
+        while left > 0 and values[left - 1] >= values[left]:
+            left -= 1
+        right = gap
+        while right < len(values) - 1 and values[right + 1] >= values[right]:
+            right += 1
+        depths[gap] = (values[left] - values[gap]) + (values[right] - values[gap])
+    return depths
+
+
+def topic_boundaries(embeddings: np.ndarray, positions: np.ndarray, min_length: float, max_length: float,
+                     block_size: int = TOPIC_BLOCK_SIZE, depth_stds: float = TOPIC_DEPTH_STDS) -> List[int]:
     """
-    Splits audio into chunks based on LLaMA-generated semantic text segments and saves them.
+    Start index of every chunk (always including 0) for units with the given embeddings.
+    positions has n+1 entries; a chunk of units a..b-1 has length positions[b] - positions[a]
+    (seconds for transcript segments, a count for plain sentences).
+    Only valleys at least depth_stds standard deviations deeper than the mean valley are cut,
+    deepest first, as long as both sides stay at least min_length; chunks still longer than
+    max_length are then split at their deepest remaining gap.
     """
-    # Segment the transcript semantically using LLaMA
-    text_chunks = segment_text_with_llama70b(transcript)
-
-    # Approximate timestamps for chunks
-    timestamps = []
-    total_time = 0
-    for chunk in text_chunks:
-        chunk_duration = len(chunk) * 0.075  # Approximation: 1 character = ~0.075 seconds
-        start_time = total_time
-        end_time = total_time + chunk_duration
-        timestamps.append((start_time, end_time, chunk))
-        total_time = end_time
-
-    # Split the audio based on the calculated timestamps
-    audio = AudioSegment.from_wav(audio_filepath)
-    os.makedirs(output_folder, exist_ok=True)
-    audio_text_pairs = []
-
-    for i, (start_time, end_time, text) in enumerate(timestamps):
-        start_ms = int(start_time * 1000)
-        end_ms = int(end_time * 1000)
-        chunk_audio = audio[start_ms:end_ms]
-        chunk_path = os.path.join(output_folder, f"chunk_{i + 1}.wav")
-        chunk_audio.export(chunk_path, format="wav")
-        audio_text_pairs.append({"audio_path": chunk_path, "text": text})
+    n = len(embeddings)
+    if n < 2:
+        return [0]
+    similarities = gap_similarities(embeddings, block_size)
+    depths = depth_scores(similarities)
+    valley_depths = depths[valleys(similarities)]
+    cutoff = valley_depths.mean() + depth_stds * valley_depths.std()
+    boundaries = [0, n]
+
+    def fits(gap: int) -> bool:
+        i = np.searchsorted(boundaries, gap)
+        return (positions[gap] - positions[boundaries[i - 1]] >= min_length
+                and positions[boundaries[i]] - positions[gap] >= min_length)
+
+    # Gap k lies before unit k + 1
+    for k in np.argsort(-depths, kind="stable"):
+        if depths[k] < cutoff or depths[k] <= 0:
+            break
+        if fits(k + 1):
+            boundaries.insert(int(np.searchsorted(boundaries, k + 1)), int(k + 1))
+
+    # Enforce max_length, preferring deep gaps, then any gap that keeps the minimum, then any gap
+    i = 0
+    while i < len(boundaries) - 1:
+        a, b = boundaries[i], boundaries[i + 1]
+        if positions[b] - positions[a] <= max_length or b - a < 2:
+            i += 1
+            continue
+        inner = np.arange(a + 1, b)
+        allowed = [gap for gap in inner if fits(gap)] or list(inner)
+        best = max(allowed, key=lambda gap: depths[gap - 1])
+        boundaries.insert(i + 1, int(best))
+    return boundaries[:-1]
+
+
+def segment_transcript_by_topic(segments: Iterable[dict], min_seconds: float = None, max_seconds: float = None,
+                                block_size: int = TOPIC_BLOCK_SIZE) -> List[str]:
+    """
+    Local, LLM-free alternative to llama_segmenter.segment_transcript_windowed with the same
+    output: chunks of whole transcript segments, cut where the topic shifts.
+    """
+    min_seconds = TOPIC_MIN_CHUNK_SECONDS if min_seconds is None else min_seconds
+    max_seconds = TOPIC_MAX_CHUNK_SECONDS if max_seconds is None else max_seconds
+    segments = [segment for segment in segments if segment["text"].strip()]
+    if not segments:
+        return []
 
-    return audio_text_pairs
+    texts = [segment["text"].strip() for segment in segments]
+    positions = np.array([segment["start"] for segment in segments] + [segments[-1]["end"]], dtype=np.float64)
+    starts = topic_boundaries(embedding_service.encode(texts), positions, min_seconds, max_seconds, block_size)
+    return [" ".join(texts[a:b]) for a, b in zip(starts, starts[1:] + [len(texts)])]
 
 
+def cluster_sentences_by_topic(sentences, max_sentences_per_chunk=5):
+    """
+    Clusters sentences semantically using SentenceTransformer embeddings.
+    Chunks break at topic shifts and hold at most 'max_sentences_per_chunk' sentences.
+    """
+    if not sentences:
+        return []
+    embeddings = embedding_service.encode(sentences)
+    positions = np.arange(len(sentences) + 1, dtype=np.float64)
+    starts = topic_boundaries(embeddings, positions, 1, max_sentences_per_chunk,
+                              block_size=min(TOPIC_BLOCK_SIZE, max_sentences_per_chunk))
+    return [sentences[a:b] for a, b in zip(starts, starts[1:] + [len(sentences)])]
 
-from app.utils.audio_segmenter import split_audio_by_timestamps
 
-def process_audio_and_transcript(audio_filepath, transcript):
+def process_audio_and_transcript(audio_filepath, transcript, transcript_segments=None):
     """
     Processes the audio and transcript to create semantically aligned chunks using LLaMA.
     """
-    audio_text_pairs = split_audio_by_timestamps(audio_filepath, transcript)
+    audio_text_pairs = split_audio_by_timestamps(audio_filepath, transcript, transcript_segments=transcript_segments)
     return audio_text_pairs
-
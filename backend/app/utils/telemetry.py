@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Also emit OpenTelemetry spans (needs opentelemetry-api; exporters are configured by the deployment).
+OTEL_TRACING = os.getenv("OTEL_TRACING", "false").lower() in ("1", "true", "yes")
+
+_tracer = None
+if OTEL_TRACING:
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("yt-chat")
+    except ImportError:
+        _tracer = None
+
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request latency.", ["method", "route", "status"])
+PIPELINE_STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Duration of ingest pipeline stages.", ["stage"],
+                                   buckets=_SLOW_BUCKETS)
+PIPELINE_JOBS = Counter("pipeline_jobs_total", "Finished ingest jobs.", ["status"])
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Ingest jobs waiting for a worker.")
+MODEL_LOAD_SECONDS = Histogram("model_load_seconds", "Time to load a model.", ["kind"], buckets=_SLOW_BUCKETS)
+TRANSCRIBED_AUDIO_SECONDS = Counter("transcribed_audio_seconds_total", "Seconds of audio transcribed.")
+TRANSCRIPTION_REALTIME_FACTOR = Histogram("transcription_realtime_factor", "Audio seconds transcribed per wall-clock second.",
+                                          buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128))
+LLM_REQUEST_SECONDS = Histogram("llm_request_seconds", "Latency of single LLM completions.", ["outcome"],
+                                buckets=_SLOW_BUCKETS)
+LLM_RETRIES = Counter("llm_retries_total", "LLM completions retried after a retryable error.")
+LLM_RESPONSE_CACHE = Counter("llm_response_cache_total", "LLM completion lookups: cache hit, joined an identical in-flight request, or miss.",
+                             ["outcome"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by LLM completions.", ["model", "type"])
+GROQ_CLIENT_SECONDS = Histogram("groq_client_seconds", "Latency of GroqClient operations.", ["operation"],
+                                buckets=_SLOW_BUCKETS)
+VECTOR_SEARCH_SECONDS = Histogram("vector_search_seconds", "FAISS search latency.", buckets=_FAST_BUCKETS)
+CORPUS_SEARCH_SECONDS = Histogram("corpus_search_seconds", "Cross-video search latency over all shards.", buckets=_FAST_BUCKETS)
+TIMESTAMP_LOOKUP_SECONDS = Histogram("timestamp_lookup_seconds", "find_timestamps latency.", buckets=_FAST_BUCKETS)
+
+
+@contextmanager
+def timed(name: str, histogram=None, **attributes):
+    """
+    Times a block into `histogram` (a labelled child or a plain Histogram) and, when
+    OTEL_TRACING is on, wraps it in a span called `name` with the given attributes.
+    """
+    started = time.perf_counter()
+    span = _tracer.start_as_current_span(name, attributes=attributes) if _tracer else nullcontext()
+    try:
+        with span:
+            yield
+    finally:
+        if histogram is not None:
+            histogram.observe(time.perf_counter() - started)
+
+
+def instrumented(name: str, histogram):
+    """ Decorator applying timed() to every call of a sync or async function. """
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(name, histogram):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name, histogram):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_transcription(audio_seconds: float, wall_seconds: float):
+    TRANSCRIBED_AUDIO_SECONDS.inc(audio_seconds)
+    if wall_seconds > 0:
+        TRANSCRIPTION_REALTIME_FACTOR.observe(audio_seconds / wall_seconds)
+
+
+def record_llm_usage(model: str, usage):
+    """ Counts the prompt and completion tokens reported by a completion, if any. """
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels(model, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def metrics_payload():
+    """ (body, content type) of the Prometheus text exposition. """
+    return generate_latest(), CONTENT_TYPE_LATEST
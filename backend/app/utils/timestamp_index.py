@@ -0,0 +1,83 @@
+import math
+import os
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from app.utils.alignment import tokenize
+
+# BM25 parameters for ranking transcript segments against a chat query.
+BM25_K1 = float(os.getenv("TIMESTAMP_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("TIMESTAMP_BM25_B", "0.75"))
+# Number of per-video timestamp indexes kept in memory.
+TIMESTAMP_INDEX_CACHE = int(os.getenv("TIMESTAMP_INDEX_CACHE", "32"))
+
+
+class TimestampIndex:
+    """
+    BM25 inverted index over the segments of one transcript.
+    Built once per transcript; a lookup only walks the postings of the query's
+    terms instead of every segment.
+    """
+
+    def __init__(self, segments: list):
+        self.segments = [
+            {"text": segment["text"], "start": segment.get("start") or 0.0, "end": segment.get("end") or 0.0}
+            for segment in segments if segment.get("text")
+        ]
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, segment in enumerate(self.segments):
+            counts = Counter(tokenize(segment["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term].append((position, count))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _idf(self, term: str) -> float:
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.segments) - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, top_k: int = 3) -> list:
+        """
+        Ranked [{"start", "end", "text", "score"}] of the segments that best match `query`.
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for position, count in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / (self.average_length or 1))
+                scores[position] += idf * count * (BM25_K1 + 1) / (count + norm)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [{**self.segments[position], "score": score} for position, score in best]
+
+
+class TimestampIndexCache:
+    """
+    Per-video TimestampIndexes, rebuilt only when the video's transcript changes.
+    """
+
+    def __init__(self, capacity: int = TIMESTAMP_INDEX_CACHE):
+        self.capacity = capacity
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str, digest: str, segments_loader) -> TimestampIndex:
+        """ Index of video_id at `digest`, building it from segments_loader() on a miss. """
+        with self._lock:
+            cached = self._indexes.get(video_id)
+            if cached is not None and cached[0] == digest:
+                self._indexes.move_to_end(video_id)
+                return cached[1]
+        index = TimestampIndex(segments_loader())
+        with self._lock:
+            self._indexes[video_id] = (digest, index)
+            self._indexes.move_to_end(video_id)
+            while len(self._indexes) > self.capacity:
+                self._indexes.popitem(last=False)
+        return index
@@ -0,0 +1,167 @@
+import os
+import threading
+import numpy as np
+from app.utils.model_registry import model_registry, WHISPER_MODEL_SIZE
+from app.utils.audio_stream import iter_pcm_blocks, SAMPLE_RATE
+
+# Speech-to-text engine: "whisper" (openai-whisper), "faster-whisper" (CTranslate2) or "stub".
+TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "whisper")
+# CTranslate2 weight format for faster-whisper; int8 is the fastest on CPU.
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_BEAM_SIZE = int(os.getenv("FASTER_WHISPER_BEAM_SIZE", "5"))
+# Seconds of audio per segment produced by the stub backend.
+STUB_SEGMENT_SECONDS = float(os.getenv("STUB_SEGMENT_SECONDS", "5"))
+
+
+def _load_faster_whisper(name: str):
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError as e:
+        raise ImportError("TRANSCRIBER_BACKEND=faster-whisper requires the faster-whisper package.") from e
+    size, compute_type, cpu_threads = name.rsplit("/", 2)
+    # CTranslate2 ignores torch.set_num_threads, so the thread budget is passed explicitly (0 = its default)
+    return WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=int(cpu_threads), num_workers=1)
+
+
+model_registry.register_loader("faster-whisper", _load_faster_whisper)
+
+
+class WhisperTranscriber:
+    """ openai-whisper; the reference backend. Runs on torch, whose threads are set per process. """
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = None, cpu_threads: int = 0):
+        self.model_size = model_size or WHISPER_MODEL_SIZE
+
+    def config(self) -> dict:
+        return {"backend": self.name, "model": self.model_size}
+
+    def load(self):
+        model_registry.whisper(self.model_size)
+
+    def transcribe(self, audio, **options) -> dict:
+        # Checked out so an idle-TTL sweep cannot drop the model mid-transcription
+        with model_registry.use("whisper", self.model_size) as model:
+            return model.transcribe(audio, **options)
+
+
+class FasterWhisperTranscriber:
+    """
+    faster-whisper on CTranslate2 with quantized weights. Its segments are converted to the
+    openai-whisper result format, so downstream code cannot tell the backends apart.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = None, cpu_threads: int = 0, compute_type: str = FASTER_WHISPER_COMPUTE_TYPE,
+                 beam_size: int = FASTER_WHISPER_BEAM_SIZE):
+        self.model_size = model_size or WHISPER_MODEL_SIZE
+        self.cpu_threads = cpu_threads
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+
+    def config(self) -> dict:
+        return {"backend": self.name, "model": self.model_size, "compute_type": self.compute_type, "beam_size": self.beam_size}
+
+    @property
+    def model_name(self) -> str:
+        return f"{self.model_size}/{self.compute_type}/{self.cpu_threads}"
+
+    def load(self):
+        return model_registry.get("faster-whisper", self.model_name)
+
+    def transcribe(self, audio, task: str = "transcribe", word_timestamps: bool = False, **options) -> dict:
+        # Segments are decoded lazily, so the model stays checked out until all of them are read
+        with model_registry.use("faster-whisper", self.model_name) as model:
+            segments, info = model.transcribe(audio, task=task, word_timestamps=word_timestamps,
+                                              beam_size=self.beam_size, **options)
+            segments = list(segments)
+        result = {"text": "", "segments": [], "language": info.language}
+        for segment in segments:
+            converted = {
+                "id": segment.id,
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            if word_timestamps and segment.words:
+                converted["words"] = [
+                    {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+                    for word in segment.words
+                ]
+            result["text"] += segment.text
+            result["segments"].append(converted)
+        return result
+
+
+class StubTranscriber:
+    """
+    Model-free backend for tests and benchmarks: one segment of placeholder words per
+    STUB_SEGMENT_SECONDS of audio, in the openai-whisper result format.
+    """
+
+    name = "stub"
+
+    def __init__(self, model_size: str = None, cpu_threads: int = 0, segment_seconds: float = STUB_SEGMENT_SECONDS):
+        self.segment_seconds = segment_seconds
+
+    def config(self) -> dict:
+        return {"backend": self.name, "segment_seconds": self.segment_seconds}
+
+    def load(self):
+        pass
+
+    def transcribe(self, audio, word_timestamps: bool = False, **options) -> dict:
+        if isinstance(audio, str):
+            audio = np.concatenate(list(iter_pcm_blocks(audio)) or [np.empty(0, np.float32)])
+        duration = len(audio) / SAMPLE_RATE
+        result = {"text": "", "segments": [], "language": "en"}
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.segment_seconds)
+            index = len(result["segments"])
+            words = [f"word{index}_{i}" for i in range(max(1, int(end - start) * 2))]
+            segment = {"id": index, "seek": int(start * 100), "start": start, "end": end, "text": " " + " ".join(words)}
+            if word_timestamps:
+                step = (end - start) / len(words)
+                segment["words"] = [
+                    {"word": " " + word, "start": start + i * step, "end": start + (i + 1) * step, "probability": 1.0}
+                    for i, word in enumerate(words)
+                ]
+            result["text"] += segment["text"]
+            result["segments"].append(segment)
+            start = end
+        return result
+
+
+TRANSCRIBERS = {
+    WhisperTranscriber.name: WhisperTranscriber,
+    FasterWhisperTranscriber.name: FasterWhisperTranscriber,
+    StubTranscriber.name: StubTranscriber,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_transcriber(backend: str = None, model_size: str = None, cpu_threads: int = 0):
+    """
+    Shared transcriber for (backend, model size, CPU threads), defaulting to TRANSCRIBER_BACKEND.
+    Every backend exposes load(), config() and transcribe(audio, **options), which returns an
+    openai-whisper style result for a file path or 16kHz float32 samples.
+    """
+    backend = backend or TRANSCRIBER_BACKEND
+    if backend not in TRANSCRIBERS:
+        raise ValueError(f"Unknown transcriber backend {backend!r}; expected one of {sorted(TRANSCRIBERS)}.")
+    key = (backend, model_size or WHISPER_MODEL_SIZE, cpu_threads)
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = TRANSCRIBERS[backend](model_size, cpu_threads)
+        return _instances[key]
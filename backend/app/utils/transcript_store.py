@@ -0,0 +1,182 @@
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, List
+import numpy as np
+
+# File layout: MAGIC, u64 header length, JSON header, then 64-byte aligned column buffers.
+MAGIC = b"TSCOL\x00\x01\x00"
+_ALIGNMENT = 64
+_COLUMNS = {
+    "start": np.float64,
+    "end": np.float64,
+    "text_offsets": np.int64,
+    "text": np.uint8,
+    "word_offsets": np.int64,
+    "word_start": np.float64,
+    "word_end": np.float64,
+    "word_text_offsets": np.int64,
+    "word_text": np.uint8,
+}
+
+
+def _offsets(lengths: List[int]) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+
+
+def _columns(segments: List[dict]) -> dict:
+    texts = [segment["text"].encode("utf-8") for segment in segments]
+    words = [segment.get("words") or [] for segment in segments]
+    flat_words = [word for segment_words in words for word in segment_words]
+    word_texts = [word["word"].encode("utf-8") for word in flat_words]
+    return {
+        "start": np.array([segment["start"] for segment in segments], dtype=np.float64),
+        "end": np.array([segment["end"] for segment in segments], dtype=np.float64),
+        "text_offsets": _offsets([len(text) for text in texts]),
+        "text": np.frombuffer(b"".join(texts), dtype=np.uint8),
+        "word_offsets": _offsets([len(segment_words) for segment_words in words]),
+        "word_start": np.array([word["start"] for word in flat_words], dtype=np.float64),
+        "word_end": np.array([word["end"] for word in flat_words], dtype=np.float64),
+        "word_text_offsets": _offsets([len(text) for text in word_texts]),
+        "word_text": np.frombuffer(b"".join(word_texts), dtype=np.uint8),
+    }
+
+
+def write_transcript(path: str, segments: Iterable[dict], language: str = None) -> str:
+    """
+    Stores Whisper segments (start, end, text and optional word timestamps) as columns.
+    Everything else Whisper reports per segment (token ids, log probabilities...) is dropped.
+    The file is written next to `path` and renamed into place.
+    """
+    columns = _columns(list(segments))
+    header = {"language": language, "count": len(columns["start"]), "columns": {}}
+    position = 0
+    for name, values in columns.items():
+        header["columns"][name] = {"offset": position, "length": len(values)}
+        position += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // _ALIGNMENT) * _ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, values in columns.items():
+            file.seek(data_start + header["columns"][name]["offset"])
+            file.write(values.tobytes())
+        file.truncate(data_start + position)
+    os.replace(temp_path, path)
+    return path
+
+
+class Transcript:
+    """
+    Read-only view of a stored transcript. Columns are NumPy views into a memory-mapped
+    file, created on first access, so opening is O(1) and only touched pages are read.
+    """
+
+    def __init__(self, path: str, columns: dict = None, language: str = None):
+        self.path = path
+        self.language = language
+        self._columns = columns or {}
+        self._map = None
+        self._layout = None
+        if columns is None:
+            with open(path, "rb") as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            header_length = struct.unpack("<Q", self._map[len(MAGIC):len(MAGIC) + 8])[0]
+            header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+            self.language = header["language"]
+            self._data_start = -(-(len(MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+            self._layout = header["columns"]
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            layout = self._layout[name]
+            self._columns[name] = np.frombuffer(self._map, dtype=_COLUMNS[name], count=layout["length"],
+                                                offset=self._data_start + layout["offset"])
+        return self._columns[name]
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.column("start")
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.column("end")
+
+    @property
+    def has_words(self) -> bool:
+        return len(self.column("word_start")) > 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, i: int) -> str:
+        offsets = self.column("text_offsets")
+        return self.column("text")[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def texts(self) -> List[str]:
+        offsets = self.column("text_offsets").tolist()
+        blob = self.column("text").tobytes()
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    def words(self, i: int) -> List[dict]:
+        first, last = self.column("word_offsets")[i:i + 2]
+        offsets = self.column("word_text_offsets")
+        blob = self.column("word_text")
+        starts, ends = self.column("word_start"), self.column("word_end")
+        return [
+            {"word": blob[offsets[w]:offsets[w + 1]].tobytes().decode("utf-8"), "start": float(starts[w]), "end": float(ends[w])}
+            for w in range(first, last)
+        ]
+
+    def segment(self, i: int, words: bool = False) -> dict:
+        segment = {"id": i, "start": float(self.starts[i]), "end": float(self.ends[i]), "text": self.text(i)}
+        segment_words = self.words(i) if words and self.has_words else None
+        if segment_words:
+            segment["words"] = segment_words
+        return segment
+
+    def segments(self, words: bool = False) -> List[dict]:
+        """ Whisper-style segment dicts, with word timestamps when asked for and stored. """
+        starts, ends = self.starts.tolist(), self.ends.tolist()
+        segments = [{"id": i, "start": start, "end": end, "text": text}
+                    for i, (start, end, text) in enumerate(zip(starts, ends, self.texts()))]
+        if words and self.has_words:
+            word_offsets = self.column("word_offsets").tolist()
+            text_offsets = self.column("word_text_offsets").tolist()
+            blob = self.column("word_text").tobytes()
+            word_starts, word_ends = self.column("word_start").tolist(), self.column("word_end").tolist()
+            for i, segment in enumerate(segments):
+                if word_offsets[i] < word_offsets[i + 1]:
+                    segment["words"] = [
+                        {"word": blob[text_offsets[w]:text_offsets[w + 1]].decode("utf-8"), "start": word_starts[w], "end": word_ends[w]}
+                        for w in range(word_offsets[i], word_offsets[i + 1])
+                    ]
+        return segments
+
+    def close(self):
+        self._columns = {}
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Column views handed out earlier still reference the mapping; it is released with them
+                pass
+
+
+def open_transcript(path: str) -> Transcript:
+    """
+    Opens a stored transcript. Whisper JSON results written before the columnar format
+    (transcript_original.json) are read into memory instead, so old workspaces keep working.
+    """
+    with open(path, "rb") as file:
+        magic = file.read(len(MAGIC))
+    if magic == MAGIC:
+        return Transcript(path)
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    segments = [segment for segment in data.get("segments", []) if "text" in segment]
+    return Transcript(path, _columns(segments), data.get("language"))
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from app.utils.transcribers import get_transcriber
+from app.utils.audio_stream import SAMPLE_RATE
+from app.utils.telemetry import record_transcription
+
+# Worker processes transcribing shards in parallel (1 transcribes in-process).
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+# Shard length handed to each worker; shorter shards balance better across many cores.
+TRANSCRIBE_SHARD_SECONDS = float(os.getenv("TRANSCRIBE_SHARD_SECONDS", "120"))
+# Torch / CTranslate2 threads per worker (0 splits the machine's cores evenly between workers).
+TRANSCRIBE_THREADS_PER_WORKER = int(os.getenv("TRANSCRIBE_THREADS_PER_WORKER", "0"))
+
+_worker_transcriber = None
+
+
+def shift_result(result: dict, offset: float) -> dict:
+    """ Moves the timestamps of a Whisper result for audio starting `offset` seconds in. """
+    for segment in result["segments"]:
+        segment["seek"] = segment.get("seek", 0) + int(offset * 100)
+        segment["start"] += offset
+        segment["end"] += offset
+        if "words" in segment:
+            for word in segment["words"]:
+                word["start"] += offset
+                word["end"] += offset
+    return result
+
+
+def _init_worker(backend: str, model_size: str, threads: int):
+    global _worker_transcriber
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    # Load once per process so every shard after the first reuses the resident model
+    _worker_transcriber = get_transcriber(backend, model_size, threads)
+    _worker_transcriber.load()
+
+
+def _transcribe_shard(offset: float, samples, options: dict):
+    started = time.perf_counter()
+    result = _worker_transcriber.transcribe(samples, **options)
+    # Timing travels back with the result; worker processes have no metrics endpoint of their own
+    return shift_result(result, offset), len(samples) / SAMPLE_RATE, time.perf_counter() - started
+
+
+class TranscriptionPool:
+    """
+    Process pool transcribing pause-bounded shards of one audio stream in parallel.
+    Each worker keeps its own transcriber model resident; results come back in audio
+    order with timestamps already shifted to the shard's offset.
+    """
+
+    def __init__(self, workers: int = TRANSCRIBE_WORKERS, backend: str = None, model_size: str = None,
+                 threads_per_worker: int = TRANSCRIBE_THREADS_PER_WORKER):
+        self.workers = workers
+        self.backend = backend
+        self.model_size = model_size
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // max(1, workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the server process runs threads that must not be copied mid-state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.backend, self.model_size, self.threads_per_worker),
+                )
+            return self._executor
+
+    def transcribe_windows(self, windows, **transcribe_options):
+        """
+        Transcribes (offset_seconds, samples) windows and yields their results in order.
+        At most two shards per worker are decoded ahead, which bounds memory.
+        """
+        pool = self._pool()
+        pending = deque()
+        windows = iter(windows)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < 2 * self.workers:
+                    window = next(windows, None)
+                    if window is None:
+                        exhausted = True
+                        break
+                    offset, samples = window
+                    pending.append(pool.submit(_transcribe_shard, offset, samples, transcribe_options))
+                if not pending:
+                    return
+                result, audio_seconds, wall_seconds = pending.popleft().result()
+                record_transcription(audio_seconds, wall_seconds)
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+transcription_pool = TranscriptionPool()
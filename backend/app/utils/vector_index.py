@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import faiss
+import numpy as np
+from app.utils.telemetry import VECTOR_SEARCH_SECONDS
+from app.utils.transcript_store import write_transcript, open_transcript
+
+# Each video's index lives in <VECTOR_INDEX_DIR>/<video key>/.
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "indexes")
+# Number of video indexes kept resident; colder ones are dropped and re-mapped on demand.
+VECTOR_INDEX_CACHE = int(os.getenv("VECTOR_INDEX_CACHE", "32"))
+# Above this many vectors an index is rebuilt as an approximate one ("hnsw" or "ivf").
+VECTOR_INDEX_ANN_THRESHOLD = int(os.getenv("VECTOR_INDEX_ANN_THRESHOLD", "50000"))
+VECTOR_INDEX_ANN_TYPE = os.getenv("VECTOR_INDEX_ANN_TYPE", "hnsw")
+EMBEDDING_DIM = 384
+
+_INDEX_FILE = "index.faiss"
+_DOCUMENTS_FILE = "documents.tcol"
+# Documents of indexes written before they were stored as columns
+_LEGACY_DOCUMENTS_FILE = "documents.json"
+_META_FILE = "meta.json"
+
+
+def documents_digest(documents: list) -> str:
+    """ Identifies a document set, so an unchanged transcript is never re-embedded. """
+    digest = hashlib.sha1()
+    for document in documents:
+        digest.update(document["text"].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def build_index(vectors: np.ndarray, kind: str = "flat"):
+    """
+    Inner-product index over L2-normalised vectors, so scores are cosine similarities.
+    """
+    dim = vectors.shape[1] if len(vectors) else EMBEDDING_DIM
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = 64
+    elif kind == "ivf":
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = max(1, nlist // 16)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    if len(vectors):
+        index.add(vectors)
+    return index
+
+
+def normalized(vectors) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if len(vectors):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def write_documents(path: str, documents: list):
+    """ Stores documents ({"text", "start", "end"}) in the columnar transcript format. """
+    write_transcript(path, [
+        {"text": document["text"], "start": document.get("start") or 0.0, "end": document.get("end") or 0.0}
+        for document in documents
+    ])
+
+
+def save_index(path: str, index, documents: list, meta: dict):
+    """ Persists an index, its documents and its metadata; meta.json is written last. """
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(index, os.path.join(path, _INDEX_FILE + ".tmp"))
+    os.replace(os.path.join(path, _INDEX_FILE + ".tmp"), os.path.join(path, _INDEX_FILE))
+    write_documents(os.path.join(path, _DOCUMENTS_FILE), documents)
+    with open(os.path.join(path, _META_FILE), "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+
+
+class VideoIndex:
+    """
+    Vector index plus the documents (text and time range) of one video.
+    Documents are a memory-mapped columnar file, so loading an index parses nothing
+    and a search only decodes the documents it returns.
+    """
+
+    def __init__(self, video_id: str, path: str, index, meta: dict, mmapped: bool = False):
+        self.video_id = video_id
+        self.path = path
+        self.index = index
+        self.mmapped = mmapped
+        self.meta = meta
+        self._store = open_transcript(os.path.join(path, _DOCUMENTS_FILE))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._store)
+
+    def _document(self, i: int) -> dict:
+        return {"text": self._store.text(i), "start": float(self._store.starts[i]), "end": float(self._store.ends[i])}
+
+    def _all_documents(self) -> list:
+        return [
+            {"text": text, "start": start, "end": end}
+            for text, start, end in zip(self._store.texts(), self._store.starts.tolist(), self._store.ends.tolist())
+        ]
+
+    @property
+    def documents(self) -> list:
+        """ Every document, in index order. """
+        with self._lock:
+            return self._all_documents()
+
+    def search(self, query_vectors, top_k: int = 5) -> list:
+        """ Returns, per query, a list of (document, score) pairs with the best matches first. """
+        query_vectors = normalized(query_vectors)
+        with self._lock:
+            count = len(self._store)
+            if not count:
+                return [[] for _ in range(len(query_vectors))]
+            with VECTOR_SEARCH_SECONDS.time():
+                scores, indices = self.index.search(query_vectors, min(top_k, count))
+            return [
+                [(self._document(i), float(score)) for i, score in zip(row_indices, row_scores) if 0 <= i < count]
+                for row_indices, row_scores in zip(indices, scores)
+            ]
+
+    def vectors(self) -> np.ndarray:
+        """ The stored (normalised) vectors, in document order. """
+        with self._lock:
+            if not self.index.ntotal:
+                return np.empty((0, self.index.d), np.float32)
+            if self.meta["kind"] == "ivf":
+                faiss.extract_index_ivf(self.index).make_direct_map()
+            return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def add(self, vectors, documents: list):
+        """ Appends vectors incrementally, switching to an ANN index once it grows large. """
+        vectors = normalized(vectors)
+        with self._lock:
+            existing_documents = self._all_documents()
+            if self.mmapped:
+                # Memory-mapped indexes are read-only; load a private copy before mutating
+                self.index = faiss.read_index(os.path.join(self.path, _INDEX_FILE))
+                self.mmapped = False
+            if self.meta["kind"] == "flat" and len(existing_documents) + len(documents) > VECTOR_INDEX_ANN_THRESHOLD:
+                existing = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else np.empty((0, vectors.shape[1]), np.float32)
+                self.index = build_index(np.vstack([existing, vectors]), VECTOR_INDEX_ANN_TYPE)
+                self.meta["kind"] = VECTOR_INDEX_ANN_TYPE
+            else:
+                self.index.add(vectors)
+            all_documents = existing_documents + list(documents)
+            self.meta["count"] = len(all_documents)
+            self.meta["digest"] = documents_digest(all_documents)
+            save_index(self.path, self.index, all_documents, self.meta)
+            previous, self._store = self._store, open_transcript(os.path.join(self.path, _DOCUMENTS_FILE))
+            previous.close()
+
+
+class IndexRegistry:
+    """
+    Per-video index store. Indexes are persisted to disk, memory-mapped when loaded
+    and kept in a bounded LRU, so retrieval for one video never touches another
+    video's vectors and search cost does not grow with the corpus.
+    """
+
+    def __init__(self, root: str = VECTOR_INDEX_DIR, capacity: int = VECTOR_INDEX_CACHE):
+        self.root = root
+        self.capacity = capacity
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.root, video_id)
+
+    def exists(self, video_id: str) -> bool:
+        return os.path.exists(os.path.join(self._path(video_id), _META_FILE))
+
+    def video_ids(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.exists(name))
+
+    def meta(self, video_id: str) -> dict:
+        """ Stored metadata (count, digest, kind) of a video's index, read without loading the index. """
+        with open(os.path.join(self._path(video_id), _META_FILE), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def latest_video_id(self):
+        video_ids = self.video_ids()
+        if not video_ids:
+            return None
+        return max(video_ids, key=lambda video_id: os.path.getmtime(os.path.join(self._path(video_id), _META_FILE)))
+
+    def _remember(self, video_index: VideoIndex):
+        self._loaded[video_index.video_id] = video_index
+        self._loaded.move_to_end(video_index.video_id)
+        while len(self._loaded) > self.capacity:
+            self._loaded.popitem(last=False)
+
+    def get(self, video_id: str):
+        """ Returns the VideoIndex for video_id, loading it from disk if needed, or None. """
+        with self._lock:
+            if video_id in self._loaded:
+                self._loaded.move_to_end(video_id)
+                return self._loaded[video_id]
+        if not video_id or not self.exists(video_id):
+            return None
+
+        path = self._path(video_id)
+        with open(os.path.join(path, _META_FILE), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        legacy_documents = os.path.join(path, _LEGACY_DOCUMENTS_FILE)
+        if not os.path.exists(os.path.join(path, _DOCUMENTS_FILE)) and os.path.exists(legacy_documents):
+            with open(legacy_documents, "r", encoding="utf-8") as file:
+                write_documents(os.path.join(path, _DOCUMENTS_FILE), json.load(file))
+            os.remove(legacy_documents)
+        index_path = os.path.join(path, _INDEX_FILE)
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            mmapped = True
+        except RuntimeError:
+            # Not every index type supports mmap loading
+            index = faiss.read_index(index_path)
+            mmapped = False
+
+        video_index = VideoIndex(video_id, path, index, meta, mmapped)
+        with self._lock:
+            self._remember(video_index)
+        return video_index
+
+    def build(self, video_id: str, vectors, documents: list) -> VideoIndex:
+        """ (Re)builds and persists the index of a video from scratch. """
+        vectors = normalized(vectors)
+        kind = VECTOR_INDEX_ANN_TYPE if len(documents) > VECTOR_INDEX_ANN_THRESHOLD else "flat"
+        meta = {"count": len(documents), "digest": documents_digest(documents), "kind": kind}
+        path = self._path(video_id)
+        index = build_index(vectors, kind)
+        save_index(path, index, documents, meta)
+        video_index = VideoIndex(video_id, path, index, meta)
+        with self._lock:
+            self._remember(video_index)
+        return video_index
+
+    def update(self, video_id: str, documents: list, encode) -> VideoIndex:
+        """
+        Brings the index of a video up to `documents`, embedding texts with encode(texts).
+        An unchanged index is reused; when the stored documents are a prefix of the new ones
+        (the transcript grew) only the new documents are embedded and appended; otherwise
+        the index is rebuilt.
+        """
+        video_index = self.get(video_id)
+        if video_index is not None:
+            stored = len(video_index)
+            if video_index.meta.get("digest") == documents_digest(documents):
+                return video_index
+            if 0 < stored < len(documents) and video_index.meta.get("digest") == documents_digest(documents[:stored]):
+                added = documents[stored:]
+                video_index.add(encode([document["text"] for document in added]), added)
+                return video_index
+        return self.build(video_id, encode([document["text"] for document in documents]), documents)
+
+index_registry = IndexRegistry()
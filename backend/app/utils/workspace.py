@@ -0,0 +1,143 @@
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Every job gets its own directory under WORKSPACE_ROOT.
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "temp")
+# Finished workspaces older than this many seconds are deleted (0 keeps them forever).
+WORKSPACE_TTL = float(os.getenv("WORKSPACE_TTL", "86400"))
+
+_JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+
+class JobWorkspace:
+    """
+    Paths used by a single /process-youtube job. Nothing outside `path` is ever touched,
+    so any number of jobs can run side by side.
+    """
+
+    def __init__(self, job_id: str, root: str = WORKSPACE_ROOT):
+        self.job_id = job_id
+        self.root = root
+        self.path = os.path.join(root, job_id)
+
+    @property
+    def video_path(self) -> str:
+        return os.path.join(self.path, "video.mp4")
+
+    @property
+    def audio_path(self) -> str:
+        return os.path.join(self.path, "audio.wav")
+
+    @property
+    def segments_dir(self) -> str:
+        return os.path.join(self.path, "segments")
+
+    @property
+    def transcript_path(self) -> str:
+        return os.path.join(self.path, "transcript.tcol")
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.segments_dir, "metadata.json")
+
+    @property
+    def segments_url(self) -> str:
+        """ URL prefix under which this job's segment files are served. """
+        return f"/temp/{self.job_id}/segments"
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def touch(self):
+        """ Marks the workspace as recently used so the TTL cleanup keeps it. """
+        if self.exists():
+            os.utime(self.path, None)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    return bool(_JOB_ID_PATTERN.match(job_id or ""))
+
+
+def create_workspace(job_id: str = None, root: str = WORKSPACE_ROOT) -> JobWorkspace:
+    """
+    Creates a fresh workspace for a new job and opportunistically purges expired ones.
+    """
+    cleanup_expired_workspaces(root=root)
+    workspace = JobWorkspace(job_id or new_job_id(), root)
+    os.makedirs(workspace.segments_dir, exist_ok=True)
+    return workspace
+
+
+def get_workspace(job_id: str, root: str = WORKSPACE_ROOT):
+    """
+    Returns the existing workspace for `job_id`, or None if the id is malformed or unknown.
+    """
+    if not is_valid_job_id(job_id):
+        return None
+    workspace = JobWorkspace(job_id, root)
+    return workspace if workspace.exists() else None
+
+
+def latest_workspace(root: str = WORKSPACE_ROOT):
+    """ Most recently modified workspace, used for the legacy un-scoped routes. """
+    if not os.path.isdir(root):
+        return None
+    candidates = [name for name in os.listdir(root) if is_valid_job_id(name) and os.path.isdir(os.path.join(root, name))]
+    if not candidates:
+        return None
+    newest = max(candidates, key=lambda name: os.path.getmtime(os.path.join(root, name)))
+    return JobWorkspace(newest, root)
+
+
+@contextmanager
+def active_job(workspace: JobWorkspace):
+    """
+    Protects a workspace from TTL cleanup while its job is running.
+    """
+    with _active_lock:
+        _active_jobs.add(workspace.job_id)
+    try:
+        yield workspace
+    finally:
+        with _active_lock:
+            _active_jobs.discard(workspace.job_id)
+        workspace.touch()
+
+
+def cleanup_expired_workspaces(ttl: float = WORKSPACE_TTL, root: str = WORKSPACE_ROOT) -> list:
+    """
+    Deletes workspaces that are not running and have not been touched for `ttl` seconds.
+    Returns the removed job ids.
+    """
+    if not ttl or not os.path.isdir(root):
+        return []
+
+    now = time.time()
+    removed = []
+    with _active_lock:
+        active = set(_active_jobs)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not is_valid_job_id(name) or name in active or not os.path.isdir(path):
+            continue
+        try:
+            if now - os.path.getmtime(path) > ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(name)
+        except FileNotFoundError:
+            continue
+    return removed
@@ -0,0 +1,93 @@
+"""
+Throughput and accuracy comparison of the transcriber backends.
+
+Run from backend/:
+
+    python -m benchmarks.compare_transcribers audio.mp3 --backends whisper,faster-whisper --reference reference.txt
+
+Every backend transcribes the file through the same windowed path the pipeline uses.
+Accuracy is the word error rate against --reference, or against the first backend's
+transcript when no reference is given.
+"""
+import argparse
+import json
+import time
+from app.utils.alignment import tokenize
+from app.utils.audio_stream import probe_duration
+from app.utils.downloader import transcribe_stream
+from app.utils.transcribers import get_transcriber, TRANSCRIBERS
+
+
+def word_error_rate(reference: list, hypothesis: list) -> float:
+    """ Word-level Levenshtein distance divided by the reference length. """
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(reference)
+
+
+def compare(audio_path: str, backends: list, model_size: str = None, reference_text: str = None,
+            word_timestamps: bool = False) -> dict:
+    duration = probe_duration(audio_path)
+    reference = tokenize(reference_text) if reference_text is not None else None
+    reference_name = "reference" if reference is not None else backends[0]
+    results = []
+
+    for backend in backends:
+        transcriber = get_transcriber(backend, model_size)
+        started = time.perf_counter()
+        transcriber.load()
+        load_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = transcribe_stream(transcriber, audio_path, task="transcribe", word_timestamps=word_timestamps)
+        transcribe_seconds = time.perf_counter() - started
+
+        words = tokenize(result["text"])
+        if reference is None:
+            reference = words
+        results.append({
+            **transcriber.config(),
+            "load_seconds": round(load_seconds, 3),
+            "transcribe_seconds": round(transcribe_seconds, 3),
+            "realtime_factor": round(duration / transcribe_seconds, 2) if transcribe_seconds else None,
+            "segments": len(result["segments"]),
+            "words": len(words),
+            "wer": round(word_error_rate(reference, words), 4),
+        })
+
+    return {"audio": audio_path, "duration_seconds": duration, "wer_against": reference_name, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare transcriber backends on one audio file.")
+    parser.add_argument("audio", help="Any ffmpeg-readable audio or video file")
+    parser.add_argument("--backends", default="whisper,faster-whisper",
+                        help=f"Comma separated, from {', '.join(sorted(TRANSCRIBERS))}")
+    parser.add_argument("--model", default=None, help="Model size (default: WHISPER_MODEL_SIZE)")
+    parser.add_argument("--reference", default=None, help="Text file with the reference transcript")
+    parser.add_argument("--word-timestamps", action="store_true")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    reference_text = None
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as file:
+            reference_text = file.read()
+
+    report = compare(args.audio, [name.strip() for name in args.backends.split(",") if name.strip()],
+                     args.model, reference_text, args.word_timestamps)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+End-to-end benchmark of the ingest pipeline on synthetic audio.
+
+Run from backend/:
+
+    python -m benchmarks.pipeline_benchmark --lengths 60,300,900 --output results.json
+    python -m benchmarks.pipeline_benchmark --baseline previous.json   # exits 1 on a regression
+
+Each audio length runs in a fresh process, so peak RSS and model loading are measured per run.
+Downloads are served by a local yt-dlp stand-in and LLM calls by a local OpenAI-compatible
+server, so only our own code (plus the configured transcriber and embedding model) is timed.
+Stage timings come from the job's own stage tracking; transcribe and segment overlap by design.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+import numpy as np
+from tests.llm_stub import LLMStub
+
+FIXTURE_SAMPLE_RATE = 16000
+BENCHMARK_URL = "https://www.youtube.com/watch?v=bench{length:06d}"
+
+
+def write_fixture_audio(path: str, seconds: float, seed: int = 0) -> str:
+    """
+    Speech-like synthetic audio: 1-4 s voiced bursts (harmonic tones with jitter)
+    separated by short pauses, so pause detection and chunking behave as on real speech.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * FIXTURE_SAMPLE_RATE)
+    with wave.open(path, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(FIXTURE_SAMPLE_RATE)
+        written = 0
+        while written < total:
+            burst = min(total - written, int(rng.uniform(1.0, 4.0) * FIXTURE_SAMPLE_RATE))
+            t = np.arange(burst) / FIXTURE_SAMPLE_RATE
+            pitch = rng.uniform(90, 220)
+            voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+            samples = 0.2 * voiced * np.hanning(burst) + 0.01 * rng.standard_normal(burst)
+            pause = min(total - written - burst, int(rng.uniform(0.2, 0.8) * FIXTURE_SAMPLE_RATE))
+            samples = np.concatenate([samples, 0.002 * rng.standard_normal(max(0, pause))])
+            writer.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+            written += len(samples)
+    return path
+
+
+class FakeYoutubeDL:
+    """ Stand-in for yt_dlp.YoutubeDL that "downloads" the fixture file for the URL. """
+
+    fixtures = {}
+
+    def __init__(self, options: dict):
+        self.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def download(self, urls):
+        for url in urls:
+            target = self.options["outtmpl"].replace("%(ext)s", "wav")
+            shutil.copyfile(self.fixtures[url], target)
+
+
+def benchmark_reply(body: dict) -> str:
+    """ Stub LLM reply: segmentation windows are echoed back in ~60 word chunks, as the real model roughly does. """
+    messages = body["messages"]
+    if any("segmentation assistant" in message["content"] for message in messages):
+        words = messages[-1]["content"].split("\n\n", 1)[-1].split()
+        return "\n".join(
+            f"CHUNK_NO.{i // 60 + 1}: {' '.join(words[i:i + 60])}" for i in range(0, len(words), 60)
+        )
+    return "A short answer about the topic. https://example.com/source\nSUMMARY: A one paragraph summary."
+
+
+class HashingEmbedder:
+    """ Deterministic bag-of-words embedder standing in for SentenceTransformer. """
+
+    def encode(self, texts, batch_size: int = 32, normalize_embeddings: bool = False, **options):
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(token.encode()).hexdigest(), 16) % 384] += 1.0
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+def run_one(length: float, workdir: str, llm_latency: float, stub_embeddings: bool) -> dict:
+    """ Runs the pipeline once in this process; must be called before any app module is imported. """
+    server = LLMStub(benchmark_reply, latency=llm_latency)
+    os.environ["GROQ_BASE_URL"] = server.url
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("TRANSCRIBER_BACKEND", "stub")
+    os.environ.setdefault("LLM_REQUESTS_PER_SECOND", "0")
+    for name, folder in (("WORKSPACE_ROOT", "temp"), ("ARTIFACT_CACHE_DIR", "cache"), ("VECTOR_INDEX_DIR", "indexes")):
+        os.environ[name] = os.path.join(workdir, folder)
+
+    url = BENCHMARK_URL.format(length=int(length))
+    FakeYoutubeDL.fixtures[url] = write_fixture_audio(os.path.join(workdir, "fixture.wav"), length)
+
+    imports_started = time.perf_counter()
+    import app.utils.downloader as downloader
+    import app.main as pipeline
+    from app.utils.model_registry import model_registry
+    from app.utils.workspace import create_workspace
+    imports_seconds = time.perf_counter() - imports_started
+
+    downloader.yt_dlp.YoutubeDL = FakeYoutubeDL
+    if stub_embeddings:
+        model_registry.register_loader("embedding", lambda name: HashingEmbedder())
+
+    started = time.perf_counter()
+    workspace = create_workspace()
+    job = pipeline.job_manager.submit(workspace.job_id, pipeline.run_youtube_pipeline, workspace, url)
+    result = job.future.result()
+    total_seconds = time.perf_counter() - started
+    pipeline.job_manager.shutdown()
+    pipeline.transcription_pool.shutdown()
+    server.close()
+
+    stages = {}
+    for name, info in job.stages.items():
+        if info["started_at"] is None:
+            continue
+        seconds = info["finished_at"] - info["started_at"]
+        stages[name] = {"seconds": round(seconds, 4), "realtime_factor": round(length / seconds, 2) if seconds else None}
+
+    return {
+        "audio_seconds": length,
+        "total_seconds": round(total_seconds, 4),
+        "realtime_factor": round(length / total_seconds, 2) if total_seconds else None,
+        "import_seconds": round(imports_seconds, 4),
+        "stages": stages,
+        "chunks": len(result["segments"]),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def environment() -> dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        revision = ""
+    return {
+        "revision": revision or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "transcriber": os.getenv("TRANSCRIBER_BACKEND", "stub"),
+        "segmenter": os.getenv("SEGMENTER", "llm"),
+    }
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> list:
+    """ Stages (and totals) more than `tolerance` slower than the baseline run of the same length. """
+    previous = {run["audio_seconds"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        old = previous.get(run["audio_seconds"])
+        if not old:
+            continue
+        pairs = [("total", run["total_seconds"], old["total_seconds"])]
+        pairs += [
+            (stage, info["seconds"], old["stages"][stage]["seconds"])
+            for stage, info in run["stages"].items() if stage in old.get("stages", {})
+        ]
+        for name, now, before in pairs:
+            if before and now > before * (1 + tolerance):
+                regressions.append({"audio_seconds": run["audio_seconds"], "stage": name,
+                                    "seconds": now, "baseline_seconds": before})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest pipeline on synthetic audio.")
+    parser.add_argument("--lengths", default="60,300,900", help="Comma separated audio lengths in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the LLM stand-in waits per call")
+    parser.add_argument("--stub-embeddings", action="store_true", help="Use a hashing embedder instead of SentenceTransformer")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--run-one", type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        workdir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+        try:
+            print(json.dumps(run_one(args.run_one, workdir, args.llm_latency, args.stub_embeddings)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return
+
+    runs = []
+    for length in [float(value) for value in args.lengths.split(",") if value.strip()]:
+        command = [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--run-one", str(length),
+                   "--llm-latency", str(args.llm_latency)]
+        if args.stub_embeddings:
+            command.append("--stub-embeddings")
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"Benchmark run for {length:g}s of audio failed.")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {"environment": environment(), "llm_latency": args.llm_latency, "runs": runs}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            report["regressions"] = find_regressions(report, json.load(file), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import pytest
+from tests.llm_stub import LLMStub
+
+
+@pytest.fixture
+def llm_stub():
+    """ Local chat completions server that replies with the last message's content. """
+    stub = LLMStub()
+    yield stub
+    stub.close()
@@ -0,0 +1,100 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+Used by the executor tests and the pipeline benchmark, so LLM calls never leave the machine.
+"""
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def echo(body: dict) -> str:
+    """ Default reply: the content of the last message. """
+    return body["messages"][-1]["content"]
+
+
+class _LLMStubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so connection pooling is exercised
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status, headers, content = self.stub.handle(body)
+        if status != 200:
+            self._send_json(status, {"error": {"message": content, "type": "stub_error"}}, headers)
+        elif body.get("stream"):
+            self._send_stream(body["model"], content)
+        else:
+            self._send_json(200, {
+                "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, content: str):
+        # Server-sent events, one word per chunk; the connection is closed to end the body
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in content.split(" "):
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class LLMStub:
+    """
+    Chat completions server on a free local port. Every request body is recorded;
+    replies come from respond(body) after `latency` seconds, unless a failure was queued with fail_next.
+    """
+
+    def __init__(self, respond=echo, latency: float = 0.0):
+        self.respond = respond
+        self.latency = latency
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+        handler = type("LLMStubHandler", (_LLMStubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def fail_next(self, status: int, times: int = 1, headers: dict = None):
+        """ Answers the next `times` requests with an error status instead of a completion. """
+        with self._lock:
+            self._failures.extend([(status, headers or {})] * times)
+
+    def handle(self, body: dict):
+        """ (status, headers, content) of the reply to one request. """
+        with self._lock:
+            self.requests.append(body)
+            failure = self._failures.pop(0) if self._failures else None
+        if failure:
+            return failure[0], failure[1], f"stub error {failure[0]}"
+        time.sleep(self.latency)
+        return 200, {}, self.respond(body)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,71 @@
+import pytest
+from app.utils.alignment import align_chunks_to_segments, timed_tokens, tokenize
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": " Welcome to the show."},
+    {"start": 4.0, "end": 10.0, "text": " Today we talk about rockets and fuel."},
+    {"start": 10.0, "end": 14.0, "text": " Then we cover the weather."},
+]
+
+
+def test_token_times_are_interpolated_within_segments():
+    tokens, times = timed_tokens(SEGMENTS[:1])
+    assert tokens == ["welcome", "to", "the", "show"]
+    assert times == [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0), (3.0, 4.0)]
+
+
+def test_word_timestamps_are_used_when_present():
+    segment = {"start": 0.0, "end": 4.0, "text": " Hi there",
+               "words": [{"word": " Hi", "start": 0.5, "end": 0.9}, {"word": " there", "start": 2.0, "end": 2.6}]}
+    assert timed_tokens([segment]) == (["hi", "there"], [(0.5, 0.9), (2.0, 2.6)])
+
+
+def test_chunks_tile_the_audio_at_their_first_words():
+    chunks = ["Welcome to the show.", "Today we talk about rockets", "and fuel. Then we cover the weather."]
+    ranges = align_chunks_to_segments(chunks, SEGMENTS)
+
+    assert ranges[0] == (0.0, 4.0)
+    assert ranges[1] == (4.0, pytest.approx(4.0 + 5 * 6 / 7))
+    assert ranges[2] == (pytest.approx(4.0 + 5 * 6 / 7), 14.0)
+
+
+def test_rephrased_chunks_fall_back_to_their_expected_position():
+    # The model reworded the start of the second chunk, so no anchor matches
+    ranges = align_chunks_to_segments(["Welcome to the show.", "Now: rockets and fuel, then weather."], SEGMENTS)
+    assert ranges[0][0] == 0.0 and ranges[-1][1] == 14.0
+    assert ranges[0][1] == ranges[1][0] == 4.0
+
+
+def test_empty_inputs():
+    assert align_chunks_to_segments([], SEGMENTS) == []
+    assert align_chunks_to_segments(["a", "b"], []) == [(0.0, 0.0), (0.0, 0.0)]
+
+
+RUSSIAN_SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": " Добро пожаловать на шоу."},
+    {"start": 4.0, "end": 10.0, "text": " Сегодня мы говорим о ракетах и топливе."},
+    {"start": 10.0, "end": 14.0, "text": " Потом поговорим о погоде."},
+]
+
+
+def test_accented_words_stay_whole():
+    assert tokenize("Grüße aus Köln") == ["grüße", "aus", "köln"]
+    # Decomposed umlauts are normalized before matching
+    assert tokenize("Ko\u0308ln") == ["köln"]
+
+
+def test_non_latin_chunks_align_to_their_first_words():
+    chunks = ["Добро пожаловать на шоу.", "Сегодня мы говорим о ракетах и топливе.", "Потом поговорим о погоде."]
+    assert align_chunks_to_segments(chunks, RUSSIAN_SEGMENTS) == [(0.0, 4.0), (4.0, 10.0), (10.0, 14.0)]
+
+
+def test_cjk_text_is_aligned_per_character():
+    segments = [{"start": 0.0, "end": 4.0, "text": "今天很好。"}, {"start": 4.0, "end": 8.0, "text": "我们谈论火箭。"}]
+    assert tokenize("今天很好") == ["今", "天", "很", "好"]
+    assert align_chunks_to_segments(["今天很好。", "我们谈论火箭。"], segments) == [(0.0, 4.0), (4.0, 8.0)]
+
+
+def test_untokenizable_transcript_is_split_by_text_length():
+    segments = [{"start": 2.0, "end": 5.0, "text": " ♪ ♪"}, {"start": 5.0, "end": 11.0, "text": " ♪"}]
+    ranges = align_chunks_to_segments(["ab", "abcd"], segments)
+    assert ranges == [(2.0, 5.0), (5.0, 11.0)]
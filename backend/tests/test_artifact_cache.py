@@ -0,0 +1,31 @@
+import os
+from app.utils.artifact_cache import ArtifactCache
+
+
+def write(path: str, size: int) -> str:
+    with open(path, "wb") as file:
+        file.write(b"x" * size)
+    return path
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=2500)
+    for stage in ("a", "b"):
+        cache.put("video", stage, {}, files={"f": write(str(tmp_path / stage), 1000)})
+    assert cache.get("video", "a", {}) is not None
+    cache.put("video", "c", {}, files={"f": write(str(tmp_path / "c"), 1000)})
+
+    assert cache.get("video", "b", {}) is None
+    assert cache.get("video", "a", {}) is not None and cache.get("video", "c", {}) is not None
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] == 2000
+
+
+def test_manifest_is_rebuilt_from_disk(tmp_path):
+    root = str(tmp_path / "cache")
+    first = ArtifactCache(root, max_bytes=10_000)
+    first.put("video", "a", {"x": 1}, data=[1, 2, 3], files={"f": write(str(tmp_path / "a"), 500)})
+
+    second = ArtifactCache(root, max_bytes=10_000)
+    assert second.stats()["entries"] == 1 and second.stats()["bytes"] == first.stats()["bytes"]
+    entry = second.get("video", "a", {"x": 1})
+    assert entry.data == [1, 2, 3] and os.path.getsize(entry.file("f")) == 500
@@ -0,0 +1,101 @@
+import zlib
+import numpy as np
+import pytest
+from app.utils import corpus_index as corpus_module
+from app.utils.corpus_index import CorpusIndex
+from app.utils.vector_index import IndexRegistry
+
+DIM = 16
+
+
+def video_documents(video_id: str, count: int = 10) -> list:
+    return [{"text": f"{video_id} segment {i}", "start": i * 10.0, "end": i * 10.0 + 10} for i in range(count)]
+
+
+def vectors_for(documents: list) -> np.ndarray:
+    """ A fixed random unit vector per text, so identical texts embed identically. """
+    return np.vstack([np.random.default_rng(zlib.crc32(document["text"].encode("utf-8"))).standard_normal(DIM)
+                      for document in documents]).astype(np.float32)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return IndexRegistry(str(tmp_path / "indexes"))
+
+
+@pytest.fixture
+def corpus(tmp_path, registry):
+    corpus = CorpusIndex(str(tmp_path / "corpus"), shards=3, threads=2)
+    for video_id in ("alpha", "beta", "gamma", "delta"):
+        documents = video_documents(video_id)
+        corpus.add_video(registry.build(video_id, vectors_for(documents), documents))
+    return corpus
+
+
+def query(text: str) -> np.ndarray:
+    return vectors_for([{"text": text}])[0]
+
+
+def test_best_match_comes_first_across_videos(corpus):
+    hits = corpus.search(query("gamma segment 3"), limit=5)
+    assert hits[0]["video_id"] == "gamma" and hits[0]["start"] == 30.0 and hits[0]["text"] == "gamma segment 3"
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+
+
+def test_pages_follow_the_full_ranking(corpus):
+    ranking = corpus.search(query("beta segment 1"), limit=40)
+    assert len(ranking) == 40
+    pages = [corpus.search(query("beta segment 1"), limit=7, offset=offset) for offset in range(0, 40, 7)]
+    assert [hit for page in pages for hit in page] == ranking
+
+
+def test_filters(corpus):
+    hits = corpus.search(query("alpha segment 2"), limit=40, video_ids=["beta", "delta"], start=25.0, end=60.0)
+    assert {hit["video_id"] for hit in hits} == {"beta", "delta"}
+    # Segments overlapping [25, 60): starts 20, 30, 40, 50
+    assert sorted({hit["start"] for hit in hits}) == [20.0, 30.0, 40.0, 50.0] and len(hits) == 8
+
+    assert all(hit["score"] >= 0.5 for hit in corpus.search(query("alpha segment 2"), limit=40, min_score=0.5))
+    assert corpus.search(query("alpha segment 2"), video_ids=["unknown"]) == []
+
+
+def test_reindexed_video_replaces_its_rows(tmp_path, corpus, registry):
+    shard = corpus.shard_for("beta")
+    for version in range(6):
+        documents = video_documents(f"beta-v{version}", count=4)
+        corpus.add_video(registry.build("beta", vectors_for(documents), documents))
+
+    hits = corpus.search(query("beta segment 1"), limit=100, video_ids=["beta"])
+    assert sorted(hit["text"] for hit in hits) == [f"beta-v5 segment {i}" for i in range(4)]
+    # Replaced rows are tombstoned and compacted away once they pile up
+    dead = len(shard) - int(np.asarray(shard.columns["live"]).sum())
+    assert 0 < dead <= corpus_module.CORPUS_COMPACT_FRACTION * len(shard)
+
+    reloaded = CorpusIndex(corpus.root, shards=3, threads=1)
+    assert reloaded.search(query("beta-v5 segment 2"), limit=20) == corpus.search(query("beta-v5 segment 2"), limit=20)
+
+
+def test_unchanged_video_is_not_added_twice(corpus, registry):
+    rows = len(corpus)
+    corpus.add_video(registry.get("alpha"))
+    assert len(corpus) == rows
+
+
+def test_sync_adds_videos_indexed_elsewhere(tmp_path, corpus, registry):
+    fresh = CorpusIndex(str(tmp_path / "fresh"), shards=2, threads=1)
+    fresh.sync(registry)
+    assert len(fresh) == len(corpus) == 40
+
+
+def test_filters_on_an_ann_shard(tmp_path, registry, monkeypatch):
+    monkeypatch.setattr(corpus_module, "VECTOR_INDEX_ANN_THRESHOLD", 50)
+    corpus = CorpusIndex(str(tmp_path / "ann"), shards=1, threads=1)
+    for video_id in ("one", "two"):
+        documents = video_documents(video_id, count=40)
+        corpus.add_video(registry.build(video_id, vectors_for(documents), documents))
+    assert corpus.shards[0].kind == corpus_module.VECTOR_INDEX_ANN_TYPE
+
+    hits = corpus.search(query("one segment 5"), limit=10, video_ids=["two"])
+    assert len(hits) == 10 and {hit["video_id"] for hit in hits} == {"two"}
+    assert corpus.search(query("one segment 5"), limit=1)[0]["text"] == "one segment 5"
@@ -0,0 +1,18 @@
+from app.utils.downloader import merge_window_result, split_long_segment
+
+
+def test_window_results_are_merged_in_order():
+    merged = {"text": "", "segments": [], "language": None}
+    first = {"text": " a b", "language": "en", "segments": [{"id": 0, "text": " a"}, {"id": 1, "text": " b"}]}
+    second = {"text": " c", "language": "de", "segments": [{"id": 0, "text": " c"}]}
+
+    assert merge_window_result(merged, first) == first["segments"]
+    merge_window_result(merged, second)
+    assert merged["text"] == " a b c" and merged["language"] == "en"
+    assert [(segment["id"], segment["text"]) for segment in merged["segments"]] == [(0, " a"), (1, " b"), (2, " c")]
+
+
+def test_long_segments_are_split():
+    pieces = split_long_segment({"start": 10.0, "end": 45.0, "text": " one two three four"}, 15)
+    assert [(piece["start"], piece["end"]) for piece in pieces] == [(10.0, 25.0), (25.0, 40.0), (40.0, 45.0)]
+    assert split_long_segment({"start": 0.0, "end": 5.0, "text": " short "}, 15) == [{"start": 0.0, "end": 5.0, "text": "short"}]
@@ -0,0 +1,64 @@
+import itertools
+import pytest
+from app.utils import llama_segmenter
+from app.utils.llama_segmenter import build_windows, segment_transcript_windowed
+
+
+def topic_chunks(text: str) -> list:
+    """ Stand-in for the LLM: one chunk per run of words sharing their first letter. """
+    return [" ".join(words) for _, words in itertools.groupby(text.split(), key=lambda word: word[0])]
+
+
+def topic_segments(topics: str, segments_per_topic: int = 6, words_per_segment: int = 5) -> list:
+    segments = []
+    for topic in topics:
+        for i in range(segments_per_topic):
+            words = " ".join(f"{topic}{i}{w}" for w in range(words_per_segment))
+            segments.append({"start": float(len(segments)), "end": float(len(segments) + 1), "text": f" {words}"})
+    return segments
+
+
+@pytest.mark.parametrize("word_counts", [[5] * 40, [1, 30, 2, 2, 50, 3, 1, 1, 9, 4] * 3, [100], [3, 3]])
+def test_windows_cover_the_transcript_with_overlap(word_counts):
+    window_words, overlap_words = 40, 10
+    windows = build_windows(word_counts, window_words, overlap_words)
+
+    assert windows[0][0] == 0 and windows[-1][1] == len(word_counts)
+    for (start, end), (next_start, next_end) in zip(windows, windows[1:]):
+        # A single oversized segment forms a window of its own that nothing can overlap
+        assert start < next_start <= end <= next_end
+        assert sum(word_counts[start:end]) >= window_words
+        # The overlap is as large as asked, unless only one segment of the window could be shared
+        assert sum(word_counts[next_start:end]) >= overlap_words or next_start == start + 1
+
+
+def test_no_segments_no_windows():
+    assert build_windows([], 40, 10) == []
+
+
+def test_windows_are_stitched_into_whole_topics(monkeypatch):
+    monkeypatch.setattr(llama_segmenter, "segment_text_with_llama70b", topic_chunks)
+    segments = topic_segments("abcdefgh")
+    chunks = segment_transcript_windowed(segments, window_words=60, overlap_words=15, max_workers=2)
+
+    assert [chunk[0] for chunk in chunks] == list("abcdefgh")
+    assert " ".join(chunks) == " ".join(segment["text"].strip() for segment in segments)
+
+
+def test_streamed_segments_give_the_same_windows(monkeypatch):
+    window_texts = []
+
+    def recording(text):
+        window_texts.append(text)
+        return topic_chunks(text)
+
+    monkeypatch.setattr(llama_segmenter, "segment_text_with_llama70b", recording)
+    segments = topic_segments("abcdef", segments_per_topic=5, words_per_segment=3)
+    # A generator is consumed as it goes, as with a transcription still in progress
+    streamed = segment_transcript_windowed((segment for segment in segments), window_words=40, overlap_words=10, max_workers=1)
+
+    word_counts = [len(segment["text"].split()) for segment in segments]
+    expected = [" ".join(segment["text"].strip() for segment in segments[start:end])
+                for start, end in build_windows(word_counts, 40, 10)]
+    assert window_texts == expected
+    assert streamed == segment_transcript_windowed(segments, window_words=40, overlap_words=10, max_workers=1)
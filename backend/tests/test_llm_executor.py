@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from groq import AsyncGroq, BadRequestError, InternalServerError
+from app.utils.llm_executor import AsyncLLMExecutor
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def executor_threads() -> int:
+    return sum(1 for thread in threading.enumerate() if thread.name == "llm-executor" and thread.is_alive())
+
+
+class CannedClient:
+    """ Minimal stand-in for the SDK client that answers every completion with `content`. """
+
+    def __init__(self, content: str):
+        async def create(**params):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def test_failed_client_setup_reuses_one_loop_and_retries():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) <= 3:
+            raise RuntimeError("GROQ_API_KEY is not set")
+        return CannedClient("ok")
+
+    executor = AsyncLLMExecutor(client_factory=factory)
+    threads_before = executor_threads()
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="GROQ_API_KEY"):
+            executor.run(executor.complete(model="m", messages=MESSAGES))
+    assert executor_threads() == threads_before + 1
+
+    assert executor.run(executor.complete(model="m", messages=MESSAGES)) == "ok"
+    assert len(attempts) == 4
+    assert executor_threads() == threads_before + 1
+
+
+def stub_executor(stub, **limits) -> AsyncLLMExecutor:
+    """ Executor talking to the stub server, with fast backoff unless overridden. """
+    limits = {"backoff_base": 0.01, "backoff_max": 0.05, **limits}
+    return AsyncLLMExecutor(client_factory=lambda: AsyncGroq(base_url=stub.url, api_key="test", max_retries=0), **limits)
+
+
+def ask(executor, text: str, lane: str = "background") -> str:
+    return executor.run(executor.complete(lane=lane, model="m", messages=[{"role": "user", "content": text}]))
+
+
+def test_completion_through_the_stub(llm_stub):
+    assert ask(stub_executor(llm_stub), "  hello  ") == "hello"
+    assert llm_stub.requests[0]["messages"][0]["content"] == "  hello  "
+
+
+def test_rate_limits_and_server_errors_are_retried(llm_stub):
+    executor = stub_executor(llm_stub)
+    llm_stub.fail_next(429)
+    llm_stub.fail_next(503)
+    assert ask(executor, "retry me") == "retry me"
+    assert len(llm_stub.requests) == 3
+    assert executor.retries == 2
+
+
+def test_retry_after_header_sets_the_backoff(llm_stub):
+    executor = stub_executor(llm_stub)
+    llm_stub.fail_next(429, headers={"retry-after": "0.3"})
+    started = time.perf_counter()
+    assert ask(executor, "later") == "later"
+    assert time.perf_counter() - started >= 0.3
+
+
+def test_client_errors_and_exhausted_retries_are_raised(llm_stub):
+    executor = stub_executor(llm_stub, max_retries=2)
+    llm_stub.fail_next(400)
+    with pytest.raises(BadRequestError):
+        ask(executor, "bad")
+    assert len(llm_stub.requests) == 1
+
+    llm_stub.fail_next(500, times=3)
+    with pytest.raises(InternalServerError):
+        ask(executor, "down")
+    assert len(llm_stub.requests) == 4
+
+
+def test_token_bucket_paces_requests(llm_stub):
+    executor = stub_executor(llm_stub, requests_per_second=20, burst=1)
+    started = time.perf_counter()
+    futures = [executor.submit(executor.complete(model="m", messages=[{"role": "user", "content": str(i)}]))
+               for i in range(5)]
+    assert sorted(future.result() for future in futures) == ["0", "1", "2", "3", "4"]
+    # One token up front, then one every 50ms
+    assert time.perf_counter() - started >= 0.19
+
+
+def test_identical_requests_in_flight_are_sent_once(llm_stub):
+    llm_stub.latency = 0.2
+    executor = stub_executor(llm_stub)
+    futures = [executor.submit(executor.complete(model="m", messages=MESSAGES)) for _ in range(5)]
+    assert [future.result() for future in futures] == ["hi"] * 5
+    assert len(llm_stub.requests) == 1
+
+
+def test_finished_responses_are_cached(llm_stub):
+    executor = stub_executor(llm_stub)
+    assert ask(executor, "again") == ask(executor, "again") == "again"
+    assert len(llm_stub.requests) == 1
+
+    uncached = stub_executor(llm_stub, cache_size=0)
+    ask(uncached, "again")
+    ask(uncached, "again")
+    assert len(llm_stub.requests) == 3
+
+
+def test_failed_responses_are_not_cached(llm_stub):
+    executor = stub_executor(llm_stub)
+    llm_stub.fail_next(400)
+    with pytest.raises(BadRequestError):
+        ask(executor, "flaky")
+    assert ask(executor, "flaky") == "flaky"
+
+
+def test_interactive_lane_does_not_queue_behind_background(llm_stub):
+    def respond(body):
+        content = body["messages"][-1]["content"]
+        if content.startswith("slow"):
+            time.sleep(0.3)
+        return content
+
+    llm_stub.respond = respond
+    executor = stub_executor(llm_stub, max_concurrency=1)
+    background = [executor.submit(executor.complete(model="m", messages=[{"role": "user", "content": f"slow {i}"}]))
+                  for i in range(3)]
+    time.sleep(0.05)
+    started = time.perf_counter()
+    assert ask(executor, "chat", lane="interactive") == "chat"
+    assert time.perf_counter() - started < 0.25
+    assert not all(future.done() for future in background)
+    assert [future.result() for future in background] == ["slow 0", "slow 1", "slow 2"]
+
+
+def test_streamed_answers_are_relayed(llm_stub):
+    executor = stub_executor(llm_stub)
+
+    async def collect():
+        return [delta async for delta in executor.relay(executor.stream(model="m", messages=[{"role": "user", "content": "one two three"}]))]
+
+    assert "".join(asyncio.run(collect())) == "one two three "
+    assert llm_stub.requests[0]["stream"] is True
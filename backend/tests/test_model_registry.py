@@ -0,0 +1,72 @@
+import threading
+import time
+import pytest
+from app.utils.model_registry import ModelRegistry
+
+
+class Loads:
+    """ Loader that hands out a new object per load and counts them. """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, name):
+        self.count += 1
+        return object()
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry(idle_ttl=0.1)
+    registry.loads = Loads()
+    registry.register_loader("fake", registry.loads)
+    yield registry
+    registry.stop_sweeper()
+
+
+def loaded(registry) -> bool:
+    return registry.metrics()["models"][0]["loaded"]
+
+
+def test_models_are_loaded_once_and_shared(registry):
+    assert registry.get("fake", "a") is registry.get("fake", "a")
+    assert registry.loads.count == 1
+
+
+def test_sweeper_unloads_idle_models_without_further_requests(registry):
+    registry.get("fake", "a")
+    registry.start_sweeper(interval=0.02)
+    time.sleep(0.3)
+    assert not loaded(registry)
+    assert registry.metrics()["evictions"] == 1
+
+
+def test_models_in_use_are_not_evicted(registry):
+    with registry.use("fake", "a") as model:
+        time.sleep(0.2)
+        assert registry.evict_idle() == []
+        # A second caller during a long transcription gets the same instance instead of a reload
+        assert registry.get("fake", "a") is model
+        assert registry.metrics()["models"][0]["in_use"] == 1
+    assert registry.loads.count == 1
+
+    # Releasing counts as a use, so the idle clock starts again from here
+    assert registry.evict_idle() == []
+    time.sleep(0.2)
+    assert registry.evict_idle() == [("fake", "a")]
+    assert registry.metrics()["models"][0]["in_use"] == 0
+
+
+def test_sweeper_skips_checked_out_models(registry):
+    registry.start_sweeper(interval=0.02)
+    with registry.use("fake", "a"):
+        time.sleep(0.3)
+        assert loaded(registry)
+    time.sleep(0.3)
+    assert not loaded(registry)
+
+
+def test_no_sweeper_without_a_ttl():
+    registry = ModelRegistry(idle_ttl=0)
+    registry.start_sweeper()
+    assert not any(thread.name == "model-sweeper" for thread in threading.enumerate())
@@ -0,0 +1,78 @@
+import pytest
+from app.utils.artifact_cache import ArtifactCache
+from app.utils.jobs import Job
+from app.utils.workspace import create_workspace
+
+URL = "https://www.youtube.com/watch?v=resume00001"
+SEGMENTS = [{"start": float(i), "end": i + 1.0, "text": f" sentence {i}"} for i in range(5)]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    import app.main
+    monkeypatch.setattr(app.main, "artifact_cache", ArtifactCache(str(tmp_path / "cache")))
+    transcriptions = []
+
+    def fake_transcription(audio_filepath, original_transcript_path, max_chunk_duration=15):
+        transcriptions.append(audio_filepath)
+        for segment in SEGMENTS:
+            yield segment
+        with open(original_transcript_path, "w") as transcript_file:
+            transcript_file.write("transcript")
+
+    monkeypatch.setattr(app.main, "iter_transcript_with_timestamps", fake_transcription)
+    return app.main, transcriptions, tmp_path
+
+
+def run(pipeline_module, tmp_path, segmenter):
+    pipeline_module.SEGMENTERS["failing"] = segmenter
+    workspace = create_workspace(root=str(tmp_path / "temp"))
+    job = Job(workspace.job_id, pipeline_module.job_manager)
+    prefetched = {"audio_path": str(tmp_path / "audio.wav"), "started_at": 0.0, "finished_at": 0.0}
+    try:
+        return job, pipeline_module.run_youtube_pipeline(job, workspace, URL, "failing", prefetched)
+    finally:
+        del pipeline_module.SEGMENTERS["failing"]
+
+
+@pytest.mark.parametrize("consumed", [0, 2, len(SEGMENTS)])
+def test_segment_failure_keeps_the_finished_transcript(pipeline, consumed):
+    pipeline_module, transcriptions, tmp_path = pipeline
+
+    def failing_segmenter(segments):
+        # Fails after reading `consumed` segments of the streamed transcript
+        for _, _ in zip(range(consumed), segments):
+            pass
+        raise RuntimeError("LLM returned 400")
+
+    received = []
+
+    def recording_segmenter(segments):
+        received.extend(segments)
+        raise RuntimeError("LLM returned 400 again")
+
+    with pytest.raises(RuntimeError, match="400"):
+        run(pipeline_module, tmp_path, failing_segmenter)
+    assert len(transcriptions) == 1
+
+    # The rerun resumes at segmentation: Whisper is not run again
+    with pytest.raises(RuntimeError, match="again"):
+        run(pipeline_module, tmp_path, recording_segmenter)
+    assert len(transcriptions) == 1
+    assert received == SEGMENTS
+
+
+def test_transcription_failure_is_not_cached(pipeline, monkeypatch):
+    pipeline_module, transcriptions, tmp_path = pipeline
+
+    def broken_transcription(audio_filepath, original_transcript_path, max_chunk_duration=15):
+        transcriptions.append(audio_filepath)
+        yield SEGMENTS[0]
+        raise OSError("ffmpeg died")
+
+    monkeypatch.setattr(pipeline_module, "iter_transcript_with_timestamps", broken_transcription)
+    with pytest.raises(OSError):
+        run(pipeline_module, tmp_path, lambda segments: list(segments))
+    with pytest.raises(OSError):
+        run(pipeline_module, tmp_path, lambda segments: list(segments))
+    assert len(transcriptions) == 2
@@ -0,0 +1,83 @@
+import os
+import wave
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.utils.segment_server import parse_range, RangeNotSatisfiable, SegmentAudioServer, write_chunk_index, SOURCE_WAV_NAME
+from app.utils.workspace import JobWorkspace
+
+JOB_ID = "0" * 32
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    (None, None),
+    ("items=0-1", None),
+    ("bytes=0-1,5-6", None),
+    ("bytes=abc-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-2", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """ A job workspace whose source WAV holds 2s of a ramp; chunk_0 is 0.5s..1.5s. """
+    workspace = JobWorkspace(JOB_ID, str(tmp_path))
+    os.makedirs(workspace.segments_dir)
+    with wave.open(os.path.join(workspace.segments_dir, SOURCE_WAV_NAME), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(16000)
+        writer.writeframes(np.arange(32000, dtype="<i2").tobytes())
+    write_chunk_index(workspace.segments_dir, [{"audio_path": "chunk_0.wav", "start_time": 0.5, "end_time": 1.5}])
+    return workspace
+
+
+def test_chunk_is_a_slice_of_the_source(workspace):
+    chunk = SegmentAudioServer().chunk(workspace.segments_dir, "chunk_0")
+    body = b"".join(chunk.iter_bytes())
+    assert len(body) == chunk.size == 44 + 32000
+    assert np.array_equal(np.frombuffer(body[44:], "<i2"), np.arange(8000, 24000, dtype="<i2"))
+    assert SegmentAudioServer().chunk(workspace.segments_dir, "chunk_9") is None
+
+
+@pytest.fixture
+def client(workspace, monkeypatch):
+    import app.main
+    monkeypatch.setattr(app.main, "get_workspace", lambda job_id: workspace if job_id == JOB_ID else None)
+    return TestClient(app.main.app)
+
+
+def test_full_response(client):
+    response = client.get(f"/temp/{JOB_ID}/segments/chunk_0.wav")
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert len(response.content) == int(response.headers["content-length"]) == 44 + 32000
+
+
+def test_partial_response(client):
+    full = client.get(f"/temp/{JOB_ID}/segments/chunk_0.wav").content
+    response = client.get(f"/temp/{JOB_ID}/segments/chunk_0.wav", headers={"Range": "bytes=40-49"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 40-49/{len(full)}"
+    assert response.content == full[40:50]
+
+    response = client.get(f"/temp/{JOB_ID}/segments/chunk_0.wav", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206 and response.content == full[-4:]
+
+
+def test_unsatisfiable_response(client):
+    response = client.get(f"/temp/{JOB_ID}/segments/chunk_0.wav", headers={"Range": "bytes=999999-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{44 + 32000}"
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from app.utils.semantic_audio_segmenter import depth_scores, topic_boundaries, valleys
+
+
+def topic_embeddings(seed: int, noise: float, topics: int = 4, units: int = 30) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, 64))
+    embeddings = np.vstack([center + noise * rng.standard_normal((units, 64)) for center in centers])
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_valleys_are_local_minima():
+    similarities = np.array([0.9, 0.5, 0.7, 0.7, 0.2, 0.2, 0.8], dtype=np.float32)
+    assert valleys(similarities).tolist() == [1, 4]
+
+
+def test_depth_climbs_to_the_nearest_peak_on_each_side():
+    similarities = np.array([0.6, 0.9, 0.5, 0.8, 0.3, 1.0], dtype=np.float32)
+    depths = depth_scores(similarities)
+    assert depths[2] == pytest.approx((0.9 - 0.5) + (0.8 - 0.5))
+    assert depths[4] == pytest.approx((0.8 - 0.3) + (1.0 - 0.3))
+    assert depths[[1, 3, 5]].tolist() == [0, 0, 0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("noise", [0.5, 1.0, 1.5])
+def test_recovers_known_topic_shifts(seed, noise):
+    embeddings = topic_embeddings(seed, noise)
+    positions = np.arange(len(embeddings) + 1, dtype=np.float64) * 10
+    boundaries = topic_boundaries(embeddings, positions, min_length=20, max_length=1000)
+    # Exactly one cut per shift; noisy embeddings may move a cut by one unit
+    assert len(boundaries) == 4 and boundaries[0] == 0
+    assert all(abs(found - true) <= 1 for found, true in zip(boundaries, [0, 30, 60, 90]))
+
+
+def test_min_and_max_length_are_respected():
+    embeddings = topic_embeddings(0, 1.0)
+    positions = np.arange(len(embeddings) + 1, dtype=np.float64) * 10
+    boundaries = topic_boundaries(embeddings, positions, min_length=20, max_length=150)
+    lengths = np.diff(positions[boundaries + [len(embeddings)]])
+    assert {30, 60, 90} <= set(boundaries)
+    assert lengths.min() >= 20 and lengths.max() <= 150
+
+
+def test_single_unit_is_one_chunk():
+    assert topic_boundaries(np.ones((1, 8)), np.array([0.0, 5.0]), 1, 10) == [0]
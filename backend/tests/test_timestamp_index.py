@@ -0,0 +1,46 @@
+from app.utils.timestamp_index import TimestampIndex, TimestampIndexCache
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": " Welcome to the show."},
+    {"start": 4.0, "end": 10.0, "text": " Today we talk about rockets and rocket fuel."},
+    {"start": 10.0, "end": 14.0, "text": " Then we cover the weather."},
+]
+
+
+def test_query_terms_rank_matching_segments():
+    results = TimestampIndex(SEGMENTS).search("Which rockets?")
+    assert [(hit["start"], hit["end"]) for hit in results] == [(4.0, 10.0)]
+    assert results[0]["score"] > 0
+
+
+def test_unmatched_query_finds_nothing():
+    assert TimestampIndex(SEGMENTS).search("submarines") == []
+    assert TimestampIndex([]).search("rockets") == []
+
+
+def test_non_ascii_queries_match():
+    segments = [
+        {"start": 0.0, "end": 3.0, "text": "Сегодня поговорим о погоде."},
+        {"start": 3.0, "end": 6.0, "text": "А потом о ракетах."},
+        {"start": 6.0, "end": 9.0, "text": "我们谈论火箭。"},
+    ]
+    index = TimestampIndex(segments)
+    assert [hit["start"] for hit in index.search("погоде")] == [0.0]
+    assert [hit["start"] for hit in index.search("Grüße, погоде?")] == [0.0]
+    assert index.search("火箭")[0]["start"] == 6.0
+
+
+def test_cache_rebuilds_only_when_the_digest_changes():
+    cache = TimestampIndexCache(capacity=1)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return SEGMENTS
+
+    first = cache.get("vid", "a", loader)
+    assert cache.get("vid", "a", loader) is first
+    assert cache.get("vid", "b", loader) is not first
+    cache.get("other", "a", loader)
+    cache.get("vid", "b", loader)
+    assert len(loads) == 4
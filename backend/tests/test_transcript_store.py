@@ -0,0 +1,46 @@
+import json
+from app.utils.transcript_store import MAGIC, open_transcript, write_transcript
+
+SEGMENTS = [
+    {"id": 0, "start": 0.0, "end": 2.5, "text": " Grüße aus Köln", "tokens": [1, 2], "avg_logprob": -0.2,
+     "words": [{"word": " Grüße", "start": 0.0, "end": 0.8, "probability": 0.9},
+               {"word": " aus", "start": 0.8, "end": 1.2, "probability": 0.9},
+               {"word": " Köln", "start": 1.2, "end": 2.5, "probability": 0.9}]},
+    {"id": 1, "start": 2.5, "end": 3.0, "text": " ", "words": []},
+    {"id": 2, "start": 3.0, "end": 7.25, "text": " 日本語も大丈夫", "words": [{"word": " 日本語も大丈夫", "start": 3.0, "end": 7.25}]},
+]
+
+
+def test_round_trip(tmp_path):
+    path = write_transcript(str(tmp_path / "transcript.tcol"), SEGMENTS, "de")
+    with open(path, "rb") as file:
+        assert file.read(len(MAGIC)) == MAGIC
+
+    transcript = open_transcript(path)
+    assert transcript.language == "de" and len(transcript) == 3
+    assert transcript.starts.tolist() == [0.0, 2.5, 3.0] and transcript.ends.tolist() == [2.5, 3.0, 7.25]
+    assert transcript.texts() == [segment["text"] for segment in SEGMENTS]
+    assert transcript.text(2) == SEGMENTS[2]["text"]
+
+    expected = [
+        {"id": i, "start": segment["start"], "end": segment["end"], "text": segment["text"],
+         **({"words": [{key: word[key] for key in ("word", "start", "end")} for word in segment["words"]]} if segment["words"] else {})}
+        for i, segment in enumerate(SEGMENTS)
+    ]
+    assert transcript.segments(words=True) == expected
+    assert [transcript.segment(i, words=True) for i in range(3)] == expected
+    assert transcript.segments() == [{key: value for key, value in segment.items() if key != "words"} for segment in expected]
+    transcript.close()
+
+
+def test_empty_transcript(tmp_path):
+    transcript = open_transcript(write_transcript(str(tmp_path / "empty.tcol"), [], None))
+    assert len(transcript) == 0 and transcript.segments(words=True) == [] and not transcript.has_words
+
+
+def test_legacy_json_is_still_read(tmp_path):
+    path = tmp_path / "transcript_original.json"
+    path.write_text(json.dumps({"language": "en", "segments": SEGMENTS}, indent=4), encoding="utf-8")
+    transcript = open_transcript(str(path))
+    assert transcript.language == "en"
+    assert transcript.segments(words=True) == open_transcript(write_transcript(str(tmp_path / "t.tcol"), SEGMENTS, "en")).segments(words=True)
@@ -0,0 +1,104 @@
+import json
+import os
+import zlib
+import numpy as np
+import pytest
+from app.utils import vector_index as vector_module
+from app.utils.vector_index import IndexRegistry
+
+DIM = 16
+
+
+def documents(count: int, start: int = 0) -> list:
+    return [{"text": f"segment {i}", "start": i * 5.0, "end": i * 5.0 + 5} for i in range(start, start + count)]
+
+
+def encode(texts: list) -> np.ndarray:
+    """ A fixed random vector per text, so identical texts embed identically. """
+    return np.vstack([np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(DIM)
+                      for text in texts]).astype(np.float32)
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return encode(texts)
+
+
+def best(video_index, text: str) -> dict:
+    return video_index.search(encode([text]), 1)[0][0][0]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return IndexRegistry(str(tmp_path / "indexes"))
+
+
+def test_documents_round_trip_through_the_store(registry):
+    registry.build("vid", encode([d["text"] for d in documents(20)]), documents(20))
+    reloaded = IndexRegistry(registry.root).get("vid")
+    assert len(reloaded) == 20
+    assert reloaded.documents == documents(20)
+    assert best(reloaded, "segment 7") == {"text": "segment 7", "start": 35.0, "end": 40.0}
+    assert not os.path.exists(os.path.join(registry.root, "vid", "documents.json"))
+
+
+def test_unchanged_documents_are_not_reembedded(registry):
+    registry.update("vid", documents(10), encode)
+    encoder = CountingEncoder()
+    registry.update("vid", documents(10), encoder)
+    assert encoder.texts == []
+
+
+def test_grown_transcript_is_appended_to_the_existing_index(registry):
+    original = registry.update("vid", documents(10), encode)
+    encoder = CountingEncoder()
+    grown = registry.update("vid", documents(15), encoder)
+
+    assert grown is original
+    assert encoder.texts == [f"segment {i}" for i in range(10, 15)]
+    assert len(grown) == 15 and grown.meta["count"] == 15
+    assert best(grown, "segment 12")["text"] == "segment 12"
+    assert best(grown, "segment 3")["text"] == "segment 3"
+
+    # The appended index is persisted, vectors included
+    reloaded = IndexRegistry(registry.root).get("vid")
+    assert reloaded.documents == documents(15)
+    assert reloaded.meta == grown.meta
+    assert np.allclose(reloaded.vectors(), grown.vectors())
+
+
+def test_changed_documents_rebuild_the_index(registry):
+    registry.update("vid", documents(10), encode)
+    encoder = CountingEncoder()
+    changed = documents(3, start=100) + documents(10)
+    rebuilt = registry.update("vid", changed, encoder)
+    assert len(encoder.texts) == 13
+    assert rebuilt.documents == changed
+
+
+def test_adding_past_the_threshold_switches_to_ann(registry, monkeypatch):
+    monkeypatch.setattr(vector_module, "VECTOR_INDEX_ANN_THRESHOLD", 12)
+    monkeypatch.setattr(vector_module, "VECTOR_INDEX_ANN_TYPE", "hnsw")
+    video_index = registry.update("vid", documents(10), encode)
+    assert video_index.meta["kind"] == "flat"
+    registry.update("vid", documents(20), encode)
+    assert video_index.meta["kind"] == "hnsw"
+    assert best(video_index, "segment 15")["text"] == "segment 15"
+    assert IndexRegistry(registry.root).get("vid").meta["kind"] == "hnsw"
+
+
+def test_legacy_json_documents_are_migrated(registry):
+    registry.build("vid", encode([d["text"] for d in documents(5)]), documents(5))
+    path = os.path.join(registry.root, "vid")
+    os.remove(os.path.join(path, "documents.tcol"))
+    with open(os.path.join(path, "documents.json"), "w", encoding="utf-8") as file:
+        json.dump(documents(5), file)
+
+    video_index = IndexRegistry(registry.root).get("vid")
+    assert video_index.documents == documents(5)
+    assert os.path.exists(os.path.join(path, "documents.tcol"))
+    assert not os.path.exists(os.path.join(path, "documents.json"))
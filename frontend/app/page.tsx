@@ -322,7 +322,7 @@ export default function Home() {
                                       <Button variant="ghost" size="icon" asChild className="group">
                                         <a
                                           download={`chunk_${index + 1}.wav`}
-                                          href={`http://localhost:8000/temp/segments/chunk_${index + 1}`}
+                                          href={`http://localhost:8000/temp/${result.job_id}/segments/chunk_${index + 1}`}
                                         >
                                           <Download className="w-4 h-4 group-hover:animate-bounce" />
                                         </a>